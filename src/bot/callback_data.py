@@ -0,0 +1,142 @@
+from typing import Optional, Tuple
+
+# Telegram принимает callback_data не длиннее 64 байт
+MAX_CALLBACK_DATA_BYTES = 64
+
+PICKER_PREFIX = "pk"
+SEARCH_PREFIX = "sr"
+SEPARATOR = "|"
+# Признак курсора, указывающего на страницу перед ним
+BACKWARD_MARK = "<"
+
+# Шаги подборщика: выбор сложности, выбор темы, страница задач
+STEP_RATINGS = "r"
+STEP_TOPICS = "t"
+STEP_PAGE = "p"
+PICKER_STEPS = (STEP_RATINGS, STEP_TOPICS, STEP_PAGE)
+
+PICKER_PATTERN = rf"^{PICKER_PREFIX}\{SEPARATOR}"
+SEARCH_PATTERN = rf"^{SEARCH_PREFIX}\{SEPARATOR}"
+
+
+def encode_cursor(cursor: Optional[Tuple[int, ...]], backward: bool = False) -> str:
+    """Курсор страницы в виде 1500.42 (<1500.42 — страница перед курсором)"""
+    if not cursor:
+        return ""
+    return (BACKWARD_MARK if backward else "") + ".".join(str(value) for value in cursor)
+
+
+def decode_cursor(text: str) -> Tuple[Optional[Tuple[int, ...]], bool]:
+    """Курсор и направление из encode_cursor"""
+    if not text:
+        return None, False
+    backward = text.startswith(BACKWARD_MARK)
+    return tuple(int(value) for value in text.lstrip(BACKWARD_MARK).split(".")), backward
+
+
+def check_length(data: str) -> str:
+    """Проверка лимита Telegram на длину callback_data"""
+    if len(data.encode()) > MAX_CALLBACK_DATA_BYTES:
+        raise ValueError(f"callback_data длиннее {MAX_CALLBACK_DATA_BYTES} байт: {data}")
+    return data
+
+
+class PickerState:
+    """Состояние подборщика задач, целиком хранящееся в callback_data кнопки
+
+    Кнопка несет шаг, выбранные сложность и тему, номер страницы и курсор
+    страницы, поэтому любой процесс бота может обработать нажатие
+    без user_data и ConversationHandler. Формат: pk|шаг|сложность|тема|страница|курсор,
+    пустые поля в конце отбрасываются.
+    """
+
+    __slots__ = ('step', 'rating', 'topic', 'page', 'cursor', 'backward')
+
+    def __init__(self, step: str, rating: Optional[int] = None, topic: Optional[str] = None,
+                 page: int = 0, cursor: Optional[Tuple[int, ...]] = None, backward: bool = False):
+        self.step = step
+        self.rating = rating
+        self.topic = topic or None
+        self.page = page
+        self.cursor = cursor
+        self.backward = backward
+
+    def encode(self) -> str:
+        """Строка для callback_data (ValueError, если не помещается в 64 байта)"""
+        fields = [
+            PICKER_PREFIX,
+            self.step,
+            str(self.rating) if self.rating is not None else "",
+            self.topic or "",
+            str(self.page) if self.page else "",
+            encode_cursor(self.cursor, self.backward),
+        ]
+        return check_length(SEPARATOR.join(fields).rstrip(SEPARATOR))
+
+    @classmethod
+    def decode(cls, data: str) -> "PickerState":
+        """Разбор callback_data (ValueError для чужих и поврежденных данных)"""
+        fields = data.split(SEPARATOR)
+        if len(fields) < 2 or len(fields) > 6 or fields[0] != PICKER_PREFIX or fields[1] not in PICKER_STEPS:
+            raise ValueError(f"Неизвестные данные кнопки: {data}")
+        fields += [""] * (6 - len(fields))
+        _, step, rating, topic, page, cursor = fields
+        cursor, backward = decode_cursor(cursor)
+
+        return cls(
+            step,
+            rating=int(rating) if rating else None,
+            topic=topic,
+            page=int(page) if page else 0,
+            cursor=cursor,
+            backward=backward,
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, PickerState):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self):
+        return f"PickerState({self.encode()})"
+
+
+class SearchPageState:
+    """Страница результатов /search в callback_data: sr|страница|курсор|запрос
+
+    Запрос стоит последним и может содержать разделитель. Если запрос
+    не помещается в 64 байта, encode выбрасывает ValueError и кнопки
+    листания не показываются.
+    """
+
+    __slots__ = ('query', 'page', 'cursor', 'backward')
+
+    def __init__(self, query: str, page: int = 0, cursor: Optional[Tuple[int, ...]] = None,
+                 backward: bool = False):
+        self.query = query
+        self.page = page
+        self.cursor = cursor
+        self.backward = backward
+
+    def encode(self) -> str:
+        """Строка для callback_data (ValueError, если не помещается в 64 байта)"""
+        fields = [SEARCH_PREFIX, str(self.page), encode_cursor(self.cursor, self.backward), self.query]
+        return check_length(SEPARATOR.join(fields))
+
+    @classmethod
+    def decode(cls, data: str) -> "SearchPageState":
+        """Разбор callback_data (ValueError для чужих и поврежденных данных)"""
+        fields = data.split(SEPARATOR, 3)
+        if len(fields) != 4 or fields[0] != SEARCH_PREFIX or not fields[3]:
+            raise ValueError(f"Неизвестные данные кнопки: {data}")
+        _, page, cursor, query = fields
+        cursor, backward = decode_cursor(cursor)
+        return cls(query, page=int(page), cursor=cursor, backward=backward)
+
+    def __eq__(self, other):
+        if not isinstance(other, SearchPageState):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self):
+        return f"SearchPageState({SEPARATOR.join([SEARCH_PREFIX, str(self.page), self.query])})"
@@ -0,0 +1,76 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from telegram import KeyboardButton, ReplyKeyboardMarkup
+from services.dataset import get_dataset_version
+from services.task_services import TaskService
+
+logger = logging.getLogger(__name__)
+
+# Сколько сложностей и тем показывается на клавиатурах /problems
+RATING_BUTTONS = 10
+TOPIC_BUTTONS = 15
+
+
+def _grid(labels: List[str], width: int = 2) -> ReplyKeyboardMarkup:
+    buttons = [KeyboardButton(label) for label in labels]
+    rows = [buttons[i:i + width] for i in range(0, len(buttons), width)]
+    return ReplyKeyboardMarkup(rows, one_time_keyboard=True, resize_keyboard=True)
+
+
+class ReplyKeyboards:
+    """Клавиатуры /problems (сложности и темы для каждой сложности), собранные заранее
+
+    Клавиатуры строятся двумя запросами (сложности и агрегат по темам) после
+    каждой загрузки задач и хранятся до смены версии набора задач, поэтому
+    вход в подбор и выбор сложности не обращаются к БД.
+    """
+
+    def __init__(self):
+        self._ratings: Optional[ReplyKeyboardMarkup] = None
+        self._topics: Dict[int, ReplyKeyboardMarkup] = {}
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+
+    @property
+    def current(self) -> bool:
+        """Клавиатуры собраны для текущей версии набора задач"""
+        return self._version == get_dataset_version()
+
+    def rebuild(self, db: Session):
+        """Пересборка клавиатур по данным БД"""
+        version = get_dataset_version()
+        self.build(TaskService.get_available_ratings(db), TaskService.get_rating_topic_stats(db), version)
+
+    def build(self, ratings: List[int], stats: List[Tuple[int, str, int, float]], version: Optional[int] = None):
+        """Сборка клавиатур из списка сложностей и статистики (сложность, тема, задач, решений)"""
+        topic_counts: Dict[int, List[Tuple[str, int]]] = {}
+        for rating, name, count, _ in stats:
+            if count > 0:
+                topic_counts.setdefault(rating, []).append((name, count))
+
+        topics = {}
+        for rating, counts in topic_counts.items():
+            counts.sort(key=lambda item: (-item[1], item[0]))
+            topics[rating] = _grid([f"📚 {name} ({count})" for name, count in counts[:TOPIC_BUTTONS]])
+
+        rating_keyboard = _grid([f"⭐ {rating}" for rating in ratings[:RATING_BUTTONS]]) if ratings else None
+
+        with self._lock:
+            self._ratings = rating_keyboard
+            self._topics = topics
+            self._version = get_dataset_version() if version is None else version
+
+        logger.info(f"Reply keyboards rebuilt: {len(ratings)} ratings, {len(topics)} topic keyboards")
+
+    def ratings(self) -> Optional[ReplyKeyboardMarkup]:
+        """Клавиатура сложностей (None, если задач нет)"""
+        return self._ratings
+
+    def topics(self, rating: int) -> Optional[ReplyKeyboardMarkup]:
+        """Клавиатура тем для сложности (None, если тем нет)"""
+        return self._topics.get(rating)
+
+
+reply_keyboards = ReplyKeyboards()
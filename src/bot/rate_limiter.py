@@ -0,0 +1,146 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import warnings
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple
+from telegram.error import RetryAfter
+from telegram.warnings import PTBDeprecationWarning
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты отправки: меньше — раньше. Ответы на действия пользователя идут
+# первыми, массовые рассылки передают rate_limit_args={'priority': BULK}
+INTERACTIVE = 0
+BULK = 10
+
+# Записи о чатах, у которых следующий слот уже в прошлом, удаляются при таком размере
+CHAT_SLOTS_CLEANUP_SIZE = 10000
+
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    """Пауза из RetryAfter в секундах (PTB отдает int или timedelta)"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', PTBDeprecationWarning)
+        delay = error.retry_after
+    return delay.total_seconds() if isinstance(delay, timedelta) else delay
+
+
+class PriorityRateLimiter(BaseRateLimiter[Dict[str, Any]]):
+    """Темп исходящих запросов к Bot API в пределах лимитов Telegram
+
+    Запросы, адресованные чату, разводятся по времени: не чаще chat_per_second
+    в личный чат и group_per_minute в группу, и не чаще overall_per_second
+    в сумме. Когда глобальный лимит занят, первыми проходят запросы с меньшим
+    приоритетом (INTERACTIVE раньше BULK). На RetryAfter чат (или все
+    запросы, если чата нет) приостанавливается на указанное Telegram время
+    и запрос повторяется до max_retries раз. Запросы без chat_id (getMe,
+    answerInlineQuery, answerCallbackQuery) не ограничиваются.
+    """
+
+    def __init__(self, overall_per_second: float = 30, chat_per_second: float = 1,
+                 group_per_minute: float = 20, max_retries: int = 3):
+        self.overall_interval = 1 / overall_per_second
+        self.chat_interval = 1 / chat_per_second
+        self.group_interval = 60 / group_per_minute
+        self.max_retries = max_retries
+        self._chat_slots: Dict[Any, float] = {}
+        self._waiting: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._next_global = 0.0
+        self._pacer: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.retries = 0
+        self.wait_total = 0.0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self._pacer is not None:
+            self._pacer.cancel()
+            self._pacer = None
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Dict[str, Any]],
+    ) -> Any:
+        chat_id = data.get('chat_id')
+        priority = (rate_limit_args or {}).get('priority', INTERACTIVE)
+
+        for attempt in range(self.max_retries + 1):
+            if chat_id is not None:
+                started = time.monotonic()
+                await self._chat_slot(chat_id)
+                await self._global_slot(priority)
+                self.wait_total += time.monotonic() - started
+            try:
+                result = await callback(*args, **kwargs)
+                self.sent += 1
+                return result
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = retry_after_seconds(e)
+                logger.warning(f"{endpoint}: flood control for chat {chat_id}, retrying in {delay}s")
+                self.retries += 1
+                self._pause(chat_id, delay)
+                if chat_id is None:
+                    await asyncio.sleep(delay)
+
+    def _pause(self, chat_id, delay: float):
+        resume_at = time.monotonic() + delay
+        if chat_id is None:
+            self._next_global = max(self._next_global, resume_at)
+        else:
+            self._chat_slots[chat_id] = max(self._chat_slots.get(chat_id, 0.0), resume_at)
+
+    async def _chat_slot(self, chat_id):
+        """Резервирование следующего слота чата и ожидание его"""
+        now = time.monotonic()
+        if len(self._chat_slots) > CHAT_SLOTS_CLEANUP_SIZE:
+            self._chat_slots = {key: slot for key, slot in self._chat_slots.items() if slot > now}
+
+        is_group = isinstance(chat_id, str) or chat_id < 0
+        slot = max(now, self._chat_slots.get(chat_id, 0.0))
+        self._chat_slots[chat_id] = slot + (self.group_interval if is_group else self.chat_interval)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _global_slot(self, priority: int):
+        """Ожидание глобального слота в порядке приоритета"""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._sequence), future))
+        if self._pacer is None or self._pacer.done():
+            self._pacer = asyncio.create_task(self._pace())
+        await future
+
+    async def _pace(self):
+        while self._waiting:
+            now = time.monotonic()
+            if now < self._next_global:
+                await asyncio.sleep(self._next_global - now)
+                continue
+            _, _, future = heapq.heappop(self._waiting)
+            if future.done():
+                continue
+            future.set_result(None)
+            self._next_global = now + self.overall_interval
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """Отправлено, повторов после RetryAfter, ожидающих и среднее ожидание слота"""
+        return {
+            'sent': self.sent,
+            'retries': self.retries,
+            'queued': len(self._waiting),
+            'wait_avg_ms': 1000 * self.wait_total / self.sent if self.sent else 0.0,
+        }
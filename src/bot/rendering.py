@@ -0,0 +1,125 @@
+import time
+from typing import Callable, Dict, Iterable, Tuple
+from telegram.helpers import escape_markdown
+from services.dataset import get_dataset_version
+from services.problem_views import ProblemView
+
+
+def markdown(text) -> str:
+    """Экранирование текста для parse_mode='Markdown'"""
+    return escape_markdown(str(text), version=1)
+
+
+def _title(problem: ProblemView) -> str:
+    return f"**{problem.full_code}**: {markdown(problem.name)}\n"
+
+
+def _solved_line(problem: ProblemView) -> str:
+    return (_title(problem)
+            + f"   👥 Решений: {problem.solved_count}\n"
+            + f"   🔗 [Открыть задачу]({problem.codeforces_url})\n\n")
+
+
+def _search_line(problem: ProblemView) -> str:
+    return (_title(problem)
+            + f"   ⭐ Сложность: {problem.rating or 'N/A'}\n"
+            + f"   👥 Решений: {problem.solved_count}\n"
+            + f"   🔗 [Открыть]({problem.codeforces_url})\n\n")
+
+
+def _rated_line(problem: ProblemView) -> str:
+    return (_title(problem)
+            + f"   ⭐ Сложность: {problem.rating or 'N/A'}\n"
+            + f"   🔗 [Открыть]({problem.codeforces_url})\n")
+
+
+def _link_line(problem: ProblemView) -> str:
+    return _title(problem) + f"   🔗 [Открыть]({problem.codeforces_url})\n"
+
+
+def _random_card(problem: ProblemView) -> str:
+    return (f"🎲 {_title(problem)}"
+            f"⭐ Сложность: {problem.rating}\n"
+            f"👥 Решений: {problem.solved_count}\n"
+            f"🔗 [Открыть задачу]({problem.codeforces_url})")
+
+
+def _detail_card(problem: ProblemView) -> str:
+    response = f"🎯 **Задача {problem.full_code}**\n\n"
+    response += f"**Название:** {markdown(problem.name)}\n"
+    response += f"**Сложность:** {problem.rating or 'N/A'}\n"
+    response += f"**Количество решений:** {problem.solved_count}\n"
+
+    if problem.topics:
+        topics = ", ".join(problem.topics)
+        response += f"**Темы:** {markdown(topics)}\n"
+
+    response += f"\n🔗 [Открыть на Codeforces]({problem.codeforces_url})"
+    return response
+
+
+# Виды фрагментов: строки списков (без номера) и карточки задачи
+FRAGMENT_STYLES: Dict[str, Callable[[ProblemView], str]] = {
+    'solved': _solved_line,
+    'search': _search_line,
+    'rated': _rated_line,
+    'link': _link_line,
+    'random': _random_card,
+    'detail': _detail_card,
+}
+
+
+class ProblemRenderer:
+    """Кэш заранее отрисованных фрагментов Markdown для задач
+
+    Для каждой задачи и вида фрагмента текст (с уже экранированным
+    названием и темами) строится один раз, а ответы собираются склейкой
+    фрагментов. Кэш сбрасывается целиком при смене версии набора задач,
+    по истечении ttl_seconds (загрузка могла пройти в другом процессе)
+    и при переполнении.
+    """
+
+    def __init__(self, max_size: int = 50000, ttl_seconds: float = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._fragments: Dict[Tuple[str, str, tuple], str] = {}
+        self._version = get_dataset_version()
+        self._expires_at = time.monotonic() + ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def _check_fresh(self):
+        version = get_dataset_version()
+        now = time.monotonic()
+        if version != self._version or now > self._expires_at or len(self._fragments) >= self.max_size:
+            self._fragments.clear()
+            self._version = version
+            self._expires_at = now + self.ttl_seconds
+
+    def fragment(self, problem: ProblemView, style: str) -> str:
+        """Фрагмент задачи вида style"""
+        self._check_fresh()
+        # Карточка зависит от профиля загрузки: у задачи из профиля list нет тем
+        key = (style, problem.full_code, tuple(problem.topics) if style == 'detail' else ())
+        text = self._fragments.get(key)
+        if text is not None:
+            self.hits += 1
+            return text
+
+        self.misses += 1
+        text = FRAGMENT_STYLES[style](problem)
+        self._fragments[key] = text
+        return text
+
+    def listing(self, problems: Iterable[ProblemView], style: str, start: int = 1) -> str:
+        """Нумерованный список задач из фрагментов"""
+        return "".join(f"{i}. {self.fragment(problem, style)}" for i, problem in enumerate(problems, start))
+
+    def details(self, problem: ProblemView) -> str:
+        """Карточка задачи"""
+        return self.fragment(problem, 'detail')
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Попадания, промахи и размер кэша фрагментов"""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._fragments)}
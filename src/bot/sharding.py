@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import multiprocessing
+from typing import Any, Dict, List, Optional
+import httpx
+from telegram import Bot, Update
+from config.config import config
+from bot.webhook import SECRET_TOKEN_HEADER, WebhookServer, serve_webhook, wait_for_stop_signal
+
+logger = logging.getLogger(__name__)
+
+FORWARD_TIMEOUT_SECONDS = 10
+
+
+def update_owner_id(payload: Dict[str, Any]) -> Optional[int]:
+    """chat_id обновления (для обновлений без чата — id пользователя)"""
+    for field, value in payload.items():
+        if field == 'update_id' or not isinstance(value, dict):
+            continue
+        chat = value.get('chat') or (value.get('message') or {}).get('chat')
+        if chat and 'id' in chat:
+            return chat['id']
+        user = value.get('from') or value.get('user')
+        if user and 'id' in user:
+            return user['id']
+    return None
+
+
+def shard_for(payload: Dict[str, Any], shards: int) -> int:
+    """Номер воркера для обновления: все обновления одного чата попадают в один воркер"""
+    owner_id = update_owner_id(payload)
+    if owner_id is None:
+        return payload.get('update_id', 0) % shards
+    return owner_id % shards
+
+
+def get_worker_urls() -> List[str]:
+    """Адреса воркеров: WORKER_URLS или локальные порты WORKER_BASE_PORT + i"""
+    if config.WORKER_URLS:
+        return [url.strip() for url in config.WORKER_URLS.split(",") if url.strip()]
+    return [
+        f"http://{config.WORKER_HOST}:{config.WORKER_BASE_PORT + index}{config.WEBHOOK_PATH}"
+        for index in range(config.BOT_WORKERS)
+    ]
+
+
+async def serve_dispatcher(worker_urls: List[str]):
+    """Публичный приемник вебхука, пересылающий обновления воркерам по chat_id"""
+    headers = {SECRET_TOKEN_HEADER: config.WEBHOOK_SECRET_TOKEN}
+
+    async with httpx.AsyncClient(timeout=FORWARD_TIMEOUT_SECONDS) as client:
+
+        async def forward(payload: Dict[str, Any]):
+            url = worker_urls[shard_for(payload, len(worker_urls))]
+            response = await client.post(url, json=payload, headers=headers)
+            response.raise_for_status()
+
+        server = WebhookServer(
+            forward,
+            secret_token=config.WEBHOOK_SECRET_TOKEN,
+            path=config.WEBHOOK_PATH,
+            host=config.WEBHOOK_LISTEN,
+            port=config.WEBHOOK_PORT,
+            max_body_bytes=config.WEBHOOK_MAX_BODY_BYTES
+        )
+        await server.start()
+
+        async with Bot(config.TELEGRAM_BOT_TOKEN) as bot:
+            await bot.set_webhook(
+                url=config.WEBHOOK_URL,
+                secret_token=config.WEBHOOK_SECRET_TOKEN,
+                allowed_updates=Update.ALL_TYPES
+            )
+
+        logger.info(f"Dispatching updates to {len(worker_urls)} workers")
+        try:
+            await wait_for_stop_signal()
+        finally:
+            await server.stop()
+
+    logger.info(f"Dispatcher stopped: {server.accepted} updates forwarded, {server.rejected} rejected")
+
+
+def run_worker(index: int):
+    """Воркер: бот без регистрации вебхука, принимает обновления от диспетчера
+
+    У каждого воркера свои пулы соединений с БД, кэш и user_data, поэтому
+    диспетчер всегда отправляет обновления одного чата в один воркер.
+    """
+    from bot.telegram_bot import TelegramBot
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - worker-{index} - %(name)s - %(levelname)s - %(message)s'
+    )
+    bot = TelegramBot(config.TELEGRAM_BOT_TOKEN)
+    asyncio.run(serve_webhook(
+        bot.application,
+        host=config.WORKER_HOST,
+        port=config.WORKER_BASE_PORT + index,
+        register_webhook=False
+    ))
+
+
+def run_sharded_bot():
+    """Запуск BOT_WORKERS процессов-воркеров и диспетчера в текущем процессе"""
+    context = multiprocessing.get_context('spawn')
+    workers = [
+        context.Process(target=run_worker, args=(index,), name=f"bot-worker-{index}", daemon=True)
+        for index in range(config.BOT_WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    logger.info(f"Started {len(workers)} bot workers")
+
+    try:
+        asyncio.run(serve_dispatcher(get_worker_urls()))
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
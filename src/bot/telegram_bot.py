@@ -1,32 +1,155 @@
+import asyncio
 import logging
-from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
+import re
+import time
+from typing import List, Optional
+from telegram import (
+    Update, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, InputTextMessageContent
+)
+from telegram.error import BadRequest
 from telegram.ext import (
-    Application, CommandHandler, MessageHandler,
+    Application, CommandHandler, MessageHandler, TypeHandler, InlineQueryHandler, CallbackQueryHandler,
     filters, ContextTypes, ConversationHandler
 )
-from database.database import SessionLocal
-from services.task_services import TaskService
+from sqlalchemy.ext.asyncio import AsyncSession
+from bot.unit_of_work import unit_of_work, cancel_chat_queries, run_in_session
+from bot.rendering import ProblemRenderer, markdown
+from bot.keyboards import reply_keyboards
+from bot.text_filter import FreeTextFilter, CODES, CODE, RATE_LIMITED
+from bot.callback_data import (
+    PickerState, SearchPageState, PICKER_PATTERN, SEARCH_PATTERN, STEP_RATINGS, STEP_TOPICS, STEP_PAGE
+)
+from bot.webhook import serve_webhook
+from bot.sharding import get_worker_urls, run_sharded_bot, run_worker, serve_dispatcher
+from bot.update_processor import ChatOrderedUpdateProcessor
+from bot.rate_limiter import PriorityRateLimiter
+from database.database import AsyncSessionLocal, get_pool_stats
+from services.dataset import on_dataset_updated, sync_dataset_version
+from services.task_services import AsyncTaskService, page_cursor
+from services.problem_pools import problem_pools
+from services.problem_index import problem_index
+from services.query_cache import QueryCache
+from services.single_flight import SingleFlight
 from config.config import config
-from database.models import Problem
+from services.problem_views import ProblemView
 
 logger = logging.getLogger(__name__)
 
 CHOOSING_RATING, CHOOSING_TOPIC = range(2)
 
+TOPIC_COUNT_SUFFIX = re.compile(r"\s*\(\d+\)$")
+
+# Задач на одной странице подборщика и результатов /search
+PICKER_PAGE_SIZE = 10
+SEARCH_PAGE_SIZE = 10
+# Сколько кодов задач из одного сообщения ищется (ответ должен уложиться в 4096 символов)
+MAX_CODES_PER_MESSAGE = 20
+
 
 class TelegramBot:
     """Класс Telegram бота"""
 
     def __init__(self, token: str):
         self.token = token
-        self.application = Application.builder().token(token).build()
+        self.query_cache = QueryCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL_SECONDS)
+        self.single_flight = SingleFlight()
+        self.renderer = ProblemRenderer(ttl_seconds=config.QUERY_CACHE_TTL_SECONDS)
+        self.text_filter = FreeTextFilter(
+            max_length=config.FREE_TEXT_MAX_LENGTH,
+            rate_per_minute=config.FREE_TEXT_RATE_PER_MINUTE,
+            burst=config.FREE_TEXT_BURST,
+            miss_cache_size=config.QUERY_CACHE_SIZE,
+            ttl_seconds=config.QUERY_CACHE_TTL_SECONDS
+        )
+        self._background_tasks: List[asyncio.Task] = []
+        # Кэши набора задач нужны только процессам, которые отвечают пользователям:
+        # диспетчер шардированного режима бота не создает и их не пересобирает
+        for rebuild in (problem_index.rebuild, reply_keyboards.rebuild, problem_pools.rebuild):
+            on_dataset_updated(rebuild)
+        self.update_processor = ChatOrderedUpdateProcessor(config.MAX_CONCURRENT_UPDATES, config.MAX_PENDING_UPDATES)
+        # Глобальный лимит Telegram общий для токена, поэтому воркеры делят его поровну
+        workers = config.BOT_WORKERS if config.BOT_MODE in ('sharded', 'worker') else 1
+        self.rate_limiter = PriorityRateLimiter(
+            overall_per_second=config.TELEGRAM_GLOBAL_RATE / workers,
+            chat_per_second=config.TELEGRAM_CHAT_RATE,
+            group_per_minute=config.TELEGRAM_GROUP_RATE_PER_MINUTE,
+            max_retries=config.TELEGRAM_MAX_RETRIES
+        )
+        self.application = (
+            Application.builder()
+            .token(token)
+            .concurrent_updates(self.update_processor)
+            .rate_limiter(self.rate_limiter)
+            .post_init(self._start_background_tasks)
+            .post_shutdown(self._stop_background_tasks)
+            .build()
+        )
         self.setup_handlers()
 
+    async def _start_background_tasks(self, application: Application):
+        """Запуск записи метрик в лог и обновления кэшей набора задач"""
+        self._background_tasks = [
+            asyncio.create_task(self._report_metrics()),
+            asyncio.create_task(self._refresh_dataset_caches()),
+        ]
+
+    async def _stop_background_tasks(self, application: Application):
+        """Остановка фоновых задач"""
+        for task in self._background_tasks:
+            task.cancel()
+        self._background_tasks = []
+
+    async def _refresh_dataset_caches(self):
+        """Сборка кэшей набора задач при старте и после каждой загрузки, в том числе в другом процессе
+
+        Парсер может работать в другом процессе (в шардированном режиме — в
+        диспетчере), поэтому раз в DATASET_VERSION_POLL_SECONDS бот читает
+        общую версию из таблицы dataset_version и при ее смене вызывает
+        обработчики обновления задач. Раз в DATASET_CACHE_REFRESH_SECONDS
+        кэши пересобираются и без смены версии.
+        """
+        refreshed_at = None
+        while True:
+            force = refreshed_at is None or time.monotonic() - refreshed_at >= config.DATASET_CACHE_REFRESH_SECONDS
+            try:
+                async with AsyncSessionLocal() as db:
+                    if await db.run_sync(sync_dataset_version, force):
+                        refreshed_at = time.monotonic()
+            except Exception as e:
+                logger.error(f"Dataset version check failed: {e}")
+            await asyncio.sleep(config.DATASET_VERSION_POLL_SECONDS)
+
+    async def _reply_keyboards(self):
+        """Клавиатуры /problems для текущей версии набора задач (пересборка, если версия сменилась)
+
+        Пересборку ждут все чаты, вошедшие в /problems, поэтому она идет
+        в отдельной сессии, а не в сессии обработчика одного из них.
+        """
+        if not reply_keyboards.current:
+            await self.single_flight.run(('reply_keyboards',), run_in_session, None, reply_keyboards.rebuild)
+        return reply_keyboards
+
+    async def _report_metrics(self):
+        """Метрики очередей обновлений и отправки, пулов соединений и кэша раз в METRICS_LOG_INTERVAL_SECONDS"""
+        while True:
+            await asyncio.sleep(config.METRICS_LOG_INTERVAL_SECONDS)
+            logger.info(f"Update queue stats: {self.update_processor.stats}")
+            logger.info(f"Outgoing message stats: {self.rate_limiter.stats}")
+            logger.info(f"DB pool stats: {get_pool_stats()}")
+            logger.info(f"Query cache stats: {self.query_cache.stats}")
+            logger.info(f"Rendered fragment stats: {self.renderer.stats}")
+            logger.info(f"Free text filter stats: {self.text_filter.stats}")
+
     def setup_handlers(self):
         """Настройка обработчиков команд"""
         self.application.add_handler(CommandHandler("start", self.start))
         self.application.add_handler(CommandHandler("help", self.help))
         self.application.add_handler(CommandHandler("search", self.search))
+        self.application.add_handler(CommandHandler("random", self.random_problem))
+        self.application.add_handler(CommandHandler("stats", self.stats))
+        self.application.add_handler(CommandHandler("pick", self.pick))
+        self.application.add_handler(CallbackQueryHandler(self.picker_callback, pattern=PICKER_PATTERN))
+        self.application.add_handler(CallbackQueryHandler(self.search_callback, pattern=SEARCH_PATTERN))
 
         conv_handler = ConversationHandler(
             entry_points=[CommandHandler('problems', self.start_problem_selection)],
@@ -37,14 +160,22 @@ class TelegramBot:
                 CHOOSING_TOPIC: [
                     MessageHandler(filters.TEXT & ~filters.COMMAND, self.select_topic)
                 ],
+                ConversationHandler.TIMEOUT: [
+                    TypeHandler(Update, self.conversation_timeout)
+                ],
             },
-            fallbacks=[CommandHandler('cancel', self.cancel)]
+            fallbacks=[CommandHandler('cancel', self.cancel)],
+            conversation_timeout=config.CONVERSATION_TIMEOUT_SECONDS
         )
 
         self.application.add_handler(conv_handler)
+        # /cancel вне диалога /problems прерывает долгие /search и поиск по тексту
+        self.application.add_handler(CommandHandler("cancel", self.cancel))
 
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_text))
 
+        self.application.add_handler(InlineQueryHandler(self.inline_query))
+
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start"""
         user = update.effective_user
@@ -55,6 +186,9 @@ class TelegramBot:
 
 🔍 /search - Найти задачу по названию или номеру
 📚 /problems - Подобрать задачи по сложности и теме
+🧭 /pick - То же на кнопках в одном сообщении
+🎲 /random - Случайная задача заданной сложности
+📊 /stats - Количество задач по темам для сложности
 ℹ️ /help - Показать справку
 
 Начните с команды /problems для подбора задач!
@@ -72,128 +206,247 @@ class TelegramBot:
 /problems - Подбор задач по фильтрам
 Бот предложит выбрать сложность и тему
 
+/pick - Подбор задач на кнопках
+Сложность, тема и страницы листаются в одном сообщении
+
+/random - Случайная задача
+Пример: `/random 1200` или `/random 1200 dp`
+
+/stats - Статистика по темам
+Пример: `/stats 1200` или `/stats 1200 dp`
+
 💡 **Советы:**
 - Задачи обновляются каждый час
 - Можно искать по номеру (123A) или названию
+- В любом чате наберите имя бота и запрос (например, `1850G`) — задача вставится в сообщение
 - Подборка всегда содержит задачи из разных контестов
         """
         await update.message.reply_text(help_text)
 
-    async def start_problem_selection(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Начало процесса подбора задач"""
-        db = SessionLocal()
-        try:
-            ratings = TaskService.get_available_ratings(db)
-
-            if not ratings:
-                await update.message.reply_text("❌ В базе данных пока нет задач. Попробуйте позже.")
-                return ConversationHandler.END
+    @unit_of_work
+    async def start_problem_selection(self, update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession):
+        """Начало процесса подбора задач (клавиатура из кэша, без запроса к БД)"""
+        keyboards = await self._reply_keyboards()
+        reply_markup = keyboards.ratings()
 
-            keyboard = []
-            row = []
-            for rating in ratings[:10]:
-                button = KeyboardButton(f"⭐ {rating}")
-                row.append(button)
-                if len(row) == 2:
-                    keyboard.append(row)
-                    row = []
-            if row:
-                keyboard.append(row)
-
-            reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
-
-            await update.message.reply_text(
-                "🎯 Выберите сложность задачи:",
-                reply_markup=reply_markup
-            )
+        if reply_markup is None:
+            await update.message.reply_text("❌ В базе данных пока нет задач. Попробуйте позже.")
+            return ConversationHandler.END
 
-            return CHOOSING_RATING
+        await update.message.reply_text(
+            "🎯 Выберите сложность задачи:",
+            reply_markup=reply_markup
+        )
 
-        finally:
-            db.close()
+        return CHOOSING_RATING
 
-    async def select_rating(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @unit_of_work
+    async def select_rating(self, update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession):
         """Обработка выбора сложности"""
         try:
             rating_text = update.message.text
             rating = int(rating_text.replace("⭐ ", "").strip())
             context.user_data['rating'] = rating
 
-            db = SessionLocal()
-            try:
-                topics = TaskService.get_available_topics(db)
-
-                if not topics:
-                    await update.message.reply_text("❌ Нет доступных тем.")
-                    return ConversationHandler.END
-
-                keyboard = []
-                row = []
-                for topic in topics[:15]:
-                    button = KeyboardButton(f"📚 {topic}")
-                    row.append(button)
-                    if len(row) == 2:
-                        keyboard.append(row)
-                        row = []
-                if row:
-                    keyboard.append(row)
+            keyboards = await self._reply_keyboards()
+            reply_markup = keyboards.topics(rating)
 
-                reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
-
-                await update.message.reply_text(
-                    f"🎯 Выбрана сложность: {rating}\n\nТеперь выберите тему:",
-                    reply_markup=reply_markup
-                )
+            if reply_markup is None:
+                await update.message.reply_text("❌ Нет доступных тем.")
+                return ConversationHandler.END
 
-                return CHOOSING_TOPIC
+            await update.message.reply_text(
+                f"🎯 Выбрана сложность: {rating}\n\nТеперь выберите тему:",
+                reply_markup=reply_markup
+            )
 
-            finally:
-                db.close()
+            return CHOOSING_TOPIC
 
         except ValueError:
             await update.message.reply_text("❌ Пожалуйста, выберите сложность из предложенных вариантов.")
             return CHOOSING_RATING
 
-    async def select_topic(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @unit_of_work
+    async def select_topic(self, update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession):
         """Обработка выбора темы и показ результатов"""
         topic_text = update.message.text
-        topic = topic_text.replace("📚 ", "").strip()
+        topic = TOPIC_COUNT_SUFFIX.sub("", topic_text.replace("📚 ", "")).strip()
         rating = context.user_data.get('rating')
 
-        db = SessionLocal()
+        if problem_pools.built:
+            problems = problem_pools.pick_many(rating, topic, count=10)
+        else:
+            problems = await AsyncTaskService.get_problems_by_filters(db, rating, topic, limit=10)
+
+        if not problems:
+            await update.message.reply_text(
+                f"❌ Не найдено задач с сложностью {rating} и темой '{topic}'. "
+                f"Попробуйте другие параметры."
+            )
+            return ConversationHandler.END
+
+        response = (
+            "🎯 **Подборка задач**\n\n"
+            f"⭐ Сложность: {rating}\n"
+            f"📚 Тема: {markdown(topic)}\n"
+            f"📊 Найдено задач: {len(problems)}\n\n"
+            + self.renderer.listing(problems, 'solved')
+        )
+
+        # Случайная подборка не листается, поэтому кнопка открывает постраничный список подборщика
+        reply_markup = None
         try:
-            problems = TaskService.get_problems_by_filters(db, rating, topic, limit=10)
+            button = InlineKeyboardButton(
+                "📄 Все задачи по популярности »", callback_data=PickerState(STEP_PAGE, rating, topic).encode()
+            )
+            reply_markup = InlineKeyboardMarkup([[button]])
+        except ValueError:
+            pass
 
-            if not problems:
-                await update.message.reply_text(
-                    f"❌ Не найдено задач с сложностью {rating} и темой '{topic}'. "
-                    f"Попробуйте другие параметры."
-                )
-                return ConversationHandler.END
+        await update.message.reply_text(
+            response,
+            parse_mode='Markdown',
+            disable_web_page_preview=True,
+            reply_markup=reply_markup
+        )
 
-            response = "🎯 **Подборка задач**\n\n"
-            response += f"⭐ Сложность: {rating}\n"
-            response += f"📚 Тема: {topic}\n"
-            response += f"📊 Найдено задач: {len(problems)}\n\n"
+        return ConversationHandler.END
 
-            for i, problem in enumerate(problems, 1):
-                response += f"{i}. **{problem.full_code}**: {problem.name}\n"
-                response += f"   👥 Решений: {problem.solved_count}\n"
-                response += f"   🔗 [Открыть задачу]({problem.codeforces_url})\n\n"
+    @unit_of_work
+    async def pick(self, update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession):
+        """Обработчик команды /pick: подборщик на inline-кнопках"""
+        text, reply_markup = await self._render_picker(db, PickerState(STEP_RATINGS))
+        await update.message.reply_text(text, reply_markup=reply_markup)
 
-            await update.message.reply_text(
-                response,
+    @unit_of_work
+    async def picker_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession):
+        """Нажатие кнопки подборщика: следующий шаг в том же сообщении"""
+        query = update.callback_query
+        try:
+            state = PickerState.decode(query.data)
+        except ValueError:
+            await query.answer("Кнопка устарела, начните заново: /pick", show_alert=True)
+            return
+
+        await query.answer()
+        text, reply_markup = await self._render_picker(db, state)
+        await self._edit_message(query, text, reply_markup)
+
+    async def _edit_message(self, query, text: str, reply_markup: Optional[InlineKeyboardMarkup]):
+        """Замена текста и кнопок сообщения (повторное нажатие той же кнопки не ошибка)"""
+        try:
+            await query.edit_message_text(
+                text,
                 parse_mode='Markdown',
                 disable_web_page_preview=True,
-                reply_markup=None
+                reply_markup=reply_markup
             )
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
+
+    async def _render_picker(self, db: AsyncSession, state: PickerState):
+        """Текст и кнопки шага подборщика"""
+        if state.step == STEP_TOPICS:
+            return await self._render_picker_topics(db, state.rating)
+        if state.step == STEP_PAGE:
+            return await self._render_picker_page(db, state)
+
+        ratings = await self.query_cache.call_async(AsyncTaskService.get_available_ratings, db)
+        if not ratings:
+            return "❌ В базе данных пока нет задач. Попробуйте позже.", None
+
+        buttons = [
+            InlineKeyboardButton(f"⭐ {rating}", callback_data=PickerState(STEP_TOPICS, rating).encode())
+            for rating in ratings
+        ]
+        return "🎯 Выберите сложность задачи:", InlineKeyboardMarkup(self._rows(buttons, 4))
+
+    async def _render_picker_topics(self, db: AsyncSession, rating: int):
+        """Шаг выбора темы для сложности"""
+        topics = await self.query_cache.call_async(AsyncTaskService.get_topic_counts, db, rating)
+
+        buttons = []
+        for topic, count in topics:
+            try:
+                data = PickerState(STEP_PAGE, rating, topic).encode()
+            except ValueError:
+                continue
+            buttons.append(InlineKeyboardButton(f"📚 {topic} ({count})", callback_data=data))
+
+        keyboard = self._rows(buttons, 2)
+        keyboard.append([
+            InlineKeyboardButton("« Сложность", callback_data=PickerState(STEP_RATINGS).encode()),
+            InlineKeyboardButton("📚 Любая тема", callback_data=PickerState(STEP_PAGE, rating).encode()),
+        ])
+        return f"🎯 Выбрана сложность: {rating}\n\nТеперь выберите тему:", InlineKeyboardMarkup(keyboard)
+
+    async def _render_picker_page(self, db: AsyncSession, state: PickerState):
+        """Страница задач по выбранным сложности и теме (курсорная пагинация)"""
+        problems, next_cursor = await self.query_cache.call_async(
+            AsyncTaskService.get_problems_page, db,
+            order='popular', cursor=state.cursor, backward=state.backward, limit=PICKER_PAGE_SIZE,
+            rating=state.rating, topic=state.topic
+        )
 
-            return ConversationHandler.END
+        topic = state.topic or "любая"
+        keyboard = self._page_navigation(
+            lambda page, cursor, backward: PickerState(
+                STEP_PAGE, state.rating, state.topic, page, cursor, backward
+            ).encode(),
+            state.page, state.backward, problems, next_cursor
+        )
+        keyboard.append([
+            InlineKeyboardButton("« Темы", callback_data=PickerState(STEP_TOPICS, state.rating).encode())
+        ])
+
+        if not problems:
+            text = f"❌ Не найдено задач с сложностью {state.rating} и темой '{markdown(topic)}'."
+            return text, InlineKeyboardMarkup(keyboard)
+
+        response = (
+            "🎯 **Подборка задач**\n\n"
+            f"⭐ Сложность: {state.rating}\n"
+            f"📚 Тема: {markdown(topic)}\n"
+            f"📄 Страница: {state.page + 1}\n\n"
+            + self.renderer.listing(problems, 'solved', start=state.page * PICKER_PAGE_SIZE + 1)
+        )
+
+        return response, InlineKeyboardMarkup(keyboard)
+
+    @staticmethod
+    def _page_navigation(make_data, page: int, backward: bool, problems: list, next_cursor) -> list:
+        """Строка кнопок «Назад»/«Дальше» с курсорами по первой и последней задаче страницы
+
+        make_data(page, cursor, backward) строит callback_data соседней страницы.
+        После перехода назад next_cursor указывает на еще более раннюю страницу,
+        а следующая страница есть всегда (с нее и пришли).
+        """
+        if not problems:
+            return []
+
+        has_previous = page > 0 and (not backward or next_cursor is not None)
+        has_next = backward or next_cursor is not None
+
+        buttons = []
+        try:
+            if has_previous:
+                cursor = page_cursor(problems[0])
+                buttons.append(InlineKeyboardButton("« Назад", callback_data=make_data(page - 1, cursor, True)))
+            if has_next:
+                cursor = page_cursor(problems[-1])
+                buttons.append(InlineKeyboardButton("Дальше »", callback_data=make_data(page + 1, cursor, False)))
+        except ValueError:
+            return []
+        return [buttons] if buttons else []
 
-        finally:
-            db.close()
+    @staticmethod
+    def _rows(buttons: list, width: int) -> list:
+        """Раскладка кнопок по строкам"""
+        return [buttons[i:i + width] for i in range(0, len(buttons), width)]
 
-    async def search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @unit_of_work(statement_timeout_ms=config.SEARCH_QUERY_TIMEOUT_MS)
+    async def search(self, update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession):
         """Обработчик команды /search"""
         if not context.args:
             await update.message.reply_text(
@@ -204,64 +457,167 @@ class TelegramBot:
             return
 
         search_query = " ".join(context.args)
-        db = SessionLocal()
+        # Общий запрос выполняется в своей сессии: его ждут и другие чаты с тем же запросом
+        response = await self.single_flight.run(
+            ('search', search_query), run_in_session, config.SEARCH_QUERY_TIMEOUT_MS,
+            self._render_search, SearchPageState(search_query)
+        )
+
+        if response is None:
+            await update.message.reply_text(f"❌ Задачи по запросу '{search_query}' не найдены.")
+            return
 
+        text, reply_markup = response
+        await update.message.reply_text(
+            text,
+            parse_mode='Markdown',
+            disable_web_page_preview=True,
+            reply_markup=reply_markup
+        )
+
+    @unit_of_work(statement_timeout_ms=config.SEARCH_QUERY_TIMEOUT_MS)
+    async def search_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession):
+        """Кнопки «Назад»/«Дальше» под результатами /search: страница в том же сообщении"""
+        query = update.callback_query
         try:
-            problems = TaskService.search_problems(db, search_query)
+            state = SearchPageState.decode(query.data)
+        except ValueError:
+            await query.answer("Кнопка устарела, повторите поиск", show_alert=True)
+            return
 
-            if not problems:
-                await update.message.reply_text(f"❌ Задачи по запросу '{search_query}' не найдены.")
-                return
+        await query.answer()
+        response = await self._render_search(db, state)
+        if response is None:
+            await self._edit_message(query, f"❌ Задачи по запросу '{markdown(state.query)}' не найдены.", None)
+            return
+        await self._edit_message(query, *response)
+
+    async def _render_search(self, db: AsyncSession, state: SearchPageState):
+        """Страница результатов /search: текст и кнопки листания (None, если ничего не найдено)"""
+        problems, next_cursor = await self.query_cache.call_async(
+            AsyncTaskService.get_problems_page, db,
+            order='popular', cursor=state.cursor, backward=state.backward, limit=SEARCH_PAGE_SIZE,
+            profile='detail', search=state.query
+        )
 
-            if len(problems) == 1:
-                problem = problems[0]
-                response = self._format_problem_details(problem)
-            else:
-                response = f"🔍 **Найдено задач: {len(problems)}**\n\n"
-                for i, problem in enumerate(problems[:10], 1):
-                    response += f"{i}. **{problem.full_code}**: {problem.name}\n"
-                    response += f"   ⭐ Сложность: {problem.rating or 'N/A'}\n"
-                    response += f"   👥 Решений: {problem.solved_count}\n"
-                    response += f"   🔗 [Открыть]({problem.codeforces_url})\n\n"
+        if not problems:
+            return None
+
+        single_page = state.page == 0 and not state.backward and next_cursor is None
+        if single_page and len(problems) == 1:
+            return self._format_problem_details(problems[0]), None
 
-                if len(problems) > 10:
-                    response += f"ℹ️ Показано 10 из {len(problems)} задач"
+        if single_page:
+            header = f"🔍 **Найдено задач: {len(problems)}**\n\n"
+        else:
+            header = f"🔍 **Задачи по запросу '{markdown(state.query)}', страница {state.page + 1}:**\n\n"
+        response = header + self.renderer.listing(problems, 'search', start=state.page * SEARCH_PAGE_SIZE + 1)
 
+        keyboard = self._page_navigation(
+            lambda page, cursor, backward: SearchPageState(state.query, page, cursor, backward).encode(),
+            state.page, state.backward, problems, next_cursor
+        )
+        return response, InlineKeyboardMarkup(keyboard) if keyboard else None
+
+    @unit_of_work
+    async def random_problem(self, update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession):
+        """Обработчик команды /random (выбор из заранее собранных пулов)"""
+        try:
+            rating = int(context.args[0])
+        except (IndexError, ValueError):
+            await update.message.reply_text(
+                "🎲 Использование: /random <сложность> [тема]\n"
+                "Пример: /random 1200\n"
+                "Пример: /random 1200 dp"
+            )
+            return
+
+        topic = " ".join(context.args[1:]) or None
+
+        if problem_pools.built:
+            problem = problem_pools.pick(rating, topic)
+        else:
+            problems = await AsyncTaskService.get_problems_by_filters(db, rating, topic, limit=1)
+            problem = problems[0] if problems else None
+
+        if problem is None:
+            await update.message.reply_text(
+                f"❌ Не найдено задач с сложностью {rating}" + (f" и темой '{topic}'." if topic else ".")
+            )
+            return
+
+        await update.message.reply_text(
+            self.renderer.fragment(problem, 'random'),
+            parse_mode='Markdown',
+            disable_web_page_preview=True
+        )
+
+    @unit_of_work
+    async def stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession):
+        """Обработчик команды /stats (ответ из агрегата без сканирования задач)"""
+        try:
+            rating = int(context.args[0])
+        except (IndexError, ValueError):
+            await update.message.reply_text(
+                "📊 Использование: /stats <сложность> [тема]\n"
+                "Пример: /stats 1200\n"
+                "Пример: /stats 1200 dp"
+            )
+            return
+
+        topic = " ".join(context.args[1:]) or None
+
+        rows = await self.query_cache.call_async(AsyncTaskService.get_rating_topic_stats, db, rating, topic)
+
+        if not rows:
+            await update.message.reply_text(f"❌ Нет статистики для сложности {rating}.")
+            return
+
+        response = f"📊 **Статистика для сложности {rating}**\n\n"
+        for _, name, count, avg_solved in rows[:20]:
+            response += f"📚 {markdown(name)}: {count} задач, в среднем {avg_solved:.0f} решений\n"
+
+        await update.message.reply_text(response, parse_mode='Markdown')
+
+    @unit_of_work(statement_timeout_ms=config.SEARCH_QUERY_TIMEOUT_MS)
+    async def handle_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession):
+        """Обработка текстовых сообщений (для быстрого поиска)
+
+        До БД доходят только сообщения, похожие на запрос задачи (см. FreeTextFilter).
+        """
+        chat_id = update.effective_chat.id if update.effective_chat else None
+        kind, payload = self.text_filter.classify(chat_id, update.message.text)
+
+        if kind == CODES:
+            codes = payload[:MAX_CODES_PER_MESSAGE]
+            response = await self.single_flight.run(
+                ('codes', tuple(codes)), run_in_session, config.SEARCH_QUERY_TIMEOUT_MS, self._render_codes, codes
+            )
+            skipped = len(payload) - len(codes)
+            if skipped:
+                response += f"\n⚠️ Показаны первые {len(codes)} кодов, остальные {skipped} пропущены."
             await update.message.reply_text(
                 response,
                 parse_mode='Markdown',
                 disable_web_page_preview=True
             )
+            return
 
-        finally:
-            db.close()
-
-    async def handle_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработка текстовых сообщений (для быстрого поиска)"""
-        text = update.message.text
-
-        if any(char.isdigit() for char in text) and any(char.isalpha() for char in text):
-            db = SessionLocal()
-            try:
-                problems = TaskService.search_problems(db, text)
-                if problems:
-                    if len(problems) == 1:
-                        response = self._format_problem_details(problems[0])
-                    else:
-                        response = f"🔍 **Найдено задач по запросу '{text}':**\n\n"
-                        for i, problem in enumerate(problems[:5], 1):
-                            response += f"{i}. **{problem.full_code}**: {problem.name}\n"
-                            response += f"   🔗 [Открыть]({problem.codeforces_url})\n"
-
-                    await update.message.reply_text(
-                        response,
-                        parse_mode='Markdown',
-                        disable_web_page_preview=True
-                    )
-                    return
-
-            finally:
-                db.close()
+        if kind == CODE:
+            code = payload
+            response = await self.single_flight.run(
+                ('code', code), run_in_session, config.SEARCH_QUERY_TIMEOUT_MS, self._render_code, code
+            )
+            if response is not None:
+                await update.message.reply_text(
+                    response,
+                    parse_mode='Markdown',
+                    disable_web_page_preview=True
+                )
+                return
+            self.text_filter.remember_miss(code)
+        elif payload == RATE_LIMITED:
+            return
 
         await update.message.reply_text(
             "🤔 Не понял ваш запрос. Используйте:\n"
@@ -270,29 +626,80 @@ class TelegramBot:
             "/help - для справки"
         )
 
-    def _format_problem_details(self, problem: Problem) -> str:
+    async def _render_codes(self, db: AsyncSession, codes) -> str:
+        """Ответ на сообщение с несколькими кодами задач (один запрос к БД)"""
+        results = await AsyncTaskService.get_problems_by_codes(db, codes)
+
+        found = sum(1 for _, problem in results if problem is not None)
+        lines = [f"🔍 **Найдено задач: {found} из {len(results)}**\n\n"]
+        for i, ((contest_id, index), problem) in enumerate(results, 1):
+            if problem is None:
+                lines.append(f"{i}. **{contest_id}{index}**: ❌ не найдена\n")
+            else:
+                lines.append(f"{i}. {self.renderer.fragment(problem, 'rated')}")
+        return "".join(lines)
+
+    async def _render_code(self, db: AsyncSession, code) -> Optional[str]:
+        """Карточка задачи по коду из сообщения (поиск по индексу кода, None, если задачи нет)"""
+        contest_id, index = code
+        problem = await self.query_cache.call_async(AsyncTaskService.get_problem_by_code, db, contest_id, index)
+        return self._format_problem_details(problem) if problem else None
+
+    def _format_problem_details(self, problem: ProblemView) -> str:
         """Форматирование детальной информации о задаче"""
-        response = f"🎯 **Задача {problem.full_code}**\n\n"
-        response += f"**Название:** {problem.name}\n"
-        response += f"**Сложность:** {problem.rating or 'N/A'}\n"
-        response += f"**Количество решений:** {problem.solved_count}\n"
+        return self.renderer.details(problem)
 
-        if problem.topics:
-            topics = ", ".join([topic.name for topic in problem.topics])
-            response += f"**Темы:** {topics}\n"
+    @unit_of_work(statement_timeout_ms=config.INLINE_LATENCY_BUDGET_MS)
+    async def inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession):
+        """Обработчик inline-запросов (@bot 1850G) по индексу задач в памяти
 
-        response += f"\n🔗 [Открыть на Codeforces]({problem.codeforces_url})"
+        Результаты одинаковы для всех пользователей, поэтому Telegram кэширует
+        их на INLINE_CACHE_SECONDS и не присылает повторные запросы. Пока индекс
+        не собран, поиск идет в БД, но не дольше INLINE_LATENCY_BUDGET_MS.
+        """
+        inline_query = update.inline_query
+        query = inline_query.query.strip()
+        if not query:
+            await inline_query.answer([], cache_time=config.INLINE_CACHE_SECONDS)
+            return
 
-        return response
+        if problem_index.built:
+            problems = problem_index.search(query, limit=config.INLINE_RESULTS_LIMIT)
+        else:
+            problems = await self.query_cache.call_async(AsyncTaskService.search_problems, db, query)
+
+        results = [self._inline_result(problem) for problem in problems[:config.INLINE_RESULTS_LIMIT]]
+        await inline_query.answer(results, cache_time=config.INLINE_CACHE_SECONDS, is_personal=False)
+
+    def _inline_result(self, problem: ProblemView) -> InlineQueryResultArticle:
+        """Карточка задачи для inline-ответа"""
+        return InlineQueryResultArticle(
+            id=problem.full_code,
+            title=f"{problem.full_code}: {problem.name}",
+            description=f"⭐ {problem.rating or 'N/A'} · 👥 {problem.solved_count}",
+            url=problem.codeforces_url,
+            input_message_content=InputTextMessageContent(
+                self._format_problem_details(problem),
+                parse_mode='Markdown'
+            )
+        )
 
     async def cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Отмена текущей операции"""
+        if update.effective_chat:
+            cancel_chat_queries(update.effective_chat.id)
         await update.message.reply_text(
             "❌ Операция отменена.",
             reply_markup=None
         )
         return ConversationHandler.END
 
+    async def conversation_timeout(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Завершение диалога по таймауту: незавершенные запросы чата отменяются"""
+        if update.effective_chat:
+            cancel_chat_queries(update.effective_chat.id)
+        context.user_data.pop('rating', None)
+
 
 def run_bot():
     """Запуск бота (синхронная версия)"""
@@ -301,8 +708,30 @@ def run_bot():
         logger.error("Please set TELEGRAM_BOT_TOKEN in .env file")
         return
 
+    if config.BOT_MODE != 'polling' and not config.WEBHOOK_SECRET_TOKEN:
+        logger.error(f"{config.BOT_MODE} mode requires WEBHOOK_SECRET_TOKEN")
+        return
+    if config.BOT_MODE in ('webhook', 'sharded', 'dispatcher') and not config.WEBHOOK_URL:
+        logger.error(f"{config.BOT_MODE} mode requires WEBHOOK_URL")
+        return
+
+    if config.BOT_MODE == 'sharded':
+        run_sharded_bot()
+        return
+    if config.BOT_MODE == 'dispatcher':
+        asyncio.run(serve_dispatcher(get_worker_urls()))
+        return
+    if config.BOT_MODE == 'worker':
+        run_worker(config.WORKER_INDEX)
+        return
+
     bot = TelegramBot(config.TELEGRAM_BOT_TOKEN)
 
+    if config.BOT_MODE == 'webhook':
+        logger.info("Starting Telegram bot webhook server...")
+        asyncio.run(serve_webhook(bot.application))
+        return
+
     logger.info("Starting Telegram bot polling...")
 
     try:
@@ -0,0 +1,123 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple, Union
+from services.dataset import get_dataset_version
+from services.task_services import TaskService
+
+# Решения классификатора: несколько кодов, один код, отказ
+CODES = "codes"
+CODE = "code"
+DROP = "drop"
+
+# Причины отказа
+TOO_LONG = "too_long"
+NOT_A_QUERY = "not_a_query"
+KNOWN_MISS = "known_miss"
+RATE_LIMITED = "rate_limited"
+DROP_REASONS = (TOO_LONG, NOT_A_QUERY, KNOWN_MISS, RATE_LIMITED)
+
+# Записи о чатах с полным запасом запросов удаляются при таком размере
+CHAT_BUCKETS_CLEANUP_SIZE = 10000
+
+Code = Tuple[int, str]
+Decision = Tuple[str, Union[List[Code], Code, str]]
+
+
+class FreeTextFilter:
+    """Дешевая проверка текстовых сообщений до обращения к БД
+
+    До поиска доходят только сообщения не длиннее max_length, в которых
+    есть код задачи (1850A): несколько кодов ищутся одним запросом по кодам,
+    один — по индексу (contest_id, problem_index), а не поиском по тексту.
+    Коды, по которым задача не нашлась, помнятся до смены версии набора задач
+    или ttl_seconds. Каждому чату доступно rate_per_minute поисков в минуту
+    с запасом burst. Для каждой причины отказа ведется счетчик.
+    """
+
+    def __init__(self, max_length: int = 200, rate_per_minute: float = 20, burst: int = 5,
+                 miss_cache_size: int = 1024, ttl_seconds: float = 300):
+        self.max_length = max_length
+        self.refill_per_second = rate_per_minute / 60
+        self.burst = burst
+        self.miss_cache_size = miss_cache_size
+        self.ttl_seconds = ttl_seconds
+        self._buckets: Dict[Hashable, Tuple[float, float]] = {}
+        self._misses: "OrderedDict[Code, float]" = OrderedDict()
+        self._version = get_dataset_version()
+        self.passed = 0
+        self.dropped: Dict[str, int] = {reason: 0 for reason in DROP_REASONS}
+
+    def classify(self, chat_id: Optional[Hashable], text: str) -> Decision:
+        """Решение для сообщения: (CODES, коды), (CODE, код) или (DROP, причина)"""
+        if len(text) > self.max_length:
+            return self._drop(TOO_LONG)
+
+        codes = TaskService.extract_problem_codes(text)
+        if not codes:
+            return self._drop(NOT_A_QUERY)
+
+        if len(codes) > 1:
+            decision = (CODES, codes)
+        else:
+            code = codes[0]
+            if self._is_known_miss(code):
+                return self._drop(KNOWN_MISS)
+            decision = (CODE, code)
+
+        if not self._take_token(chat_id):
+            return self._drop(RATE_LIMITED)
+
+        self.passed += 1
+        return decision
+
+    def remember_miss(self, code: Code):
+        """Запоминание кода, по которому задача не нашлась"""
+        self._check_version()
+        self._misses[code] = time.monotonic() + self.ttl_seconds
+        self._misses.move_to_end(code)
+        while len(self._misses) > self.miss_cache_size:
+            self._misses.popitem(last=False)
+
+    def _drop(self, reason: str) -> Decision:
+        self.dropped[reason] += 1
+        return DROP, reason
+
+    def _check_version(self):
+        version = get_dataset_version()
+        if version != self._version:
+            self._misses.clear()
+            self._version = version
+
+    def _is_known_miss(self, code: Code) -> bool:
+        self._check_version()
+        expires_at = self._misses.get(code)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del self._misses[code]
+            return False
+        return True
+
+    def _take_token(self, chat_id: Optional[Hashable]) -> bool:
+        """Списание запроса из запаса чата (token bucket)"""
+        now = time.monotonic()
+        if len(self._buckets) > CHAT_BUCKETS_CLEANUP_SIZE:
+            self._buckets = {
+                key: bucket for key, bucket in self._buckets.items() if self._tokens(bucket, now) < self.burst
+            }
+
+        tokens = self._tokens(self._buckets.get(chat_id, (self.burst, now)), now)
+        if tokens < 1:
+            self._buckets[chat_id] = (tokens, now)
+            return False
+        self._buckets[chat_id] = (tokens - 1, now)
+        return True
+
+    def _tokens(self, bucket: Tuple[float, float], now: float) -> float:
+        tokens, updated_at = bucket
+        return min(self.burst, tokens + (now - updated_at) * self.refill_per_second)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Пропущенные к поиску сообщения и отказы по причинам"""
+        return {'passed': self.passed, **self.dropped}
@@ -0,0 +1,94 @@
+import asyncio
+import functools
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Set
+from sqlalchemy.exc import DBAPIError
+from telegram import Update
+from telegram.ext import ContextTypes, ConversationHandler
+from config.config import config
+from database.database import AsyncSessionLocal, STATEMENT_TIMEOUT_KEY, is_query_timeout
+
+logger = logging.getLogger(__name__)
+
+QUERY_TIMEOUT_REPLY = "⏳ Запрос выполнялся слишком долго и был прерван. Попробуйте уточнить запрос."
+
+# Задачи обработчиков, которые сейчас работают с БД, по chat_id
+_in_flight: Dict[int, Set[asyncio.Task]] = {}
+_abandoned: Set[asyncio.Task] = set()
+
+
+def cancel_chat_queries(chat_id: int) -> int:
+    """Отмена запросов к БД, которые выполняются для чата (после /cancel или таймаута диалога)"""
+    tasks = [task for task in _in_flight.get(chat_id, ()) if task is not asyncio.current_task()]
+    for task in tasks:
+        _abandoned.add(task)
+        task.cancel()
+    if tasks:
+        logger.info(f"Cancelled {len(tasks)} abandoned queries for chat {chat_id}")
+    return len(tasks)
+
+
+def unit_of_work(handler: Optional[Callable[..., Awaitable]] = None, *,
+                 statement_timeout_ms: Optional[int] = None):
+    """Одна сессия БД на обновление: обработчик получает ее последним аргументом
+
+    Сессия открывается до вызова обработчика и закрывается после него вместе
+    с транзакцией (обработчики бота только читают). Соединение берется из
+    пула только при первом запросе, поэтому обработчики, которые ответили
+    без БД, пул не занимают.
+
+    Каждый запрос сессии ограничен statement_timeout (по умолчанию
+    config.QUERY_TIMEOUT_MS): PostgreSQL прерывает его сам, а пользователь
+    получает короткий ответ вместо ожидания. Обработчик, чей диалог
+    отменен, прерывается через cancel_chat_queries.
+    """
+    if handler is None:
+        return functools.partial(unit_of_work, statement_timeout_ms=statement_timeout_ms)
+
+    timeout_ms = statement_timeout_ms or config.QUERY_TIMEOUT_MS
+
+    @functools.wraps(handler)
+    async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        task = asyncio.current_task()
+        chat_id = update.effective_chat.id if update.effective_chat else None
+        _in_flight.setdefault(chat_id, set()).add(task)
+        try:
+            async with AsyncSessionLocal() as db:
+                db.info[STATEMENT_TIMEOUT_KEY] = timeout_ms
+                return await handler(self, update, context, db)
+        except DBAPIError as e:
+            if not is_query_timeout(e):
+                raise
+            logger.warning(f"{handler.__name__}: query cancelled after {timeout_ms} ms")
+            if update.effective_message:
+                await update.effective_message.reply_text(QUERY_TIMEOUT_REPLY)
+            return ConversationHandler.END
+        except asyncio.CancelledError:
+            if task not in _abandoned:
+                raise
+            logger.info(f"{handler.__name__}: abandoned by chat {chat_id}")
+            return ConversationHandler.END
+        finally:
+            _abandoned.discard(task)
+            chat_tasks = _in_flight.get(chat_id)
+            if chat_tasks is not None:
+                chat_tasks.discard(task)
+                if not chat_tasks:
+                    del _in_flight[chat_id]
+
+    return wrapper
+
+
+async def run_in_session(statement_timeout_ms: Optional[int], func: Callable, *args):
+    """func(db, *args) в собственной сессии БД (обычная функция — через run_sync)
+
+    Для запросов, объединенных через SingleFlight: их результат ждут
+    обновления разных чатов, поэтому запрос не выполняется в сессии одного
+    из них — она закрывается вместе с его обработчиком (в том числе после
+    /cancel) и не рассчитана на работу из нескольких задач сразу.
+    """
+    async with AsyncSessionLocal() as db:
+        db.info[STATEMENT_TIMEOUT_KEY] = statement_timeout_ms or config.QUERY_TIMEOUT_MS
+        if asyncio.iscoroutinefunction(func):
+            return await func(db, *args)
+        return await db.run_sync(func, *args)
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Dict, Hashable, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+# Команды, которые обрабатываются вне очереди чата: они прерывают его текущий запрос
+PRIORITY_COMMANDS = ('/cancel',)
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Параллельная обработка обновлений с сохранением порядка внутри чата
+
+    Обновления разных чатов обрабатываются одновременно, не больше
+    max_concurrent_updates сразу; обновления одного чата — строго по очереди,
+    поэтому состояния ConversationHandler не путаются. /cancel обходит очередь
+    чата, чтобы отменить выполняющийся запрос, а не ждать его.
+
+    Ожидание очереди чата не занимает слот обработки: слот берется, только
+    когда подошла очередь обновления. Базовый семафор PTB ограничивает лишь
+    число принятых, но еще не обработанных обновлений (max_pending_updates).
+    """
+
+    __slots__ = ('_workers', '_chat_locks', '_chat_waiters',
+                 'processed', 'waiting', 'max_waiting', 'wait_total', 'wait_max')
+
+    def __init__(self, max_concurrent_updates: int, max_pending_updates: int = 1024):
+        super().__init__(max(max_pending_updates, max_concurrent_updates))
+        self._workers = asyncio.Semaphore(max_concurrent_updates)
+        self._chat_locks: Dict[Hashable, asyncio.Lock] = {}
+        self._chat_waiters: Dict[Hashable, int] = {}
+        self.processed = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @staticmethod
+    def chat_key(update: Any) -> Optional[Hashable]:
+        """Ключ очереди обновления: чат, иначе пользователь; None — без очереди"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_message and update.effective_message.text:
+            if update.effective_message.text.split(maxsplit=1)[0].split('@')[0] in PRIORITY_COMMANDS:
+                return None
+        if update.effective_chat:
+            return update.effective_chat.id
+        if update.effective_user:
+            return ('user', update.effective_user.id)
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self.chat_key(update)
+        queued_at = time.monotonic()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+
+        lock = None
+        if key is not None:
+            lock = self._chat_locks.setdefault(key, asyncio.Lock())
+            self._chat_waiters[key] = self._chat_waiters.get(key, 0) + 1
+
+        started = False
+        try:
+            if lock is not None:
+                await lock.acquire()
+            try:
+                async with self._workers:
+                    started = True
+                    self._observe_wait(time.monotonic() - queued_at)
+                    await coroutine
+            finally:
+                if lock is not None:
+                    lock.release()
+        finally:
+            if not started:
+                self.waiting -= 1
+                getattr(coroutine, 'close', lambda: None)()
+            if key is not None:
+                self._chat_waiters[key] -= 1
+                if not self._chat_waiters[key]:
+                    del self._chat_waiters[key]
+                    del self._chat_locks[key]
+
+    def _observe_wait(self, seconds: float):
+        self.waiting -= 1
+        self.processed += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """Глубина очереди, число обрабатываемых обновлений и время ожидания"""
+        return {
+            'waiting': self.waiting,
+            'max_waiting': self.max_waiting,
+            'in_progress': self.current_concurrent_updates - self.waiting,
+            'processed': self.processed,
+            'wait_avg_ms': 1000 * self.wait_total / self.processed if self.processed else 0.0,
+            'wait_max_ms': 1000 * self.wait_max,
+        }
@@ -0,0 +1,191 @@
+import asyncio
+import hmac
+import json
+import logging
+import signal
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Dict, Optional
+from telegram import Update
+from telegram.ext import Application
+from config.config import config
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = 'x-telegram-bot-api-secret-token'
+
+# Ограничение на строку запроса и заголовки; тело ограничивается отдельно
+MAX_HEADER_BYTES = 16 * 1024
+READ_TIMEOUT_SECONDS = 10
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: HTTPStatus):
+        super().__init__(status.phrase)
+        self.status = status
+
+
+class WebhookServer:
+    """HTTP-приемник обновлений Telegram на asyncio без сторонних зависимостей
+
+    Принимает только POST на заданный путь с правильным секретным токеном
+    (заголовок X-Telegram-Bot-Api-Secret-Token) и телом не больше
+    max_body_bytes. Разобранный JSON-объект передается в on_update; ответ 200
+    отправляется после того, как обновление поставлено в очередь, поэтому
+    Telegram повторит доставку, если приемник упал раньше.
+    """
+
+    def __init__(self, on_update: Callable[[Dict[str, Any]], Awaitable], secret_token: str,
+                 path: str = '/telegram', host: str = '0.0.0.0', port: int = 8443,
+                 max_body_bytes: int = 1024 * 1024):
+        self.on_update = on_update
+        self.secret_token = secret_token
+        self.path = path
+        self.host = host
+        self.port = port
+        self.max_body_bytes = max_body_bytes
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.accepted = 0
+        self.rejected = 0
+
+    async def start(self):
+        """Запуск прослушивания порта"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_HEADER_BYTES)
+        logger.info(f"Webhook server listening on {self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        """Остановка приема соединений"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    @property
+    def sockets(self):
+        """Сокеты сервера (для определения порта, выбранного системой)"""
+        return self._server.sockets if self._server else ()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            payload = await asyncio.wait_for(self._read_update(reader), READ_TIMEOUT_SECONDS)
+            await self.on_update(payload)
+            self.accepted += 1
+            status = HTTPStatus.OK
+        except _HTTPError as e:
+            self.rejected += 1
+            status = e.status
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            status = HTTPStatus.REQUEST_TIMEOUT
+        except Exception as e:
+            logger.error(f"Webhook update handling error: {e}")
+            status = HTTPStatus.INTERNAL_SERVER_ERROR
+
+        try:
+            writer.write(
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Length: 0\r\nConnection: close\r\n\r\n".encode('ascii')
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_update(self, reader: asyncio.StreamReader) -> Dict[str, Any]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise _HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+        except asyncio.IncompleteReadError:
+            raise _HTTPError(HTTPStatus.BAD_REQUEST)
+
+        request_line, *header_lines = head.decode('latin-1').split("\r\n")
+        try:
+            method, target, _ = request_line.split(" ", 2)
+        except ValueError:
+            raise _HTTPError(HTTPStatus.BAD_REQUEST)
+
+        if target.split("?", 1)[0] != self.path:
+            raise _HTTPError(HTTPStatus.NOT_FOUND)
+        if method != 'POST':
+            raise _HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+
+        headers = {}
+        for line in header_lines:
+            name, separator, value = line.partition(":")
+            if separator:
+                headers[name.strip().lower()] = value.strip()
+
+        # Заголовки разобраны как latin-1, а compare_digest не принимает не-ASCII строки
+        secret_token = headers.get(SECRET_TOKEN_HEADER, '').encode('latin-1')
+        if not hmac.compare_digest(secret_token, self.secret_token.encode()):
+            raise _HTTPError(HTTPStatus.FORBIDDEN)
+
+        try:
+            content_length = int(headers['content-length'])
+        except (KeyError, ValueError):
+            raise _HTTPError(HTTPStatus.LENGTH_REQUIRED)
+        if content_length < 0 or content_length > self.max_body_bytes:
+            raise _HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+
+        try:
+            body = await reader.readexactly(content_length)
+            payload = json.loads(body)
+        except (asyncio.IncompleteReadError, ValueError):
+            raise _HTTPError(HTTPStatus.BAD_REQUEST)
+        # Обновление Telegram — всегда JSON-объект
+        if not isinstance(payload, dict):
+            raise _HTTPError(HTTPStatus.BAD_REQUEST)
+        return payload
+
+
+async def wait_for_stop_signal():
+    """Ожидание SIGINT/SIGTERM"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+
+async def serve_webhook(application: Application, host: Optional[str] = None, port: Optional[int] = None,
+                        register_webhook: bool = True):
+    """Работа бота через вебхук до SIGINT/SIGTERM
+
+    С register_webhook=False адрес в Telegram не регистрируется: так работают
+    воркеры, которым обновления пересылает диспетчер.
+    """
+
+    async def enqueue(payload: Dict[str, Any]):
+        await application.update_queue.put(Update.de_json(payload, application.bot))
+
+    server = WebhookServer(
+        enqueue,
+        secret_token=config.WEBHOOK_SECRET_TOKEN,
+        path=config.WEBHOOK_PATH,
+        host=host or config.WEBHOOK_LISTEN,
+        port=port or config.WEBHOOK_PORT,
+        max_body_bytes=config.WEBHOOK_MAX_BODY_BYTES
+    )
+
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        await server.start()
+        if register_webhook:
+            await application.bot.set_webhook(
+                url=config.WEBHOOK_URL,
+                secret_token=config.WEBHOOK_SECRET_TOKEN,
+                allowed_updates=Update.ALL_TYPES
+            )
+        try:
+            await wait_for_stop_signal()
+        finally:
+            await server.stop()
+            await application.stop()
+
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+    logger.info(f"Webhook server stopped: {server.accepted} updates accepted, {server.rejected} rejected")
@@ -1,8 +1,13 @@
-from sqlalchemy import Column, Integer, String, Table, ForeignKey
+import random
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Table, ForeignKey, Index, JSON
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
 
+# Темы кодируются битами Problem.topic_mask (знаковый BIGINT — 63 бита)
+MAX_TOPIC_BITS = 63
+
 problem_topic_association = Table(
     'problem_topic_association',
     Base.metadata,
@@ -14,6 +19,15 @@ problem_topic_association = Table(
 class Problem(Base):
     """Модель задачи Codeforces"""
     __tablename__ = 'problems'
+    __table_args__ = (
+        Index('ix_problems_code', 'contest_id', 'problem_index'),
+        Index('ix_problems_popular', 'solved_count', 'id'),
+        Index('ix_problems_recent', 'contest_id', 'id'),
+        Index('ix_problems_rating', 'rating', 'id'),
+        Index('ix_problems_random', 'random_key'),
+        Index('ix_problems_rating_random', 'rating', 'random_key'),
+        Index('ix_problems_tags', 'tags', postgresql_using='gin'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     contest_id = Column(Integer, nullable=False)
@@ -21,6 +35,9 @@ class Problem(Base):
     name = Column(String(500), nullable=False)
     rating = Column(Integer)
     solved_count = Column(Integer, default=0)
+    topic_mask = Column(BigInteger, nullable=False, default=0, server_default='0')
+    random_key = Column(Float, nullable=False, default=random.random)
+    tags = Column(ARRAY(String(100)).with_variant(JSON(), 'sqlite'), nullable=False, default=list)
 
     topics = relationship("Topic", secondary=problem_topic_association, back_populates="problems")
 
@@ -44,8 +61,35 @@ class Topic(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(100), unique=True, nullable=False)
+    bit = Column(Integer, unique=True)
 
     problems = relationship("Problem", secondary=problem_topic_association, back_populates="topics")
 
     def __repr__(self):
         return f"Topic({self.name})"
+
+
+class RatingTopicStat(Base):
+    """Агрегат по задачам с заданной сложностью и темой (пересчитывается после загрузки)"""
+    __tablename__ = 'rating_topic_stats'
+
+    rating = Column(Integer, primary_key=True)
+    topic_id = Column(Integer, ForeignKey('topics.id'), primary_key=True)
+    problem_count = Column(Integer, nullable=False, default=0)
+    avg_solved_count = Column(Float, nullable=False, default=0)
+
+    topic = relationship("Topic")
+
+    def __repr__(self):
+        return f"RatingTopicStat({self.rating}, {self.topic_id}: {self.problem_count})"
+
+
+class DatasetVersion(Base):
+    """Версия набора задач, общая для всех процессов (одна строка, растет после каждой загрузки)"""
+    __tablename__ = 'dataset_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"DatasetVersion({self.version})"
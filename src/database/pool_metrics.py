@@ -0,0 +1,64 @@
+import threading
+import time
+from typing import Dict, Type
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool
+
+
+class PoolMetrics:
+    """Счетчики выдачи соединений из пула: количество, время ожидания, таймауты
+
+    Время ожидания меряется от запроса соединения до его выдачи и включает
+    ожидание свободного соединения, открытие нового и pre-ping.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def observe(self, seconds: float, timed_out: bool = False):
+        """Учет одной выдачи соединения"""
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self, pool: Pool) -> Dict[str, float]:
+        """Счетчики ожидания и текущее использование пула"""
+        with self._lock:
+            stats = {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': 1000 * self.wait_total / self.checkouts if self.checkouts else 0.0,
+                'wait_max_ms': 1000 * self.wait_max,
+            }
+        stats.update({
+            'pool_size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+        })
+        return stats
+
+
+def metered_pool_class(base: Type[Pool], metrics: PoolMetrics) -> Type[Pool]:
+    """Класс пула, который записывает время выдачи соединений в metrics"""
+
+    class MeteredPool(base):
+        def connect(self):
+            started = time.monotonic()
+            try:
+                connection = super().connect()
+            except PoolTimeoutError:
+                metrics.observe(time.monotonic() - started, timed_out=True)
+                raise
+            metrics.observe(time.monotonic() - started)
+            return connection
+
+    MeteredPool.__name__ = MeteredPool.__qualname__ = f"Metered{base.__name__}"
+    return MeteredPool
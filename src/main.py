@@ -3,6 +3,7 @@ import threading
 import time
 from database.database import init_db
 from bot.telegram_bot import run_bot
+from config.config import config
 
 logging.basicConfig(
     level=logging.INFO,
@@ -48,7 +49,7 @@ def main():
     parser_thread = threading.Thread(target=run_parser_daemon, daemon=True)
     parser_thread.start()
     logger.info("✅ Parser daemon started")
-    logger.info("🤖 Starting Telegram bot...")
+    logger.info(f"🤖 Starting Telegram bot ({config.BOT_MODE} mode)...")
     run_bot()
 
 
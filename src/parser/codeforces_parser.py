@@ -1,9 +1,11 @@
 import requests
 import logging
 from typing import List, Dict, Any, Optional
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from database.models import Problem, Topic
+from database.models import Problem, Topic, MAX_TOPIC_BITS
 from config.config import config
+from services.dataset import bump_stored_dataset_version, mark_dataset_updated
 
 logger = logging.getLogger(__name__)
 
@@ -80,9 +82,14 @@ class CodeforcesParser:
                         f"{problem_data.get('index', '?')}: {e}")
                     continue
 
+            self._refresh_topic_columns(db)
+            self._refresh_rating_topic_stats(db)
+            # Версия растет в той же транзакции, поэтому воркеры бота увидят ее вместе с задачами
+            version = bump_stored_dataset_version(db)
             db.commit()
             logger.info(
                 f"Successfully processed {processed_count} new problems, updated {skipped_count} existing problems")
+            mark_dataset_updated(db, version)
             return True
 
         except Exception as e:
@@ -128,6 +135,46 @@ class CodeforcesParser:
 
             problem.topics.append(topic)
 
+    def _refresh_topic_columns(self, db: Session):
+        """Назначение битов новым темам и пересчет маски и массива тем у задач"""
+        db.flush()
+        db.execute(text("""
+            UPDATE topics SET bit = numbered.bit
+            FROM (
+                SELECT id, (SELECT COALESCE(MAX(bit), -1) FROM topics)
+                           + ROW_NUMBER() OVER (ORDER BY id) AS bit
+                FROM topics WHERE bit IS NULL
+            ) AS numbered
+            WHERE topics.id = numbered.id AND numbered.bit < :max_bits
+        """), {'max_bits': MAX_TOPIC_BITS})
+        db.execute(text("""
+            UPDATE problems SET topic_mask = agg.mask, tags = agg.tags
+            FROM (
+                SELECT p.id,
+                       COALESCE(BIT_OR(CAST(1 AS BIGINT) << t.bit), 0) AS mask,
+                       COALESCE(ARRAY_AGG(t.name ORDER BY t.name) FILTER (WHERE t.name IS NOT NULL),
+                                CAST('{}' AS VARCHAR(100)[])) AS tags
+                FROM problems p
+                LEFT JOIN problem_topic_association a ON a.problem_id = p.id
+                LEFT JOIN topics t ON t.id = a.topic_id
+                GROUP BY p.id
+            ) AS agg
+            WHERE problems.id = agg.id
+              AND (problems.topic_mask IS DISTINCT FROM agg.mask OR problems.tags IS DISTINCT FROM agg.tags)
+        """))
+
+    def _refresh_rating_topic_stats(self, db: Session):
+        """Пересчет агрегата (сложность, тема) -> количество задач и среднее число решений"""
+        db.execute(text("DELETE FROM rating_topic_stats"))
+        db.execute(text("""
+            INSERT INTO rating_topic_stats (rating, topic_id, problem_count, avg_solved_count)
+            SELECT p.rating, a.topic_id, COUNT(*), AVG(COALESCE(p.solved_count, 0))
+            FROM problems p
+            JOIN problem_topic_association a ON a.problem_id = p.id
+            WHERE p.rating IS NOT NULL
+            GROUP BY p.rating, a.topic_id
+        """))
+
     def _update_problem_topics(self, problem: Problem, tags: List[str]):
         """Обновление тем задачи (упрощенная версия)"""
         pass
@@ -0,0 +1,80 @@
+import logging
+import threading
+from typing import Callable, List, Optional
+from sqlalchemy.orm import Session
+from database.models import DatasetVersion
+
+logger = logging.getLogger(__name__)
+
+# Единственная строка таблицы dataset_version
+DATASET_VERSION_ROW_ID = 1
+
+_version = 0
+_lock = threading.Lock()
+_listeners: List[Callable[[Session], None]] = []
+
+
+def get_dataset_version() -> int:
+    """Версия набора задач, известная этому процессу (растет после каждой загрузки)"""
+    return _version
+
+
+def on_dataset_updated(callback: Callable[[Session], None]):
+    """Регистрация обработчика, вызываемого после каждой загрузки задач"""
+    with _lock:
+        if callback not in _listeners:
+            _listeners.append(callback)
+    return callback
+
+
+def bump_stored_dataset_version(db: Session) -> int:
+    """Увеличение общей версии в таблице dataset_version (в транзакции загрузки, до коммита)"""
+    updated = db.query(DatasetVersion).filter(DatasetVersion.id == DATASET_VERSION_ROW_ID).update(
+        {DatasetVersion.version: DatasetVersion.version + 1}, synchronize_session=False
+    )
+    if not updated:
+        db.add(DatasetVersion(id=DATASET_VERSION_ROW_ID, version=1))
+        db.flush()
+    return get_stored_dataset_version(db)
+
+
+def get_stored_dataset_version(db: Session) -> int:
+    """Общая версия набора задач из БД (0, если загрузок еще не было)"""
+    version = db.query(DatasetVersion.version).filter(DatasetVersion.id == DATASET_VERSION_ROW_ID).scalar()
+    return version or 0
+
+
+def mark_dataset_updated(db: Session, version: Optional[int] = None) -> int:
+    """Переход процесса на новую версию набора задач и уведомление обработчиков
+
+    version — общая версия из БД; без нее версия процесса просто увеличивается.
+    """
+    global _version
+
+    with _lock:
+        _version = _version + 1 if version is None else version
+        version = _version
+        listeners = list(_listeners)
+
+    logger.info(f"Dataset version bumped to {version}")
+
+    for callback in listeners:
+        try:
+            callback(db)
+        except Exception as e:
+            logger.error(f"Error in dataset update listener {getattr(callback, '__name__', callback)}: {e}")
+
+    return version
+
+
+def sync_dataset_version(db: Session, force: bool = False) -> bool:
+    """Проверка общей версии: если загрузка прошла в другом процессе, обработчики вызываются здесь
+
+    С force=True обработчики вызываются и без смены версии. Возвращает True,
+    если обработчики были вызваны.
+    """
+    version = get_stored_dataset_version(db)
+    if version == _version and not force:
+        return False
+    mark_dataset_updated(db, version)
+    return True
@@ -0,0 +1,91 @@
+import bisect
+import logging
+import re
+import threading
+from typing import Dict, List, Tuple
+from sqlalchemy.orm import Session
+from services.problem_views import ProblemView, problem_view_columns, build_problem_views
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r"\w+")
+CODE_QUERY_RE = re.compile(r"^\d+[a-z]?\d?$")
+
+# Сколько совпадений по префиксу просматривается до сортировки по популярности
+MAX_CANDIDATES = 1000
+
+
+class ProblemIndex:
+    """Префиксный индекс задач по коду и словам названия в памяти
+
+    Ключи (код задачи в нижнем регистре и каждое слово названия) хранятся
+    в отсортированном списке, поэтому поиск по префиксу — двоичный поиск
+    и проход по соседним ключам, без запросов к БД. Индекс пересобирается
+    целиком после загрузки задач и заменяется атомарно.
+    """
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._positions: List[int] = []
+        self._problems: List[ProblemView] = []
+        self._lock = threading.Lock()
+        self.built = False
+
+    def rebuild(self, db: Session):
+        """Пересборка индекса одним запросом"""
+        rows = db.query(*problem_view_columns('detail')).all()
+        self.build(build_problem_views(rows, 'detail'))
+
+    def build(self, problems: List[ProblemView]):
+        """Построение индекса по списку задач"""
+        entries: List[Tuple[str, int]] = []
+        for position, problem in enumerate(problems):
+            entries.append((problem.full_code.lower(), position))
+            for word in set(WORD_RE.findall(problem.name.lower())):
+                entries.append((word, position))
+        entries.sort()
+
+        with self._lock:
+            self._keys = [key for key, _ in entries]
+            self._positions = [position for _, position in entries]
+            self._problems = list(problems)
+            self.built = True
+
+        logger.info(f"Problem index rebuilt: {len(problems)} problems, {len(entries)} keys")
+
+    def _prefix_matches(self, keys: List[str], positions: List[int], prefix: str) -> Dict[int, None]:
+        matches: Dict[int, None] = {}
+        start = bisect.bisect_left(keys, prefix)
+        for i in range(start, len(keys)):
+            if not keys[i].startswith(prefix) or len(matches) >= MAX_CANDIDATES:
+                break
+            matches[positions[i]] = None
+        return matches
+
+    def search(self, query: str, limit: int = 20) -> List[ProblemView]:
+        """Задачи, у которых код начинается с запроса или каждое слово запроса — префикс слова названия"""
+        words = WORD_RE.findall(query.lower())
+        if not words:
+            return []
+
+        with self._lock:
+            keys, positions, problems = self._keys, self._positions, self._problems
+
+        compact = "".join(words)
+        if len(words) <= 2 and CODE_QUERY_RE.match(compact):
+            candidates = self._prefix_matches(keys, positions, compact)
+            found = [problems[position] for position in candidates]
+            found.sort(key=lambda p: (p.full_code.lower() != compact, -p.contest_id, p.problem_index))
+            return found[:limit]
+
+        candidates = self._prefix_matches(keys, positions, max(words, key=len))
+        found = []
+        for position in candidates:
+            problem = problems[position]
+            name_words = WORD_RE.findall(problem.name.lower())
+            if all(any(name_word.startswith(word) for name_word in name_words) for word in words):
+                found.append(problem)
+        return sorted(found, key=lambda p: p.solved_count, reverse=True)[:limit]
+
+
+problem_index = ProblemIndex()
@@ -0,0 +1,97 @@
+import logging
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from database.models import Problem
+from services.problem_views import ProblemView, problem_view_columns, build_problem_views
+
+logger = logging.getLogger(__name__)
+
+PoolKey = Tuple[int, Optional[str]]
+
+
+class _Pool:
+    """Перемешанный список задач с позицией чтения"""
+
+    __slots__ = ('items', 'position')
+
+    def __init__(self, items: List[ProblemView]):
+        self.items = items
+        self.position = 0
+
+    def pop(self) -> ProblemView:
+        if self.position == len(self.items):
+            random.shuffle(self.items)
+            self.position = 0
+        item = self.items[self.position]
+        self.position += 1
+        return item
+
+
+class ProblemPools:
+    """Пулы задач по (сложность, тема) и по сложности для случайного выбора без запросов к БД
+
+    Пулы пересобираются целиком после каждой загрузки задач. Выбор — сдвиг
+    позиции в перемешанном списке; когда список исчерпан, он перемешивается
+    заново, поэтому задачи не повторяются, пока не будут показаны все.
+    """
+
+    def __init__(self):
+        self._pools: Dict[PoolKey, _Pool] = {}
+        self._lock = threading.Lock()
+        self.built = False
+
+    def rebuild(self, db: Session):
+        """Пересборка пулов одним запросом"""
+        rows = db.query(*problem_view_columns('detail')).filter(Problem.rating.isnot(None)).all()
+
+        grouped: Dict[PoolKey, List[ProblemView]] = {}
+        for problem in build_problem_views(rows, 'detail'):
+            grouped.setdefault((problem.rating, None), []).append(problem)
+            for topic_name in problem.topics:
+                grouped.setdefault((problem.rating, topic_name), []).append(problem)
+
+        pools = {}
+        for key, items in grouped.items():
+            random.shuffle(items)
+            pools[key] = _Pool(items)
+
+        with self._lock:
+            self._pools = pools
+            self.built = True
+
+        logger.info(f"Problem pools rebuilt: {len(rows)} problems in {len(pools)} pools")
+
+    def pick(self, rating: int, topic: Optional[str] = None) -> Optional[ProblemView]:
+        """Случайная задача с заданной сложностью (и темой)"""
+        with self._lock:
+            pool = self._pools.get((rating, topic))
+            return pool.pop() if pool else None
+
+    def pick_many(self, rating: int, topic: Optional[str] = None, count: int = 10) -> List[ProblemView]:
+        """Несколько случайных задач из разных контестов"""
+        with self._lock:
+            pool = self._pools.get((rating, topic))
+            if not pool:
+                return []
+
+            picked = []
+            seen_contests = set()
+            for _ in range(len(pool.items)):
+                problem = pool.pop()
+                if problem.contest_id in seen_contests:
+                    continue
+                seen_contests.add(problem.contest_id)
+                picked.append(problem)
+                if len(picked) == count:
+                    break
+            return picked
+
+    def size(self, rating: int, topic: Optional[str] = None) -> int:
+        """Количество задач в пуле"""
+        pool = self._pools.get((rating, topic))
+        return len(pool.items) if pool else 0
+
+
+problem_pools = ProblemPools()
@@ -0,0 +1,81 @@
+from typing import List, Sequence, Tuple
+from database.models import Problem
+
+# Профили загрузки: list — только колонки задачи,
+# detail — плюс денормализованный массив тем; оба читаются одним запросом к problems
+LOADING_PROFILES = ('list', 'detail')
+
+# Колонки задачи, из которых строится ProblemView (в порядке аргументов конструктора)
+PROBLEM_VIEW_COLUMNS = (
+    Problem.id, Problem.contest_id, Problem.problem_index, Problem.name, Problem.rating, Problem.solved_count
+)
+
+
+class ProblemView:
+    """Неизменяемое представление задачи, не привязанное к сессии БД"""
+
+    __slots__ = ('id', 'contest_id', 'problem_index', 'name', 'rating', 'solved_count', 'topics')
+
+    def __init__(self, id: int, contest_id: int, problem_index: str, name: str,
+                 rating, solved_count, topics: Sequence[str] = ()):
+        setattr_ = object.__setattr__
+        setattr_(self, 'id', id)
+        setattr_(self, 'contest_id', contest_id)
+        setattr_(self, 'problem_index', problem_index)
+        setattr_(self, 'name', name)
+        setattr_(self, 'rating', rating)
+        setattr_(self, 'solved_count', solved_count or 0)
+        setattr_(self, 'topics', tuple(topics))
+
+    @classmethod
+    def from_row(cls, row: Sequence, topics: Sequence[str] = ()) -> "ProblemView":
+        """Создание из строки запроса по PROBLEM_VIEW_COLUMNS"""
+        return cls(*row, topics=topics)
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, key):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other):
+        if not isinstance(other, ProblemView):
+            return NotImplemented
+        return (self.contest_id, self.problem_index) == (other.contest_id, other.problem_index)
+
+    def __hash__(self):
+        return hash((self.contest_id, self.problem_index))
+
+    def __reduce__(self):
+        return ProblemView, (self.id, self.contest_id, self.problem_index, self.name,
+                             self.rating, self.solved_count, self.topics)
+
+    def __repr__(self):
+        return f"ProblemView({self.contest_id}{self.problem_index}: {self.name}, rating: {self.rating})"
+
+    @property
+    def full_code(self):
+        """Полный код задачи (например: 123A)"""
+        return f"{self.contest_id}{self.problem_index}"
+
+    @property
+    def codeforces_url(self):
+        """URL задачи на Codeforces"""
+        return f"https://codeforces.com/problemset/problem/{self.contest_id}/{self.problem_index}"
+
+
+def problem_view_columns(profile: str = 'list') -> Tuple:
+    """Колонки запроса задач для профиля загрузки"""
+    if profile not in LOADING_PROFILES:
+        raise ValueError(f"Неизвестный профиль загрузки: {profile}")
+
+    if profile == 'detail':
+        return PROBLEM_VIEW_COLUMNS + (Problem.tags,)
+    return PROBLEM_VIEW_COLUMNS
+
+
+def build_problem_views(rows: Sequence[Sequence], profile: str = 'list') -> List[ProblemView]:
+    """Создание представлений задач из строк запроса по problem_view_columns(profile)"""
+    if profile == 'detail':
+        return [ProblemView.from_row(row[:-1], row[-1] or ()) for row in rows]
+    return [ProblemView.from_row(row) for row in rows]
@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from services.dataset import get_dataset_version
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    """LRU-кэш результатов методов TaskService с ограничением размера и времени жизни
+
+    Ключ — метод и его аргументы (кроме сессии). Кэш сбрасывается целиком,
+    когда меняется версия набора задач, поэтому между загрузками повторные
+    запросы не доходят до БД. TTL ограничивает устаревание, если загрузка
+    выполняется в другом процессе.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = get_dataset_version()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(func: Callable, args: tuple, kwargs: Dict[str, Any]):
+        """Ключ кэша для вызова метода"""
+        return func, args, tuple(sorted(kwargs.items()))
+
+    def _lookup(self, key):
+        version = get_dataset_version()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return False, None
+
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key, value, version: int):
+        if version != self._version:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def call(self, func: Callable, db: Session, *args, **kwargs):
+        """Результат func(db, *args, **kwargs) из кэша или из БД"""
+        key = self.make_key(func, args, kwargs)
+
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            version = self._version
+
+        value = func(db, *args, **kwargs)
+
+        with self._lock:
+            self._store(key, value, version)
+
+        return value
+
+    async def call_async(self, func: Callable, db: AsyncSession, *args, **kwargs):
+        """Результат await func(db, *args, **kwargs) из кэша или из БД"""
+        key = self.make_key(func, args, kwargs)
+
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            version = self._version
+
+        value = await func(db, *args, **kwargs)
+
+        with self._lock:
+            self._store(key, value, version)
+
+        return value
+
+    def clear(self):
+        """Очистка кэша"""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Счетчики попаданий, промахов и вытеснений"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+            }
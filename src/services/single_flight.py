@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Объединение одинаковых одновременных запросов в один
+
+    Первый вызов с данным ключом запускает функцию (корутину — как задачу
+    в цикле событий, обычную функцию — в пуле потоков), остальные
+    вызовы с тем же ключом до ее завершения ждут тот же результат. Ожидание
+    защищено от отмены: если один из ожидающих ушел, запрос к БД доводится
+    до конца для остальных; корутина отменяется, только когда ушли все.
+    Результат не сохраняется после завершения, поэтому устаревших данных
+    слой не добавляет.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self.executed = 0
+        self.shared = 0
+
+    async def run(self, key: Hashable, func: Callable, *args) -> Any:
+        """Выполнение func(*args) или присоединение к уже идущему вызову с ключом key"""
+        future = self._calls.get(key)
+
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if asyncio.iscoroutinefunction(func):
+                future = asyncio.ensure_future(func(*args))
+            else:
+                future = loop.run_in_executor(None, func, *args)
+            self._calls[key] = future
+            future.add_done_callback(lambda _: self._calls.pop(key, None))
+            self.executed += 1
+        else:
+            self.shared += 1
+
+        self._waiters[future] = self._waiters.get(future, 0) + 1
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if self._waiters[future] == 1 and not future.done():
+                future.cancel()
+            raise
+        finally:
+            self._waiters[future] -= 1
+            if not self._waiters[future]:
+                del self._waiters[future]
+
+    @property
+    def in_flight(self) -> int:
+        """Количество выполняющихся сейчас запросов"""
+        return len(self._calls)
@@ -1,43 +1,222 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, or_
-from database.models import Problem, Topic
+import random
+import re
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import String, and_, cast, or_, tuple_
+from database.models import Problem, Topic, RatingTopicStat
+from services.topic_filter import parse_topic_expression, topic_expression_clause
+from services.problem_views import ProblemView, problem_view_columns, build_problem_views
+
+# Порядки выдачи: ключевые колонки (последняя — id для однозначности) и направление
+PROBLEM_ORDERINGS = {
+    'popular': ((Problem.solved_count, Problem.id), 'desc'),
+    'recent': ((Problem.contest_id, Problem.id), 'desc'),
+    'rating': ((Problem.rating, Problem.id), 'asc'),
+}
+
+Cursor = Tuple
+
+
+def page_cursor(problem: ProblemView, order: str = 'popular') -> Cursor:
+    """Курсор, указывающий на задачу в порядке order (для перехода к соседней странице)"""
+    key_columns, _ = PROBLEM_ORDERINGS[order]
+    return tuple(getattr(problem, column.key) for column in key_columns)
+
+
+# Код задачи в тексте: номер контеста и индекс (A, B1, ...), например 1850A
+PROBLEM_CODE_RE = re.compile(r'\b(\d{1,5})([A-Za-z]\d?)\b')
+
+# Во сколько раз больше кандидатов читается при выборке задач из разных контестов
+SAMPLE_OVERSAMPLING = 4
 
 
 class TaskService:
     """Сервис для работы с задачами"""
 
     @staticmethod
-    def get_problems_by_filters(
+    def _apply_filters(
             db: Session,
+            query: Query,
             rating: Optional[int] = None,
             topic: Optional[str] = None,
-            limit: int = 10
-    ) -> List[Problem]:
-        """Получение задач по фильтрам сложности и темы"""
-        query = db.query(Problem)
-
+            topic_expression: Optional[str] = None,
+            min_rating: Optional[int] = None,
+            max_rating: Optional[int] = None,
+            min_solved: Optional[int] = None,
+            max_solved: Optional[int] = None,
+            search: Optional[str] = None
+    ) -> Query:
+        """Применение фильтров задач к запросу"""
         if rating:
             query = query.filter(Problem.rating == rating)
 
+        if min_rating is not None:
+            query = query.filter(Problem.rating >= min_rating)
+
+        if max_rating is not None:
+            query = query.filter(Problem.rating <= max_rating)
+
+        if min_solved is not None:
+            query = query.filter(Problem.solved_count >= min_solved)
+
+        if max_solved is not None:
+            query = query.filter(Problem.solved_count <= max_solved)
+
         if topic:
-            query = query.join(Problem.topics).filter(Topic.name == topic)
+            query = query.filter(Problem.tags.contains([topic]))
+
+        if topic_expression:
+            node = parse_topic_expression(topic_expression)
+            query = query.filter(topic_expression_clause(node, TaskService.get_topic_bits(db)))
 
-        query = query.distinct(Problem.contest_id)
+        if search:
+            query = query.filter(TaskService._search_clause(search))
 
-        return query.limit(limit).all()
+        return query
 
     @staticmethod
-    def search_problems(db: Session, search_query: str) -> List[Problem]:
-        """Поиск задач по названию или коду"""
+    def _search_clause(search_query: str):
+        """Условие поиска задачи по названию или коду"""
         search_term = f"%{search_query}%"
-        return db.query(Problem).filter(
-            or_(
-                Problem.name.ilike(search_term),
-                Problem.problem_index.ilike(search_term),
-                func.concat(Problem.contest_id, Problem.problem_index).ilike(search_term)
-            )
+        return or_(
+            Problem.name.ilike(search_term),
+            Problem.problem_index.ilike(search_term),
+            cast(Problem.contest_id, String).concat(Problem.problem_index).ilike(search_term)
+        )
+
+    @staticmethod
+    def get_problems_by_filters(
+            db: Session,
+            rating: Optional[int] = None,
+            topic: Optional[str] = None,
+            limit: int = 10,
+            topic_expression: Optional[str] = None,
+            min_rating: Optional[int] = None,
+            max_rating: Optional[int] = None,
+            profile: str = 'list'
+    ) -> List[ProblemView]:
+        """Получение случайных задач из разных контестов по фильтрам сложности и темы
+
+        topic_expression — булево выражение над темами ("dp & greedy & !math"),
+        проверяется одним условием на битовой маске задачи без соединений.
+        profile — профиль загрузки связанных данных ('list' или 'detail').
+        """
+        query = TaskService._apply_filters(
+            db, db.query(*problem_view_columns(profile)), rating=rating, topic=topic,
+            topic_expression=topic_expression, min_rating=min_rating, max_rating=max_rating
+        )
+
+        return build_problem_views(TaskService._sample_distinct_contests(query, limit), profile)
+
+    @staticmethod
+    def _sample_distinct_contests(query: Query, limit: int) -> list:
+        """Случайная выборка задач по одной на контест
+
+        Вместо ORDER BY random() по всем совпадениям читается короткий отрезок
+        индекса по random_key от случайной точки (с переходом через начало),
+        так что стоимость зависит от limit, а не от числа подходящих задач.
+        """
+        pivot = random.random()
+        batch_size = limit * SAMPLE_OVERSAMPLING
+        problems = []
+        seen_contests = set()
+
+        for window in (Problem.random_key >= pivot, Problem.random_key < pivot):
+            batch = query.filter(window).order_by(Problem.random_key).limit(batch_size).all()
+            for problem in batch:
+                if problem.contest_id in seen_contests:
+                    continue
+                seen_contests.add(problem.contest_id)
+                problems.append(problem)
+                if len(problems) == limit:
+                    return problems
+
+        return problems
+
+    @staticmethod
+    def get_problems_page(
+            db: Session,
+            order: str = 'popular',
+            cursor: Optional[Cursor] = None,
+            limit: int = 10,
+            profile: str = 'list',
+            backward: bool = False,
+            **filters
+    ) -> Tuple[List[ProblemView], Optional[Cursor]]:
+        """Страница задач по фильтрам с курсорной (keyset) пагинацией
+
+        Возвращает задачи и курсор следующей страницы (None, если страница
+        последняя). Курсор — значения ключа сортировки последней задачи,
+        поэтому любая страница читается из индекса так же быстро, как первая.
+        С backward=True читается страница перед курсором (задачи в том же
+        порядке), а возвращается курсор еще более ранней страницы.
+        """
+        if order not in PROBLEM_ORDERINGS:
+            raise ValueError(f"Неизвестный порядок сортировки: {order}")
+
+        key_columns, direction = PROBLEM_ORDERINGS[order]
+        scan = direction if not backward else ('asc' if direction == 'desc' else 'desc')
+        query = TaskService._apply_filters(db, db.query(*problem_view_columns(profile)), **filters)
+        query = query.filter(*(column.isnot(None) for column in key_columns))
+
+        if cursor is not None:
+            key = tuple_(*key_columns)
+            query = query.filter(key < tuple_(*cursor) if scan == 'desc' else key > tuple_(*cursor))
+
+        query = query.order_by(*(getattr(column, scan)() for column in key_columns))
+        rows = query.limit(limit + 1).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backward:
+            rows.reverse()
+
+        if not has_more:
+            return build_problem_views(rows, profile), None
+
+        edge = rows[0] if backward else rows[-1]
+        return build_problem_views(rows, profile), tuple(getattr(edge, column.key) for column in key_columns)
+
+    @staticmethod
+    def search_problems(db: Session, search_query: str, profile: str = 'detail') -> List[ProblemView]:
+        """Поиск задач по названию или коду"""
+        rows = db.query(*problem_view_columns(profile)).filter(
+            TaskService._search_clause(search_query)
         ).limit(20).all()
+        return build_problem_views(rows, profile)
+
+    @staticmethod
+    def extract_problem_codes(text: str) -> List[Tuple[int, str]]:
+        """Коды задач из текста в порядке появления, без повторов"""
+        codes = []
+        for contest_id, problem_index in PROBLEM_CODE_RE.findall(text):
+            code = (int(contest_id), problem_index.upper())
+            if code not in codes:
+                codes.append(code)
+        return codes
+
+    @staticmethod
+    def get_problems_by_codes(
+            db: Session,
+            codes: List[Tuple[int, str]],
+            profile: str = 'list'
+    ) -> List[Tuple[Tuple[int, str], Optional[ProblemView]]]:
+        """Получение нескольких задач по кодам одним запросом
+
+        Возвращает пары (код, задача) в порядке входных кодов; для
+        ненайденных кодов задача равна None.
+        """
+        if not codes:
+            return []
+
+        rows = db.query(*problem_view_columns(profile)).filter(
+            tuple_(Problem.contest_id, Problem.problem_index).in_(codes)
+        ).all()
+        found = {(problem.contest_id, problem.problem_index): problem
+                 for problem in build_problem_views(rows, profile)}
+
+        return [(code, found.get(code)) for code in codes]
 
     @staticmethod
     def get_available_ratings(db: Session) -> List[int]:
@@ -55,11 +234,113 @@ class TaskService:
         return [topic[0] for topic in topics]
 
     @staticmethod
-    def get_problem_by_code(db: Session, contest_id: int, problem_index: str) -> Optional[Problem]:
+    def get_topic_counts(db: Session, rating: int) -> List[Tuple[str, int]]:
+        """Непустые темы для сложности с количеством задач (по убыванию количества)"""
+        rows = db.query(Topic.name, RatingTopicStat.problem_count).join(RatingTopicStat.topic).filter(
+            RatingTopicStat.rating == rating,
+            RatingTopicStat.problem_count > 0
+        ).order_by(RatingTopicStat.problem_count.desc(), Topic.name).all()
+        return [(name, count) for name, count in rows]
+
+    @staticmethod
+    def get_rating_topic_stats(
+            db: Session,
+            rating: Optional[int] = None,
+            topic: Optional[str] = None
+    ) -> List[Tuple[int, str, int, float]]:
+        """Статистика (сложность, тема, количество задач, среднее число решений) из агрегата"""
+        query = db.query(
+            RatingTopicStat.rating, Topic.name, RatingTopicStat.problem_count, RatingTopicStat.avg_solved_count
+        ).join(RatingTopicStat.topic)
+
+        if rating is not None:
+            query = query.filter(RatingTopicStat.rating == rating)
+
+        if topic:
+            query = query.filter(Topic.name == topic)
+
+        rows = query.order_by(RatingTopicStat.rating, RatingTopicStat.problem_count.desc()).all()
+        return [(row_rating, name, count, avg_solved) for row_rating, name, count, avg_solved in rows]
+
+    @staticmethod
+    def get_topic_bits(db: Session) -> Dict[str, int]:
+        """Получение номеров битов тем в маске задачи"""
+        rows = db.query(Topic.name, Topic.bit).filter(Topic.bit.isnot(None)).all()
+        return {name: bit for name, bit in rows}
+
+    @staticmethod
+    def get_problem_by_code(
+            db: Session,
+            contest_id: int,
+            problem_index: str,
+            profile: str = 'detail'
+    ) -> Optional[ProblemView]:
         """Получение задачи по коду"""
-        return db.query(Problem).filter(
+        row = db.query(*problem_view_columns(profile)).filter(
             and_(
                 Problem.contest_id == contest_id,
                 Problem.problem_index == problem_index
             )
         ).first()
+        if row is None:
+            return None
+        return build_problem_views([row], profile)[0]
+
+
+class AsyncTaskService:
+    """Асинхронные версии методов TaskService для обработчиков бота
+
+    Запросы выполняются через AsyncSession.run_sync на асинхронном драйвере,
+    поэтому ожидание БД не блокирует цикл событий, а логика запросов общая
+    с TaskService.
+    """
+
+    @staticmethod
+    async def get_problems_by_filters(db: AsyncSession, *args, **kwargs) -> List[ProblemView]:
+        """Асинхронная версия TaskService.get_problems_by_filters"""
+        return await db.run_sync(TaskService.get_problems_by_filters, *args, **kwargs)
+
+    @staticmethod
+    async def get_problems_page(db: AsyncSession, *args, **kwargs) -> Tuple[List[ProblemView], Optional[Cursor]]:
+        """Асинхронная версия TaskService.get_problems_page"""
+        return await db.run_sync(TaskService.get_problems_page, *args, **kwargs)
+
+    @staticmethod
+    async def search_problems(db: AsyncSession, *args, **kwargs) -> List[ProblemView]:
+        """Асинхронная версия TaskService.search_problems"""
+        return await db.run_sync(TaskService.search_problems, *args, **kwargs)
+
+    @staticmethod
+    async def get_problems_by_codes(db: AsyncSession, *args, **kwargs):
+        """Асинхронная версия TaskService.get_problems_by_codes"""
+        return await db.run_sync(TaskService.get_problems_by_codes, *args, **kwargs)
+
+    @staticmethod
+    async def get_available_ratings(db: AsyncSession) -> List[int]:
+        """Асинхронная версия TaskService.get_available_ratings"""
+        return await db.run_sync(TaskService.get_available_ratings)
+
+    @staticmethod
+    async def get_available_topics(db: AsyncSession) -> List[str]:
+        """Асинхронная версия TaskService.get_available_topics"""
+        return await db.run_sync(TaskService.get_available_topics)
+
+    @staticmethod
+    async def get_topic_counts(db: AsyncSession, *args, **kwargs) -> List[Tuple[str, int]]:
+        """Асинхронная версия TaskService.get_topic_counts"""
+        return await db.run_sync(TaskService.get_topic_counts, *args, **kwargs)
+
+    @staticmethod
+    async def get_rating_topic_stats(db: AsyncSession, *args, **kwargs) -> List[Tuple[int, str, int, float]]:
+        """Асинхронная версия TaskService.get_rating_topic_stats"""
+        return await db.run_sync(TaskService.get_rating_topic_stats, *args, **kwargs)
+
+    @staticmethod
+    async def get_topic_bits(db: AsyncSession) -> Dict[str, int]:
+        """Асинхронная версия TaskService.get_topic_bits"""
+        return await db.run_sync(TaskService.get_topic_bits)
+
+    @staticmethod
+    async def get_problem_by_code(db: AsyncSession, *args, **kwargs) -> Optional[ProblemView]:
+        """Асинхронная версия TaskService.get_problem_by_code"""
+        return await db.run_sync(TaskService.get_problem_by_code, *args, **kwargs)
@@ -0,0 +1,146 @@
+import re
+from typing import Dict, List, Tuple, Union
+from sqlalchemy import and_, or_, not_
+from database.models import Problem
+
+TopicNode = Union[Tuple[str, str], Tuple[str, "TopicNode"], Tuple[str, List["TopicNode"]]]
+
+_TOKEN_RE = re.compile(r'(\(|\)|&|\||!|\bAND\b|\bOR\b|\bNOT\b)')
+_OPERATORS = {'&': 'AND', '|': 'OR', '!': 'NOT', 'AND': 'AND', 'OR': 'OR', 'NOT': 'NOT', '(': '(', ')': ')'}
+
+
+def tokenize_topic_expression(expression: str) -> List[str]:
+    """Разбиение выражения на операторы и названия тем"""
+    tokens = []
+    for part in _TOKEN_RE.split(expression):
+        part = part.strip()
+        if not part:
+            continue
+        tokens.append(_OPERATORS.get(part, part))
+    return tokens
+
+
+class _TopicExpressionParser:
+    """Рекурсивный разбор выражения: OR < AND < NOT < скобки"""
+
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self) -> TopicNode:
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(f"Неожиданный токен в выражении: {self.peek()}")
+        return node
+
+    def parse_or(self) -> TopicNode:
+        items = [self.parse_and()]
+        while self.peek() == 'OR':
+            self.take()
+            items.append(self.parse_and())
+        return items[0] if len(items) == 1 else ('or', items)
+
+    def parse_and(self) -> TopicNode:
+        items = [self.parse_not()]
+        while True:
+            token = self.peek()
+            if token == 'AND':
+                self.take()
+            elif token not in ('NOT', '('):
+                break
+            items.append(self.parse_not())
+        return items[0] if len(items) == 1 else ('and', items)
+
+    def parse_not(self) -> TopicNode:
+        token = self.take()
+        if token is None:
+            raise ValueError("Выражение оборвано")
+        if token == 'NOT':
+            return 'not', self.parse_not()
+        if token == '(':
+            node = self.parse_or()
+            if self.take() != ')':
+                raise ValueError("Не закрыта скобка в выражении")
+            return node
+        if token in _OPERATORS.values():
+            raise ValueError(f"Неожиданный оператор в выражении: {token}")
+        return 'topic', token
+
+
+def parse_topic_expression(expression: str) -> TopicNode:
+    """Разбор выражения вида "dp & greedy & !math" или "dp AND greedy NOT math" """
+    tokens = tokenize_topic_expression(expression)
+    if not tokens:
+        raise ValueError("Пустое выражение тем")
+    return _TopicExpressionParser(tokens).parse()
+
+
+def _mask_for(name: str, topic_bits: Dict[str, int]) -> int:
+    if name not in topic_bits:
+        raise ValueError(f"Неизвестная тема: {name}")
+    return 1 << topic_bits[name]
+
+
+def _has_all(mask: int):
+    return Problem.topic_mask.op('&')(mask) == mask
+
+
+def _has_any(mask: int):
+    return Problem.topic_mask.op('&')(mask) != 0
+
+
+def _has_none(mask: int):
+    return Problem.topic_mask.op('&')(mask) == 0
+
+
+def topic_expression_clause(node: TopicNode, topic_bits: Dict[str, int]):
+    """Построение условия на Problem.topic_mask по дереву выражения
+
+    Конъюнкции тем сворачиваются в две проверки маски (все обязательные
+    биты установлены, все запрещенные сброшены), дизъюнкции — в одну.
+    """
+    kind, value = node
+
+    if kind == 'topic':
+        return _has_any(_mask_for(value, topic_bits))
+
+    if kind == 'not':
+        if value[0] == 'topic':
+            return _has_none(_mask_for(value[1], topic_bits))
+        return not_(topic_expression_clause(value, topic_bits))
+
+    if kind == 'and':
+        required, forbidden, clauses = 0, 0, []
+        for item in value:
+            if item[0] == 'topic':
+                required |= _mask_for(item[1], topic_bits)
+            elif item[0] == 'not' and item[1][0] == 'topic':
+                forbidden |= _mask_for(item[1][1], topic_bits)
+            else:
+                clauses.append(topic_expression_clause(item, topic_bits))
+        if required:
+            clauses.insert(0, _has_all(required))
+        if forbidden:
+            clauses.insert(1 if required else 0, _has_none(forbidden))
+        return clauses[0] if len(clauses) == 1 else and_(*clauses)
+
+    if kind == 'or':
+        any_of, clauses = 0, []
+        for item in value:
+            if item[0] == 'topic':
+                any_of |= _mask_for(item[1], topic_bits)
+            else:
+                clauses.append(topic_expression_clause(item, topic_bits))
+        if any_of:
+            clauses.insert(0, _has_any(any_of))
+        return clauses[0] if len(clauses) == 1 else or_(*clauses)
+
+    raise ValueError(f"Неизвестный узел выражения: {kind}")
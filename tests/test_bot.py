@@ -1,9 +1,23 @@
 import pytest
 import sys
 import os
-from unittest.mock import Mock, patch, AsyncMock
+from contextlib import contextmanager
+from unittest.mock import Mock, MagicMock, patch, AsyncMock
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 from bot.telegram_bot import TelegramBot, CHOOSING_RATING, CHOOSING_TOPIC
+from bot.keyboards import ReplyKeyboards
+
+
+@contextmanager
+def keyboard_session(mock_session, ratings, stats=()):
+    """Сессия, на которой клавиатуры /problems собираются из заданных данных"""
+    sync_db = MagicMock()
+    mock_db = MagicMock()
+    mock_db.run_sync = AsyncMock(side_effect=lambda func, *args: func(sync_db, *args))
+    mock_session.return_value.__aenter__.return_value = mock_db
+    with patch('bot.keyboards.TaskService.get_available_ratings', return_value=list(ratings)), \
+            patch('bot.keyboards.TaskService.get_rating_topic_stats', return_value=list(stats)):
+        yield mock_db
 
 
 class TestTelegramBotSync:
@@ -24,11 +38,7 @@ class TestTelegramBotSync:
         problem.solved_count = 1500
         problem.codeforces_url = "https://codeforces.com/problemset/problem/123/A"
 
-        topic1 = Mock()
-        topic1.name = "math"
-        topic2 = Mock()
-        topic2.name = "brute force"
-        problem.topics = [topic1, topic2]
+        problem.topics = ("math", "brute force")
 
         return problem
 
@@ -97,14 +107,10 @@ class TestTelegramBotSync:
         assert hasattr(telegram_bot, 'cancel')
         assert hasattr(telegram_bot, '_format_problem_details')
 
-    @patch('bot.telegram_bot.SessionLocal')
-    @patch('bot.telegram_bot.TaskService.get_available_ratings')
-    def test_start_problem_selection_no_ratings(self, mock_ratings, mock_session, telegram_bot):
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.reply_keyboards', new_callable=ReplyKeyboards)
+    def test_start_problem_selection_no_ratings(self, mock_keyboards, mock_session, telegram_bot):
         """Тест начала подбора задач когда нет рейтингов."""
-        mock_db = Mock()
-        mock_session.return_value = mock_db
-        mock_ratings.return_value = []
-
         mock_update = AsyncMock()
         mock_update.message = AsyncMock()
         mock_update.message.reply_text = AsyncMock()
@@ -112,20 +118,17 @@ class TestTelegramBotSync:
         mock_context.user_data = {}
 
         import asyncio
-        result = asyncio.run(telegram_bot.start_problem_selection(mock_update, mock_context))
+        with keyboard_session(mock_session, []):
+            result = asyncio.run(telegram_bot.start_problem_selection(mock_update, mock_context))
 
         mock_update.message.reply_text.assert_called_once()
         assert "нет задач" in mock_update.message.reply_text.call_args[0][0]
         assert result == -1
 
-    @patch('bot.telegram_bot.SessionLocal')
-    @patch('bot.telegram_bot.TaskService.get_available_ratings')
-    def test_start_problem_selection_with_ratings(self, mock_ratings, mock_session, telegram_bot):
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.reply_keyboards', new_callable=ReplyKeyboards)
+    def test_start_problem_selection_with_ratings(self, mock_keyboards, mock_session, telegram_bot):
         """Тест начала подбора задач с доступными рейтингами."""
-        mock_db = Mock()
-        mock_session.return_value = mock_db
-        mock_ratings.return_value = [800, 900, 1000]
-
         mock_update = AsyncMock()
         mock_update.message = AsyncMock()
         mock_update.message.reply_text = AsyncMock()
@@ -133,12 +136,33 @@ class TestTelegramBotSync:
         mock_context.user_data = {}
 
         import asyncio
-        result = asyncio.run(telegram_bot.start_problem_selection(mock_update, mock_context))
+        with keyboard_session(mock_session, [800, 900, 1000]):
+            result = asyncio.run(telegram_bot.start_problem_selection(mock_update, mock_context))
 
         mock_update.message.reply_text.assert_called_once()
         call_args = mock_update.message.reply_text.call_args
         assert "Выберите сложность" in call_args[0][0]
-        assert call_args[1]['reply_markup'] is not None
+        keyboard = call_args[1]['reply_markup'].keyboard
+        assert [[button.text for button in row] for row in keyboard] == [["⭐ 800", "⭐ 900"], ["⭐ 1000"]]
+
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.reply_keyboards', new_callable=ReplyKeyboards)
+    def test_start_problem_selection_uses_cached_keyboards(self, mock_keyboards, mock_session, telegram_bot):
+        """Тест что клавиатуры собираются один раз на версию набора задач."""
+        mock_update = AsyncMock()
+        mock_context = AsyncMock()
+
+        import asyncio
+        with keyboard_session(mock_session, [800, 900, 1000]) as mock_db:
+            asyncio.run(telegram_bot.start_problem_selection(mock_update, mock_context))
+            asyncio.run(telegram_bot.start_problem_selection(mock_update, mock_context))
+            assert mock_db.run_sync.await_count == 1
+
+            with patch('bot.keyboards.get_dataset_version', return_value=mock_keyboards._version + 1):
+                asyncio.run(telegram_bot.start_problem_selection(mock_update, mock_context))
+            assert mock_db.run_sync.await_count == 2
+            # Три сессии обработчиков и две отдельные сессии пересборки
+            assert mock_session.call_count == 5
 
 
 class TestRunBotSync:
@@ -173,6 +197,75 @@ class TestRunBotSync:
         error_calls = [call[0][0] for call in mock_logger.error.call_args_list]
         assert any("TELEGRAM_BOT_TOKEN not found" in str(call) for call in error_calls)
 
+    @patch('bot.telegram_bot.config')
+    @patch('bot.telegram_bot.TelegramBot')
+    @patch('bot.telegram_bot.serve_webhook', new_callable=Mock)
+    @patch('bot.telegram_bot.asyncio.run')
+    def test_run_bot_webhook_mode(self, mock_run, mock_serve, mock_telegram_bot, mock_config):
+        """Тест запуска бота в режиме вебхука."""
+        from bot.telegram_bot import run_bot
+
+        mock_config.TELEGRAM_BOT_TOKEN = "valid_token"
+        mock_config.BOT_MODE = "webhook"
+        mock_config.WEBHOOK_URL = "https://bot.example.com/telegram"
+        mock_config.WEBHOOK_SECRET_TOKEN = "secret"
+
+        run_bot()
+
+        mock_serve.assert_called_once_with(mock_telegram_bot.return_value.application)
+        mock_run.assert_called_once_with(mock_serve.return_value)
+        mock_telegram_bot.return_value.application.run_polling.assert_not_called()
+
+    @patch('bot.telegram_bot.config')
+    @patch('bot.telegram_bot.TelegramBot')
+    @patch('bot.telegram_bot.logger')
+    def test_run_bot_webhook_requires_secret(self, mock_logger, mock_telegram_bot, mock_config):
+        """Тест что режим вебхука не запускается без секретного токена."""
+        from bot.telegram_bot import run_bot
+
+        mock_config.TELEGRAM_BOT_TOKEN = "valid_token"
+        mock_config.BOT_MODE = "webhook"
+        mock_config.WEBHOOK_URL = "https://bot.example.com/telegram"
+        mock_config.WEBHOOK_SECRET_TOKEN = None
+
+        run_bot()
+
+        mock_telegram_bot.assert_not_called()
+        assert "WEBHOOK_SECRET_TOKEN" in mock_logger.error.call_args[0][0]
+
+    @patch('bot.telegram_bot.config')
+    @patch('bot.telegram_bot.TelegramBot')
+    @patch('bot.telegram_bot.run_sharded_bot')
+    def test_run_bot_sharded_mode(self, mock_sharded, mock_telegram_bot, mock_config):
+        """Тест запуска диспетчера и воркеров."""
+        from bot.telegram_bot import run_bot
+
+        mock_config.TELEGRAM_BOT_TOKEN = "valid_token"
+        mock_config.BOT_MODE = "sharded"
+        mock_config.WEBHOOK_URL = "https://bot.example.com/telegram"
+        mock_config.WEBHOOK_SECRET_TOKEN = "secret"
+
+        run_bot()
+
+        mock_sharded.assert_called_once()
+        mock_telegram_bot.assert_not_called()
+
+    @patch('bot.telegram_bot.config')
+    @patch('bot.telegram_bot.run_worker')
+    def test_run_bot_worker_mode_without_url(self, mock_worker, mock_config):
+        """Тест что воркеру не нужен публичный адрес вебхука."""
+        from bot.telegram_bot import run_bot
+
+        mock_config.TELEGRAM_BOT_TOKEN = "valid_token"
+        mock_config.BOT_MODE = "worker"
+        mock_config.WEBHOOK_URL = None
+        mock_config.WEBHOOK_SECRET_TOKEN = "secret"
+        mock_config.WORKER_INDEX = 3
+
+        run_bot()
+
+        mock_worker.assert_called_once_with(3)
+
 
 class TestBotIntegration:
     """Интеграционные тесты для бота."""
@@ -192,33 +285,9 @@ class TestBotIntegration:
         """Интеграционный тест форматирования проблемы."""
         bot = TelegramBot("test_token")
 
-        class MockTopic:
-            """Mock класса темы."""
-            def __init__(self, name):
-                self.name = name
-
-            def __repr__(self):
-                return f"Topic({self.name})"
-
-        class MockProblem:
-            """Mock класса проблемы."""
-            def __init__(self):
-                self.contest_id = 123
-                self.problem_index = "A"
-                self.name = "Test Problem"
-                self.rating = 800
-                self.solved_count = 1500
-                self.topics = [MockTopic("math"), MockTopic("graphs")]
-
-            @property
-            def full_code(self):
-                return f"{self.contest_id}{self.problem_index}"
-
-            @property
-            def codeforces_url(self):
-                return f"https://codeforces.com/problemset/problem/{self.contest_id}/{self.problem_index}"
-
-        problem = MockProblem()
+        from services.problem_views import ProblemView
+
+        problem = ProblemView(1, 123, "A", "Test Problem", 800, 1500, ("math", "graphs"))
         formatted = bot._format_problem_details(problem)
 
         assert "123A" in formatted
@@ -298,13 +367,13 @@ class TestTelegramBotAsync:
         assert "/search" in response_text
 
     @pytest.mark.asyncio
-    @patch('bot.telegram_bot.SessionLocal')
-    @patch('bot.telegram_bot.TaskService.search_problems')
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problems_page')
     async def test_search_command_multiple_results(self, mock_search, mock_session, telegram_bot, mock_update,
                                                    mock_context):
         """Тест команды /search с несколькими результатами."""
-        mock_db = Mock()
-        mock_session.return_value = mock_db
+        mock_db = MagicMock()
+        mock_session.return_value.__aenter__.return_value = mock_db
 
         problems = []
         for i in range(3):
@@ -316,7 +385,7 @@ class TestTelegramBotAsync:
             problem.codeforces_url = f"http://test.com/{i}"
             problems.append(problem)
 
-        mock_search.return_value = problems
+        mock_search.return_value = (problems, None)
         mock_context.args = ["problem"]
 
         await telegram_bot.search(mock_update, mock_context)
@@ -329,13 +398,13 @@ class TestTelegramBotAsync:
         assert "122A" in response_text
 
     @pytest.mark.asyncio
-    @patch('bot.telegram_bot.SessionLocal')
-    @patch('bot.telegram_bot.TaskService.search_problems')
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problems_page')
     async def test_search_command_no_results(self, mock_search, mock_session, telegram_bot, mock_update, mock_context):
         """Тест команды /search без результатов."""
-        mock_db = Mock()
-        mock_session.return_value = mock_db
-        mock_search.return_value = []
+        mock_db = MagicMock()
+        mock_session.return_value.__aenter__.return_value = mock_db
+        mock_search.return_value = ([], None)
         mock_context.args = ["nonexistent"]
 
         await telegram_bot.search(mock_update, mock_context)
@@ -351,12 +420,10 @@ class TestTelegramBotAsync:
         mock_update.message.text = "⭐ 1500"
         mock_context.user_data = {}
 
-        with patch('bot.telegram_bot.SessionLocal') as mock_session, \
-                patch('bot.telegram_bot.TaskService.get_available_topics') as mock_topics:
-            mock_db = Mock()
-            mock_session.return_value = mock_db
-            mock_topics.return_value = ["dp", "math", "greedy"]
-
+        stats = [(1500, "math", 10, 5.0), (1500, "dp", 42, 7.0), (1500, "greedy", 3, 1.0), (1600, "dp", 9, 1.0)]
+        with patch('bot.unit_of_work.AsyncSessionLocal') as mock_session, \
+                patch('bot.telegram_bot.reply_keyboards', new_callable=ReplyKeyboards), \
+                keyboard_session(mock_session, [1500, 1600], stats):
             result = await telegram_bot.select_rating(mock_update, mock_context)
 
             assert result == CHOOSING_TOPIC
@@ -364,6 +431,8 @@ class TestTelegramBotAsync:
             mock_update.message.reply_text.assert_called_once()
             response_text = mock_update.message.reply_text.call_args[0][0]
             assert "Выбрана сложность: 1500" in response_text
+            keyboard = mock_update.message.reply_text.call_args[1]['reply_markup'].keyboard
+            assert keyboard[0][0].text == "📚 dp (42)"
 
     @pytest.mark.asyncio
     async def test_select_rating_invalid(self, telegram_bot, mock_update, mock_context):
@@ -379,16 +448,16 @@ class TestTelegramBotAsync:
         assert "Пожалуйста, выберите сложность из предложенных вариантов" in response_text
 
     @pytest.mark.asyncio
-    @patch('bot.telegram_bot.SessionLocal')
-    @patch('bot.telegram_bot.TaskService.get_problems_by_filters')
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problems_by_filters')
     async def test_select_topic_with_results(self, mock_get_problems, mock_session, telegram_bot, mock_update,
                                              mock_context):
         """Тест выбора темы с результатами."""
-        mock_update.message.text = "📚 dp"
+        mock_update.message.text = "📚 dp (42)"
         mock_context.user_data = {'rating': 1500}
 
-        mock_db = Mock()
-        mock_session.return_value = mock_db
+        mock_db = MagicMock()
+        mock_session.return_value.__aenter__.return_value = mock_db
 
         mock_problem = Mock()
         mock_problem.full_code = "123A"
@@ -400,22 +469,25 @@ class TestTelegramBotAsync:
         result = await telegram_bot.select_topic(mock_update, mock_context)
 
         assert result == -1
+        mock_get_problems.assert_called_once_with(mock_db, 1500, "dp", limit=10)
         mock_update.message.reply_text.assert_called_once()
         response_text = mock_update.message.reply_text.call_args[0][0]
         assert "Подборка задач" in response_text
         assert "123A" in response_text
+        reply_markup = mock_update.message.reply_text.call_args[1]['reply_markup']
+        assert reply_markup.inline_keyboard[0][0].callback_data == "pk|p|1500|dp"
 
     @pytest.mark.asyncio
-    @patch('bot.telegram_bot.SessionLocal')
-    @patch('bot.telegram_bot.TaskService.get_problems_by_filters')
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problems_by_filters')
     async def test_select_topic_no_results(self, mock_get_problems, mock_session, telegram_bot, mock_update,
                                            mock_context):
         """Тест выбора темы без результатов."""
         mock_update.message.text = "📚 nonexistent"
         mock_context.user_data = {'rating': 1500}
 
-        mock_db = Mock()
-        mock_session.return_value = mock_db
+        mock_db = MagicMock()
+        mock_session.return_value.__aenter__.return_value = mock_db
         mock_get_problems.return_value = []
 
         result = await telegram_bot.select_topic(mock_update, mock_context)
@@ -436,6 +508,231 @@ class TestTelegramBotAsync:
         response_text = mock_update.message.reply_text.call_args[0][0]
         assert "Не понял ваш запрос" in response_text
 
+    @pytest.mark.asyncio
+    async def test_random_problem_usage(self, telegram_bot, mock_update, mock_context):
+        """Тест команды /random без сложности."""
+        await telegram_bot.random_problem(mock_update, mock_context)
+
+        response_text = mock_update.message.reply_text.call_args[0][0]
+        assert "Использование" in response_text
+
+    @pytest.mark.asyncio
+    @patch('bot.telegram_bot.problem_pools')
+    async def test_random_problem_from_pool(self, mock_pools, telegram_bot, mock_update, mock_context):
+        """Тест команды /random с выбором из пула без запроса к БД."""
+        mock_problem = Mock()
+        mock_problem.full_code = "123A"
+        mock_problem.name = "Test Problem"
+        mock_problem.rating = 1200
+        mock_problem.solved_count = 1000
+        mock_problem.codeforces_url = "http://test.com"
+        mock_pools.built = True
+        mock_pools.pick.return_value = mock_problem
+        mock_context.args = ["1200", "binary", "search"]
+
+        with patch('bot.unit_of_work.AsyncSessionLocal'), \
+                patch('bot.telegram_bot.AsyncTaskService.get_problems_by_filters') as mock_get_problems:
+            await telegram_bot.random_problem(mock_update, mock_context)
+            assert not mock_get_problems.called
+
+        mock_pools.pick.assert_called_once_with(1200, "binary search")
+        assert "123A" in mock_update.message.reply_text.call_args[0][0]
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_rating_topic_stats')
+    async def test_stats_command(self, mock_stats, mock_session, telegram_bot, mock_update, mock_context):
+        """Тест команды /stats."""
+        mock_stats.return_value = [(1200, "dp", 42, 1500.4), (1200, "math", 10, 300.0)]
+        mock_context.args = ["1200"]
+
+        await telegram_bot.stats(mock_update, mock_context)
+
+        mock_stats.assert_called_once_with(mock_session.return_value.__aenter__.return_value, 1200, None)
+        response_text = mock_update.message.reply_text.call_args[0][0]
+        assert "dp: 42 задач, в среднем 1500 решений" in response_text
+        assert "math: 10 задач" in response_text
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_rating_topic_stats')
+    async def test_stats_escapes_topic_names(self, mock_stats, mock_session, telegram_bot, mock_update,
+                                             mock_context):
+        """Тест что темы со служебными символами Markdown экранируются."""
+        mock_stats.return_value = [(3500, "*special", 3, 10.0), (3500, "two_pointers", 1, 5.0)]
+        mock_context.args = ["3500"]
+
+        await telegram_bot.stats(mock_update, mock_context)
+
+        response_text = mock_update.message.reply_text.call_args[0][0]
+        assert "📚 \\*special: 3 задач" in response_text
+        assert "two\\_pointers" in response_text
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problems_page')
+    async def test_concurrent_identical_searches_share_query(self, mock_search, mock_session, telegram_bot,
+                                                             mock_context):
+        """Тест что одинаковые одновременные /search выполняют один запрос."""
+        import asyncio
+        release = asyncio.Event()
+
+        async def slow_search(db, **kwargs):
+            await release.wait()
+            return [], None
+
+        mock_search.side_effect = slow_search
+        mock_context.args = ["1850A"]
+        updates = []
+        for _ in range(3):
+            update = AsyncMock()
+            updates.append(update)
+
+        tasks = [asyncio.create_task(telegram_bot.search(update, mock_context)) for update in updates]
+        await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.gather(*tasks)
+
+        mock_search.assert_called_once()
+        assert telegram_bot.single_flight.shared == 2
+        for update in updates:
+            assert "не найдены" in update.message.reply_text.call_args[0][0]
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problems_page')
+    async def test_shared_search_runs_in_own_session(self, mock_search, mock_session, telegram_bot, mock_context):
+        """Тест что общий запрос /search не использует сессию обработчика одного из чатов."""
+        from config.config import config
+        from database.database import STATEMENT_TIMEOUT_KEY
+        sessions = []
+
+        def open_session():
+            db = MagicMock()
+            db.info = {}
+            sessions.append(db)
+            context_manager = MagicMock()
+            context_manager.__aenter__ = AsyncMock(return_value=db)
+            context_manager.__aexit__ = AsyncMock(return_value=False)
+            return context_manager
+
+        mock_session.side_effect = open_session
+        mock_search.return_value = ([], None)
+        mock_context.args = ["1850A"]
+
+        await telegram_bot.search(AsyncMock(), mock_context)
+
+        handler_db, query_db = sessions
+        mock_search.assert_called_once()
+        assert mock_search.call_args[0][0] is query_db
+        assert query_db.info[STATEMENT_TIMEOUT_KEY] == config.SEARCH_QUERY_TIMEOUT_MS
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problems_by_codes')
+    async def test_handle_text_several_codes(self, mock_by_codes, mock_session, telegram_bot, mock_update,
+                                             mock_context):
+        """Тест сообщения с несколькими кодами задач."""
+        from services.problem_views import ProblemView
+
+        mock_update.message.text = "1850A 1850B 1851C"
+        mock_by_codes.return_value = [
+            ((1850, 'A'), ProblemView(1, 1850, 'A', 'First', 800, 10)),
+            ((1850, 'B'), None),
+            ((1851, 'C'), ProblemView(2, 1851, 'C', 'Third', 1200, 5)),
+        ]
+
+        await telegram_bot.handle_text(mock_update, mock_context)
+
+        mock_by_codes.assert_called_once_with(mock_session.return_value.__aenter__.return_value,
+                                              [(1850, 'A'), (1850, 'B'), (1851, 'C')])
+        response_text = mock_update.message.reply_text.call_args[0][0]
+        assert "Найдено задач: 2 из 3" in response_text
+        assert "1850B**: ❌ не найдена" in response_text
+        assert response_text.index("First") < response_text.index("Third")
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problems_by_codes')
+    async def test_handle_text_caps_codes(self, mock_by_codes, mock_session, telegram_bot, mock_update,
+                                          mock_context):
+        """Тест что из длинного списка кодов ищутся только первые MAX_CODES_PER_MESSAGE."""
+        from bot.telegram_bot import MAX_CODES_PER_MESSAGE
+
+        mock_update.message.text = " ".join(f"{1800 + i}A" for i in range(MAX_CODES_PER_MESSAGE + 5))
+        mock_by_codes.side_effect = lambda db, codes: [(code, None) for code in codes]
+
+        await telegram_bot.handle_text(mock_update, mock_context)
+
+        codes = mock_by_codes.call_args[0][1]
+        assert len(codes) == MAX_CODES_PER_MESSAGE
+        assert codes[0] == (1800, 'A')
+        response_text = mock_update.message.reply_text.call_args[0][0]
+        assert f"0 из {MAX_CODES_PER_MESSAGE}" in response_text
+        assert "остальные 5 пропущены" in response_text
+
+    @pytest.mark.asyncio
+    @patch('bot.telegram_bot.AsyncSessionLocal')
+    async def test_refresh_dataset_caches_polls_shared_version(self, mock_session, telegram_bot):
+        """Тест что воркер бота сверяет общую версию набора задач и пересобирает кэши при старте."""
+        import asyncio
+        from services.dataset import sync_dataset_version
+        mock_db = MagicMock()
+        mock_db.run_sync = AsyncMock(side_effect=[True, False])
+        mock_session.return_value.__aenter__.return_value = mock_db
+
+        with patch('bot.telegram_bot.asyncio.sleep', side_effect=[None, asyncio.CancelledError]):
+            with pytest.raises(asyncio.CancelledError):
+                await telegram_bot._refresh_dataset_caches()
+
+        calls = [call[0] for call in mock_db.run_sync.call_args_list]
+        assert calls == [(sync_dataset_version, True), (sync_dataset_version, False)]
+
+    def test_bot_registers_dataset_listeners(self, telegram_bot):
+        """Тест что кэши набора задач пересобирает процесс, в котором работает бот."""
+        from services import dataset
+        from services.problem_index import problem_index
+        from services.problem_pools import problem_pools
+        from bot.keyboards import reply_keyboards
+
+        for rebuild in (problem_index.rebuild, reply_keyboards.rebuild, problem_pools.rebuild):
+            assert rebuild in dataset._listeners
+
+    def test_cancel_registered_outside_conversation(self, telegram_bot):
+        """Тест что /cancel обрабатывается и вне диалога /problems."""
+        from telegram.ext import CommandHandler
+
+        handlers = telegram_bot.application.handlers[0]
+        assert any(isinstance(h, CommandHandler) and "cancel" in h.commands for h in handlers)
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problems_page')
+    async def test_cancel_interrupts_search(self, mock_search, mock_session, telegram_bot, mock_context):
+        """Тест что /cancel прерывает выполняющийся /search того же чата."""
+        import asyncio
+        started = asyncio.Event()
+
+        async def hanging_search(db, **kwargs):
+            started.set()
+            await asyncio.sleep(60)
+
+        mock_search.side_effect = hanging_search
+        mock_context.args = ["binary"]
+        search_update = AsyncMock()
+        search_update.effective_chat.id = 42
+        cancel_update = AsyncMock()
+        cancel_update.effective_chat.id = 42
+
+        task = asyncio.create_task(telegram_bot.search(search_update, mock_context))
+        await asyncio.wait_for(started.wait(), 1)
+        await telegram_bot.cancel(cancel_update, mock_context)
+
+        assert await asyncio.wait_for(task, 1) == -1
+        search_update.message.reply_text.assert_not_called()
+        assert telegram_bot.single_flight.in_flight == 0
+        assert "Операция отменена" in cancel_update.message.reply_text.call_args[0][0]
+
     @pytest.mark.asyncio
     async def test_cancel_command(self, telegram_bot, mock_update, mock_context):
         """Тест команды отмены."""
@@ -445,3 +742,285 @@ class TestTelegramBotAsync:
         mock_update.message.reply_text.assert_called_once()
         response_text = mock_update.message.reply_text.call_args[0][0]
         assert "Операция отменена" in response_text
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.search_problems')
+    @patch('bot.telegram_bot.problem_index')
+    async def test_inline_query_uses_index(self, mock_index, mock_search, mock_session, telegram_bot, mock_context):
+        """Тест inline-запроса по индексу в памяти без обращения к БД."""
+        from services.problem_views import ProblemView
+
+        mock_index.built = True
+        mock_index.search.return_value = [ProblemView(1, 1850, 'G', 'The Morning Star', 1500, 10, ('math',))]
+        update = AsyncMock()
+        update.inline_query.query = " 1850G "
+
+        await telegram_bot.inline_query(update, mock_context)
+
+        mock_search.assert_not_called()
+        mock_index.search.assert_called_once()
+        assert mock_index.search.call_args[0][0] == "1850G"
+        results = update.inline_query.answer.call_args[0][0]
+        assert [result.id for result in results] == ["1850G"]
+        assert results[0].title == "1850G: The Morning Star"
+        assert "math" in results[0].input_message_content.message_text
+        assert update.inline_query.answer.call_args[1]['is_personal'] is False
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.search_problems')
+    @patch('bot.telegram_bot.problem_index')
+    async def test_inline_query_falls_back_to_database(self, mock_index, mock_search, mock_session, telegram_bot,
+                                                       mock_context):
+        """Тест inline-запроса до сборки индекса."""
+        from services.problem_views import ProblemView
+
+        mock_session.return_value.__aenter__.return_value = MagicMock()
+        mock_index.built = False
+        mock_search.return_value = [ProblemView(1, 1850, 'G', 'The Morning Star', 1500, 10)]
+        update = AsyncMock()
+        update.inline_query.query = "morning"
+
+        await telegram_bot.inline_query(update, mock_context)
+
+        mock_index.search.assert_not_called()
+        mock_search.assert_called_once()
+        assert len(update.inline_query.answer.call_args[0][0]) == 1
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    async def test_inline_query_empty(self, mock_session, telegram_bot, mock_context):
+        """Тест пустого inline-запроса."""
+        update = AsyncMock()
+        update.inline_query.query = "  "
+
+        await telegram_bot.inline_query(update, mock_context)
+
+        assert update.inline_query.answer.call_args[0][0] == []
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_available_ratings')
+    async def test_pick_command_shows_ratings(self, mock_ratings, mock_session, telegram_bot, mock_update,
+                                              mock_context):
+        """Тест команды /pick: сложности на inline-кнопках."""
+        mock_ratings.return_value = [800, 900, 1000, 1100, 1200]
+
+        await telegram_bot.pick(mock_update, mock_context)
+
+        reply_markup = mock_update.message.reply_text.call_args[1]['reply_markup']
+        rows = reply_markup.inline_keyboard
+        assert [len(row) for row in rows] == [4, 1]
+        assert rows[0][0].callback_data == "pk|t|800"
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_topic_counts')
+    async def test_picker_topics_edit_message(self, mock_topics, mock_session, telegram_bot, mock_context):
+        """Тест выбора сложности: темы в том же сообщении."""
+        mock_topics.return_value = [("dp", 10), ("math", 5)]
+        update = AsyncMock()
+        update.callback_query.data = "pk|t|1200"
+
+        await telegram_bot.picker_callback(update, mock_context)
+
+        update.callback_query.answer.assert_awaited_once()
+        text = update.callback_query.edit_message_text.call_args[0][0]
+        reply_markup = update.callback_query.edit_message_text.call_args[1]['reply_markup']
+        assert "1200" in text
+        assert reply_markup.inline_keyboard[0][0].callback_data == "pk|p|1200|dp"
+        assert reply_markup.inline_keyboard[-1][0].callback_data == "pk|r"
+        assert mock_context.user_data == {}
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problems_page')
+    async def test_picker_page_with_cursor(self, mock_page, mock_session, telegram_bot, mock_context):
+        """Тест страницы задач: курсор из кнопки и кнопка следующей страницы."""
+        from services.problem_views import ProblemView
+
+        mock_page.return_value = ([ProblemView(1, 1850, 'G', 'Star', 1200, 100)], (100, 1))
+        update = AsyncMock()
+        update.callback_query.data = "pk|p|1200|dp|1|150.7"
+
+        await telegram_bot.picker_callback(update, mock_context)
+
+        kwargs = mock_page.call_args[1]
+        assert kwargs['cursor'] == (150, 7)
+        assert kwargs['rating'] == 1200
+        assert kwargs['topic'] == "dp"
+        text = update.callback_query.edit_message_text.call_args[0][0]
+        assert "11. **1850G**" in text
+        navigation = update.callback_query.edit_message_text.call_args[1]['reply_markup'].inline_keyboard[0]
+        assert navigation[-1].callback_data == "pk|p|1200|dp|2|100.1"
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    async def test_picker_stale_button(self, mock_session, telegram_bot, mock_context):
+        """Тест нажатия кнопки с поврежденными данными."""
+        update = AsyncMock()
+        update.callback_query.data = "pk|x"
+
+        await telegram_bot.picker_callback(update, mock_context)
+
+        assert update.callback_query.answer.call_args[1]['show_alert'] is True
+        update.callback_query.edit_message_text.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_topic_counts')
+    async def test_picker_same_button_twice(self, mock_topics, mock_session, telegram_bot, mock_context):
+        """Тест что повторное нажатие (сообщение не изменилось) не ошибка."""
+        from telegram.error import BadRequest
+
+        mock_topics.return_value = [("dp", 10)]
+        update = AsyncMock()
+        update.callback_query.data = "pk|t|1200"
+        update.callback_query.edit_message_text.side_effect = BadRequest("Message is not modified")
+
+        await telegram_bot.picker_callback(update, mock_context)
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problems_page')
+    async def test_search_first_page_has_next_button(self, mock_page, mock_session, telegram_bot, mock_update,
+                                                     mock_context):
+        """Тест кнопки следующей страницы под результатами /search."""
+        from services.problem_views import ProblemView
+
+        problems = [ProblemView(i, 100 + i, 'A', f'Binary {i}', 800, 100 - i) for i in range(10)]
+        mock_page.return_value = (problems, (91, 9))
+        mock_context.args = ["binary"]
+
+        await telegram_bot.search(mock_update, mock_context)
+
+        assert mock_page.call_args[1]['search'] == "binary"
+        text = mock_update.message.reply_text.call_args[0][0]
+        assert "страница 1" in text
+        navigation = mock_update.message.reply_text.call_args[1]['reply_markup'].inline_keyboard[0]
+        assert [button.callback_data for button in navigation] == ["sr|1|91.9|binary"]
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problems_page')
+    async def test_search_callback_edits_message(self, mock_page, mock_session, telegram_bot, mock_context):
+        """Тест листания /search: следующая страница в том же сообщении."""
+        from services.problem_views import ProblemView
+
+        mock_page.return_value = ([ProblemView(11, 111, 'A', 'Binary 11', 800, 89)], None)
+        update = AsyncMock()
+        update.callback_query.data = "sr|1|91.9|binary"
+
+        await telegram_bot.search_callback(update, mock_context)
+
+        kwargs = mock_page.call_args[1]
+        assert kwargs['cursor'] == (91, 9)
+        assert kwargs['backward'] is False
+        update.message.reply_text.assert_not_called()
+        text = update.callback_query.edit_message_text.call_args[0][0]
+        assert "11. **111A**" in text
+        navigation = update.callback_query.edit_message_text.call_args[1]['reply_markup'].inline_keyboard[0]
+        assert [button.callback_data for button in navigation] == ["sr|0|<89.11|binary"]
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problems_page')
+    async def test_not_found_pages_escape_markdown(self, mock_page, mock_session, telegram_bot, mock_context):
+        """Тест что запрос и тема в ответах «не найдено» экранируются."""
+        mock_page.return_value = ([], None)
+        update = AsyncMock()
+
+        update.callback_query.data = "sr|1|91.9|a_b"
+        await telegram_bot.search_callback(update, mock_context)
+        assert "'a\\_b'" in update.callback_query.edit_message_text.call_args[0][0]
+
+        update.callback_query.data = "pk|p|3500|*special"
+        await telegram_bot.picker_callback(update, mock_context)
+        assert "'\\*special'" in update.callback_query.edit_message_text.call_args[0][0]
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problems_page')
+    async def test_picker_backward_page(self, mock_page, mock_session, telegram_bot, mock_context):
+        """Тест перехода назад в подборщике: кнопка «Дальше» есть всегда."""
+        from services.problem_views import ProblemView
+
+        mock_page.return_value = ([ProblemView(5, 105, 'A', 'P', 1200, 50)], (50, 5))
+        update = AsyncMock()
+        update.callback_query.data = "pk|p|1200|dp|1|<40.6"
+
+        await telegram_bot.picker_callback(update, mock_context)
+
+        assert mock_page.call_args[1]['backward'] is True
+        navigation = update.callback_query.edit_message_text.call_args[1]['reply_markup'].inline_keyboard[0]
+        assert [button.callback_data for button in navigation] == ["pk|p|1200|dp||<50.5", "pk|p|1200|dp|2|50.5"]
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.search_problems')
+    async def test_handle_text_chatter_skips_database(self, mock_search, mock_session, telegram_bot, mock_update,
+                                                      mock_context):
+        """Тест что сообщение без кода задачи не доходит до поиска."""
+        mock_update.message.text = "hi 2 u"
+
+        await telegram_bot.handle_text(mock_update, mock_context)
+
+        mock_search.assert_not_called()
+        assert "Не понял ваш запрос" in mock_update.message.reply_text.call_args[0][0]
+        assert telegram_bot.text_filter.stats['not_a_query'] == 1
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.search_problems')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problem_by_code')
+    async def test_handle_text_single_code_uses_code_lookup(self, mock_by_code, mock_search, mock_session,
+                                                            telegram_bot, mock_update, mock_context):
+        """Тест что один код ищется по индексу кода, а не поиском по тексту."""
+        from services.problem_views import ProblemView
+
+        mock_by_code.return_value = ProblemView(1, 1850, 'G', 'The Morning Star', 1500, 10)
+        mock_update.message.text = "подскажи 1850g"
+
+        await telegram_bot.handle_text(mock_update, mock_context)
+
+        mock_search.assert_not_called()
+        assert mock_by_code.call_args[0][1:] == (1850, 'G')
+        assert "Задача 1850G" in mock_update.message.reply_text.call_args[0][0]
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problem_by_code')
+    async def test_handle_text_remembers_misses(self, mock_by_code, mock_session, telegram_bot, mock_update,
+                                                mock_context):
+        """Тест что повторный запрос кода без результатов не ищется снова."""
+        mock_by_code.return_value = None
+        mock_update.message.text = "99999Z"
+
+        await telegram_bot.handle_text(mock_update, mock_context)
+        await telegram_bot.handle_text(mock_update, mock_context)
+
+        mock_by_code.assert_called_once()
+        assert mock_by_code.call_args[0][1:] == (99999, 'Z')
+        assert telegram_bot.text_filter.stats['known_miss'] == 1
+        assert mock_update.message.reply_text.call_count == 2
+
+    @pytest.mark.asyncio
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    @patch('bot.telegram_bot.AsyncTaskService.get_problem_by_code')
+    async def test_handle_text_rate_limited_without_reply(self, mock_by_code, mock_session, telegram_bot,
+                                                          mock_update, mock_context):
+        """Тест что сверх лимита чата сообщения отбрасываются молча."""
+        from bot.text_filter import FreeTextFilter
+
+        telegram_bot.text_filter = FreeTextFilter(rate_per_minute=1, burst=1)
+        mock_by_code.return_value = None
+        mock_update.message.text = "1850A"
+        await telegram_bot.handle_text(mock_update, mock_context)
+
+        mock_update.message.text = "1850B"
+        await telegram_bot.handle_text(mock_update, mock_context)
+
+        mock_by_code.assert_called_once()
+        assert mock_update.message.reply_text.call_count == 1
+        assert telegram_bot.text_filter.stats['rate_limited'] == 1
@@ -0,0 +1,90 @@
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from bot.callback_data import (
+    PickerState, SearchPageState, MAX_CALLBACK_DATA_BYTES, PICKER_PATTERN, STEP_RATINGS, STEP_TOPICS, STEP_PAGE
+)
+
+
+class TestPickerState:
+    """Тесты состояния подборщика в callback_data"""
+
+    def test_round_trip(self):
+        """Тест кодирования и разбора полного состояния"""
+        state = PickerState(STEP_PAGE, 1200, "divide and conquer", 3, (1500, 42))
+
+        data = state.encode()
+
+        assert data == "pk|p|1200|divide and conquer|3|1500.42"
+        assert PickerState.decode(data) == state
+
+    def test_trailing_fields_dropped(self):
+        """Тест что пустые поля в конце не занимают место"""
+        assert PickerState(STEP_RATINGS).encode() == "pk|r"
+        assert PickerState(STEP_TOPICS, 800).encode() == "pk|t|800"
+        assert PickerState.decode("pk|t|800") == PickerState(STEP_TOPICS, 800)
+
+    def test_page_without_topic(self):
+        """Тест страницы без темы"""
+        state = PickerState.decode(PickerState(STEP_PAGE, 800, None, 1, (10, 5)).encode())
+
+        assert state.topic is None
+        assert state.page == 1
+        assert state.cursor == (10, 5)
+
+    def test_backward_cursor(self):
+        """Тест курсора страницы перед ним"""
+        state = PickerState(STEP_PAGE, 1200, "dp", 1, (1500, 42), backward=True)
+
+        assert state.encode() == "pk|p|1200|dp|1|<1500.42"
+        assert PickerState.decode(state.encode()) == state
+
+    def test_too_long(self):
+        """Тест что данные длиннее лимита Telegram не кодируются"""
+        with pytest.raises(ValueError):
+            PickerState(STEP_PAGE, 1200, "x" * MAX_CALLBACK_DATA_BYTES).encode()
+
+    @pytest.mark.parametrize("data", ["", "pk", "xx|r", "pk|z", "pk|p|abc", "pk|p|1|a|1|2.b", "pk|p|1|2|3|4|5"])
+    def test_invalid_data(self, data):
+        """Тест разбора чужих и поврежденных данных"""
+        with pytest.raises(ValueError):
+            PickerState.decode(data)
+
+    def test_pattern(self):
+        """Тест шаблона для CallbackQueryHandler"""
+        import re
+        assert re.match(PICKER_PATTERN, "pk|r")
+        assert not re.match(PICKER_PATTERN, "pkx|r")
+
+
+class TestSearchPageState:
+    """Тесты страницы /search в callback_data"""
+
+    def test_round_trip(self):
+        """Тест кодирования и разбора, запрос может содержать разделитель"""
+        state = SearchPageState("binary | search", 2, (300, 7), backward=True)
+
+        data = state.encode()
+
+        assert data == "sr|2|<300.7|binary | search"
+        assert SearchPageState.decode(data) == state
+
+    def test_first_page(self):
+        """Тест первой страницы без курсора"""
+        state = SearchPageState.decode(SearchPageState("dp").encode())
+
+        assert state.page == 0
+        assert state.cursor is None
+        assert not state.backward
+
+    def test_long_query(self):
+        """Тест что длинный запрос не кодируется"""
+        with pytest.raises(ValueError):
+            SearchPageState("запрос" * 10, 1, (1, 1)).encode()
+
+    @pytest.mark.parametrize("data", ["sr", "sr|1|", "pk|1||dp", "sr|x||dp", "sr|1|1.x|dp"])
+    def test_invalid_data(self, data):
+        """Тест разбора чужих и поврежденных данных"""
+        with pytest.raises(ValueError):
+            SearchPageState.decode(data)
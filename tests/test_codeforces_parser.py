@@ -17,6 +17,13 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 class TestCodeforcesParser:
     """Тесты для CodeforcesParser"""
 
+    @pytest.fixture(autouse=True)
+    def dataset_version(self):
+        """Загрузки в тестах не меняют версию набора задач процесса"""
+        with patch('parser.codeforces_parser.bump_stored_dataset_version', return_value=1), \
+                patch('parser.codeforces_parser.mark_dataset_updated'):
+            yield
+
     @pytest.fixture
     def parser(self):
         return CodeforcesParser()
@@ -129,6 +136,36 @@ class TestCodeforcesParser:
         assert mock_db.commit.called
         assert mock_db.add.call_count >= 2
 
+    @patch('parser.codeforces_parser.mark_dataset_updated')
+    @patch('parser.codeforces_parser.bump_stored_dataset_version')
+    @patch.object(CodeforcesParser, 'fetch_problems')
+    def test_parse_and_save_problems_bumps_dataset_version(self, mock_fetch, mock_bump, mock_mark, parser, mock_db,
+                                                           sample_problems_data):
+        """Тест увеличения общей версии до коммита и уведомления после него"""
+        mock_fetch.return_value = sample_problems_data['result']
+        mock_db.query.return_value.filter_by.return_value.first.return_value = None
+        calls = []
+        mock_bump.side_effect = lambda db: calls.append('bump') or 7
+        mock_db.commit.side_effect = lambda: calls.append('commit')
+
+        assert parser.parse_and_save_problems(mock_db) is True
+
+        assert calls == ['bump', 'commit']
+        mock_bump.assert_called_once_with(mock_db)
+        mock_mark.assert_called_once_with(mock_db, 7)
+
+    def test_refresh_topic_columns(self, parser, mock_db):
+        """Тест пересчета битов тем, масок и массивов тем задач одним проходом"""
+        parser._refresh_topic_columns(mock_db)
+
+        assert mock_db.flush.called
+        statements = [str(call[0][0]) for call in mock_db.execute.call_args_list]
+        assert len(statements) == 2
+        assert "UPDATE topics SET bit" in statements[0]
+        assert mock_db.execute.call_args_list[0][0][1] == {'max_bits': 63}
+        assert "BIT_OR" in statements[1]
+        assert "ARRAY_AGG" in statements[1]
+
     @patch.object(CodeforcesParser, 'fetch_problems')
     def test_parse_and_save_problems_fetch_failed(self, mock_fetch, parser, mock_db):
         """Тест случая когда fetch_problems возвращает None"""
@@ -0,0 +1,72 @@
+import sys
+import os
+from unittest.mock import MagicMock, patch
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from bot.keyboards import ReplyKeyboards, RATING_BUTTONS, TOPIC_BUTTONS
+
+
+def labels(markup):
+    return [[button.text for button in row] for row in markup.keyboard]
+
+
+class TestReplyKeyboards:
+    """Тесты клавиатур /problems, собранных заранее"""
+
+    def test_not_built(self):
+        """Тест что несобранные клавиатуры не считаются актуальными"""
+        keyboards = ReplyKeyboards()
+
+        assert not keyboards.current
+        assert keyboards.ratings() is None
+        assert keyboards.topics(800) is None
+
+    def test_ratings_keyboard(self):
+        """Тест клавиатуры сложностей по две кнопки в ряд"""
+        keyboards = ReplyKeyboards()
+        keyboards.build(list(range(800, 2100, 100)), [])
+
+        rows = labels(keyboards.ratings())
+        assert rows[0] == ["⭐ 800", "⭐ 900"]
+        assert sum(len(row) for row in rows) == RATING_BUTTONS
+
+    def test_topics_per_rating(self):
+        """Тест клавиатур тем: по убыванию количества, без пустых тем"""
+        keyboards = ReplyKeyboards()
+        keyboards.build([800, 900], [
+            (800, "math", 5, 1.0), (800, "dp", 5, 1.0), (800, "greedy", 9, 1.0),
+            (800, "graphs", 0, 0.0), (900, "dp", 1, 1.0),
+        ])
+
+        assert labels(keyboards.topics(800)) == [["📚 greedy (9)", "📚 dp (5)"], ["📚 math (5)"]]
+        assert labels(keyboards.topics(900)) == [["📚 dp (1)"]]
+        assert keyboards.topics(1000) is None
+
+    def test_topics_limit(self):
+        """Тест ограничения числа тем на клавиатуре"""
+        keyboards = ReplyKeyboards()
+        keyboards.build([800], [(800, f"t{i}", 100 - i, 1.0) for i in range(30)])
+
+        assert sum(len(row) for row in keyboards.topics(800).keyboard) == TOPIC_BUTTONS
+
+    def test_stale_after_dataset_update(self):
+        """Тест что клавиатуры устаревают со сменой версии набора задач"""
+        keyboards = ReplyKeyboards()
+        keyboards.build([800], [])
+        assert keyboards.current
+
+        with patch('bot.keyboards.get_dataset_version', return_value=keyboards._version + 1):
+            assert not keyboards.current
+
+    @patch('bot.keyboards.TaskService.get_rating_topic_stats', return_value=[(800, "dp", 3, 1.0)])
+    @patch('bot.keyboards.TaskService.get_available_ratings', return_value=[800])
+    def test_rebuild_from_database(self, mock_ratings, mock_stats):
+        """Тест пересборки двумя запросами"""
+        keyboards = ReplyKeyboards()
+        db = MagicMock()
+
+        keyboards.rebuild(db)
+
+        mock_ratings.assert_called_once_with(db)
+        mock_stats.assert_called_once_with(db)
+        assert keyboards.current
+        assert labels(keyboards.topics(800)) == [["📚 dp (3)"]]
@@ -215,6 +215,17 @@ class TestModelConstraints:
         name_col = inspector.columns['name']
         assert name_col.nullable is False
 
+    def test_topic_bitmask_columns(self):
+        """Тест колонок битовой маски тем"""
+        from sqlalchemy import inspect
+
+        topic_mask_col = inspect(Problem).columns['topic_mask']
+        bit_col = inspect(Topic).columns['bit']
+
+        assert topic_mask_col.nullable is False
+        assert topic_mask_col.server_default is not None
+        assert bit_col.unique is True
+
 
 class TestModelIntegration:
     """Интеграционные тесты моделей"""
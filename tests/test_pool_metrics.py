@@ -0,0 +1,58 @@
+import sqlite3
+import sys
+import os
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from database.pool_metrics import PoolMetrics, metered_pool_class
+
+
+class TestPoolMetrics:
+    """Тесты метрик пула соединений"""
+
+    def make_pool(self, metrics, **kwargs):
+        pool_class = metered_pool_class(QueuePool, metrics)
+        return pool_class(lambda: sqlite3.connect(':memory:'), **kwargs)
+
+    def test_checkouts_are_counted(self):
+        """Тест учета выдачи соединений и использования пула"""
+        metrics = PoolMetrics()
+        pool = self.make_pool(metrics, pool_size=2, max_overflow=0)
+
+        first = pool.connect()
+        second = pool.connect()
+        stats = metrics.snapshot(pool)
+
+        assert stats['checkouts'] == 2
+        assert stats['checked_out'] == 2
+        assert stats['pool_size'] == 2
+        assert stats['wait_max_ms'] >= stats['wait_avg_ms'] >= 0
+
+        first.close()
+        second.close()
+        assert metrics.snapshot(pool)['checked_out'] == 0
+
+    def test_timeouts_are_counted(self):
+        """Тест учета таймаутов ожидания соединения"""
+        metrics = PoolMetrics()
+        pool = self.make_pool(metrics, pool_size=1, max_overflow=0, timeout=0.01)
+
+        connection = pool.connect()
+        with pytest.raises(PoolTimeoutError):
+            pool.connect()
+
+        stats = metrics.snapshot(pool)
+        assert stats['checkouts'] == 1
+        assert stats['timeouts'] == 1
+        connection.close()
+
+    def test_pool_class_survives_recreate(self):
+        """Тест что пересозданный пул тоже записывает метрики"""
+        metrics = PoolMetrics()
+        pool = self.make_pool(metrics).recreate()
+
+        pool.connect().close()
+
+        assert type(pool).__name__ == 'MeteredQueuePool'
+        assert metrics.checkouts == 1
@@ -0,0 +1,69 @@
+import sys
+import os
+from unittest.mock import MagicMock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from services.problem_index import ProblemIndex
+from services.problem_views import ProblemView
+
+
+def make_index():
+    index = ProblemIndex()
+    index.build([
+        ProblemView(1, 1850, 'G', 'The Morning Star', 1500, 100, ('math',)),
+        ProblemView(2, 1850, 'A', 'To My Critics', 800, 5000),
+        ProblemView(3, 185, 'A', 'Plant', 1300, 300),
+        ProblemView(4, 1851, 'B', 'Binary Search Tree', 1700, 700),
+        ProblemView(5, 1900, 'C', 'Binary String', 1100, 900),
+    ])
+    return index
+
+
+class TestProblemIndex:
+    """Тесты индекса inline-поиска"""
+
+    def test_empty_index(self):
+        """Тест что несобранный индекс ничего не находит"""
+        index = ProblemIndex()
+        assert not index.built
+        assert index.search("1850G") == []
+
+    def test_exact_code_first(self):
+        """Тест что точное совпадение кода идет первым"""
+        found = make_index().search("185A")
+        assert found[0].full_code == "185A"
+
+    def test_code_prefix(self):
+        """Тест поиска по префиксу кода, новые контесты первыми"""
+        found = make_index().search("1850")
+        assert [p.full_code for p in found] == ["1850A", "1850G"]
+
+    def test_code_with_space(self):
+        """Тест кода, записанного через пробел"""
+        found = make_index().search("1850 g")
+        assert [p.full_code for p in found] == ["1850G"]
+
+    def test_name_words_by_popularity(self):
+        """Тест поиска по префиксам слов названия по убыванию решений"""
+        found = make_index().search("bin")
+        assert [p.full_code for p in found] == ["1900C", "1851B"]
+
+    def test_all_words_must_match(self):
+        """Тест что каждое слово запроса должно совпасть со словом названия"""
+        index = make_index()
+        assert [p.full_code for p in index.search("binary tre")] == ["1851B"]
+        assert index.search("binary morning") == []
+
+    def test_limit(self):
+        """Тест ограничения числа результатов"""
+        assert len(make_index().search("1", limit=2)) == 2
+
+    def test_rebuild_from_database(self):
+        """Тест пересборки индекса из БД"""
+        index = ProblemIndex()
+        db = MagicMock()
+        db.query.return_value.all.return_value = [(1, 1850, 'G', 'The Morning Star', 1500, 100, ['math'])]
+
+        index.rebuild(db)
+
+        assert index.built
+        assert index.search("morning")[0].topics == ('math',)
@@ -0,0 +1,137 @@
+import pytest
+import sys
+import os
+from unittest.mock import Mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.models import Base, Problem, Topic
+from services import dataset
+from services.problem_pools import ProblemPools
+
+
+class TestDatasetVersion:
+    """Тесты версии набора задач"""
+
+    def test_mark_dataset_updated_bumps_version_and_notifies(self):
+        """Тест увеличения версии и вызова обработчиков"""
+        callback = Mock()
+        dataset.on_dataset_updated(callback)
+        db = Mock()
+        before = dataset.get_dataset_version()
+
+        try:
+            version = dataset.mark_dataset_updated(db)
+        finally:
+            dataset._listeners.remove(callback)
+
+        assert version == before + 1
+        assert dataset.get_dataset_version() == version
+        callback.assert_called_once_with(db)
+
+    def test_listener_error_does_not_break_update(self):
+        """Тест что ошибка обработчика не прерывает обновление"""
+        failing = Mock(side_effect=Exception("boom"))
+        succeeding = Mock()
+        dataset.on_dataset_updated(failing)
+        dataset.on_dataset_updated(succeeding)
+
+        try:
+            dataset.mark_dataset_updated(Mock())
+        finally:
+            dataset._listeners.remove(failing)
+            dataset._listeners.remove(succeeding)
+
+        assert succeeding.called
+
+    def test_shared_version_round_trip(self):
+        """Тест общей версии в таблице dataset_version и ее синхронизации в другом процессе"""
+        test_engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(test_engine)
+        db = sessionmaker(bind=test_engine)()
+        callback = Mock()
+        dataset.on_dataset_updated(callback)
+        local_version = dataset._version
+
+        try:
+            assert dataset.get_stored_dataset_version(db) == 0
+            assert dataset.bump_stored_dataset_version(db) == 1
+            assert dataset.bump_stored_dataset_version(db) == 2
+            db.commit()
+
+            dataset._version = 0
+            assert dataset.sync_dataset_version(db) is True
+            assert dataset.get_dataset_version() == 2
+            assert dataset.sync_dataset_version(db) is False
+            assert dataset.sync_dataset_version(db, force=True) is True
+        finally:
+            dataset._listeners.remove(callback)
+            dataset._version = local_version
+            db.close()
+            test_engine.dispose()
+
+        assert callback.call_count == 2
+
+
+class TestProblemPools:
+    """Тесты пулов задач"""
+
+    @pytest.fixture
+    def db(self):
+        test_engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(test_engine)
+        session = sessionmaker(bind=test_engine)()
+        dp, math = Topic(name='dp'), Topic(name='math')
+        for contest_id in range(1, 6):
+            problem = Problem(contest_id=contest_id, problem_index='A', name=f'P{contest_id}',
+                              rating=1200, solved_count=contest_id)
+            topic = dp if contest_id % 2 else math
+            problem.topics.append(topic)
+            problem.tags = [topic.name]
+            session.add(problem)
+        session.add(Problem(contest_id=1, problem_index='B', name='P1B', rating=1200, solved_count=1))
+        session.add(Problem(contest_id=9, problem_index='A', name='No rating'))
+        session.commit()
+        yield session
+        session.close()
+        test_engine.dispose()
+
+    @pytest.fixture
+    def pools(self, db):
+        pools = ProblemPools()
+        pools.rebuild(db)
+        return pools
+
+    def test_rebuild_groups_by_rating_and_topic(self, pools):
+        """Тест группировки по сложности и теме"""
+        assert pools.built is True
+        assert pools.size(1200) == 6
+        assert pools.size(1200, 'dp') == 3
+        assert pools.size(1200, 'math') == 2
+        assert pools.size(800) == 0
+
+    def test_pick_cycles_through_pool_without_repeats(self, pools, db):
+        """Тест что задачи не повторяются до исчерпания пула"""
+        picked = [pools.pick(1200, 'dp').contest_id for _ in range(3)]
+
+        assert sorted(picked) == [1, 3, 5]
+        assert pools.pick(1200, 'dp') is not None
+
+    def test_pick_missing_pool(self, pools):
+        """Тест выбора из несуществующего пула"""
+        assert pools.pick(3500) is None
+        assert pools.pick_many(3500) == []
+
+    def test_pick_many_distinct_contests(self, pools):
+        """Тест выбора задач из разных контестов"""
+        problems = pools.pick_many(1200, count=10)
+        contests = [p.contest_id for p in problems]
+
+        assert sorted(contests) == [1, 2, 3, 4, 5]
+
+    def test_pooled_problem_properties(self, pools):
+        """Тест свойств задачи из пула"""
+        problem = pools.pick(1200, 'math')
+
+        assert problem.full_code == f"{problem.contest_id}A"
+        assert problem.codeforces_url.endswith(f"/{problem.contest_id}/A")
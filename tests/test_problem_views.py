@@ -0,0 +1,94 @@
+import pickle
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.models import Base, Problem, Topic
+from services.problem_views import ProblemView, problem_view_columns, build_problem_views
+from services.task_services import TaskService
+
+
+class TestProblemView:
+    """Тесты неизменяемого представления задачи"""
+
+    @pytest.fixture
+    def view(self):
+        return ProblemView(1, 123, "A", "Test Problem", 800, 1500, ["math", "dp"])
+
+    def test_properties(self, view):
+        """Тест свойств представления"""
+        assert view.full_code == "123A"
+        assert view.codeforces_url == "https://codeforces.com/problemset/problem/123/A"
+        assert view.topics == ("math", "dp")
+        assert repr(view) == "ProblemView(123A: Test Problem, rating: 800)"
+
+    def test_immutable(self, view):
+        """Тест что представление нельзя изменить"""
+        with pytest.raises(AttributeError):
+            view.name = "Other"
+        with pytest.raises(AttributeError):
+            del view.rating
+        assert not hasattr(view, '__dict__')
+
+    def test_none_solved_count(self):
+        """Тест что пустое число решений становится нулем"""
+        assert ProblemView(1, 1, "A", "P", None, None).solved_count == 0
+
+    def test_equality_and_pickle(self, view):
+        """Тест сравнения и сериализации"""
+        restored = pickle.loads(pickle.dumps(view))
+
+        assert restored == view
+        assert hash(restored) == hash(view)
+        assert restored.topics == view.topics
+
+
+class TestBuildProblemViews:
+    """Тесты построения представлений из строк запроса"""
+
+    @pytest.fixture
+    def db(self):
+        test_engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(test_engine)
+        session = sessionmaker(bind=test_engine)()
+        problem = Problem(contest_id=123, problem_index='A', name='Test', rating=800, solved_count=10,
+                          tags=['dp', 'math'])
+        problem.topics.extend([Topic(name='math'), Topic(name='dp')])
+        session.add(problem)
+        session.add(Problem(contest_id=124, problem_index='B', name='No topics', rating=900))
+        session.commit()
+        yield session
+        session.close()
+        test_engine.dispose()
+
+    def test_build_detail_reads_tags_column(self, db):
+        """Тест что профиль detail берет темы из колонки tags без соединений"""
+        query = db.query(*problem_view_columns('detail')).order_by(Problem.id)
+
+        views = build_problem_views(query.all(), 'detail')
+
+        assert 'JOIN' not in str(query)
+        assert [view.full_code for view in views] == ["123A", "124B"]
+        assert views[0].topics == ("dp", "math")
+        assert views[1].topics == ()
+
+    def test_build_list_has_no_topics(self, db):
+        """Тест профиля list"""
+        views = build_problem_views(db.query(*problem_view_columns('list')).all(), 'list')
+
+        assert all(view.topics == () for view in views)
+
+    def test_unknown_profile(self):
+        """Тест неизвестного профиля загрузки"""
+        with pytest.raises(ValueError):
+            problem_view_columns('full')
+
+    def test_service_returns_detached_views(self, db):
+        """Тест что сервис возвращает представления, пригодные после закрытия сессии"""
+        problem = TaskService.get_problem_by_code(db, 123, 'A')
+        db.close()
+
+        assert isinstance(problem, ProblemView)
+        assert problem.topics == ("dp", "math")
@@ -0,0 +1,102 @@
+import sys
+import os
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from services.query_cache import QueryCache
+
+
+class TestQueryCache:
+    """Тесты кэша результатов запросов"""
+
+    def test_repeated_call_hits_cache(self):
+        """Тест что повторный вызов не обращается к БД"""
+        cache = QueryCache()
+        func = Mock(return_value=[800, 900])
+
+        first = cache.call(func, Mock(), 1200, topic='dp')
+        second = cache.call(func, Mock(), 1200, topic='dp')
+
+        assert first == second == [800, 900]
+        func.assert_called_once()
+        assert cache.stats == {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1}
+
+    def test_call_async_shares_entries_logic(self):
+        """Тест кэширования результатов асинхронных методов"""
+        cache = QueryCache()
+        func = AsyncMock(return_value=[800, 900])
+
+        first = asyncio.run(cache.call_async(func, Mock(), 1200))
+        second = asyncio.run(cache.call_async(func, Mock(), 1200))
+
+        assert first == second == [800, 900]
+        func.assert_awaited_once()
+        assert cache.stats['hits'] == 1
+
+    def test_different_arguments_are_separate_entries(self):
+        """Тест что разные аргументы кэшируются отдельно"""
+        cache = QueryCache()
+        func = Mock(side_effect=lambda db, rating: rating)
+
+        assert cache.call(func, Mock(), 800) == 800
+        assert cache.call(func, Mock(), 900) == 900
+        assert func.call_count == 2
+
+    def test_lru_eviction(self):
+        """Тест вытеснения самой старой записи"""
+        cache = QueryCache(max_size=2)
+        func = Mock(side_effect=lambda db, key: key)
+
+        cache.call(func, Mock(), 'a')
+        cache.call(func, Mock(), 'b')
+        cache.call(func, Mock(), 'a')
+        cache.call(func, Mock(), 'c')
+        cache.call(func, Mock(), 'a')
+        cache.call(func, Mock(), 'b')
+
+        assert func.call_count == 4
+        assert cache.stats['evictions'] == 2
+
+    @patch('services.query_cache.time.monotonic')
+    def test_ttl_expiration(self, mock_monotonic):
+        """Тест истечения времени жизни записи"""
+        cache = QueryCache(ttl_seconds=10)
+        func = Mock(return_value=1)
+
+        mock_monotonic.return_value = 100.0
+        cache.call(func, Mock())
+        mock_monotonic.return_value = 105.0
+        cache.call(func, Mock())
+        mock_monotonic.return_value = 111.0
+        cache.call(func, Mock())
+
+        assert func.call_count == 2
+
+    @patch('services.query_cache.get_dataset_version')
+    def test_dataset_version_change_invalidates(self, mock_version):
+        """Тест сброса кэша при смене версии набора задач"""
+        mock_version.return_value = 1
+        cache = QueryCache()
+        func = Mock(return_value=1)
+
+        cache.call(func, Mock())
+        cache.call(func, Mock())
+        mock_version.return_value = 2
+        cache.call(func, Mock())
+
+        assert func.call_count == 2
+
+    @patch('services.query_cache.get_dataset_version')
+    def test_result_from_old_version_not_stored(self, mock_version):
+        """Тест что результат, полученный во время смены версии, не кэшируется"""
+        mock_version.return_value = 1
+        cache = QueryCache()
+
+        def query(db):
+            mock_version.return_value = 2
+            cache.call(Mock(return_value=0), db)
+            return 'old'
+
+        cache.call(query, Mock())
+
+        assert cache.stats['size'] == 1
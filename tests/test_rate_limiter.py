@@ -0,0 +1,106 @@
+import asyncio
+import sys
+import os
+import time
+import pytest
+from telegram.error import RetryAfter
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from bot.rate_limiter import PriorityRateLimiter, INTERACTIVE, BULK
+
+
+def make_send(log, name):
+    async def send():
+        log.append((name, time.monotonic()))
+        return name
+    return send
+
+
+class TestPriorityRateLimiter:
+    """Тесты темпа исходящих сообщений"""
+
+    @pytest.mark.asyncio
+    async def test_same_chat_is_paced(self):
+        """Тест интервала между сообщениями в один чат"""
+        limiter = PriorityRateLimiter(overall_per_second=1000, chat_per_second=20)
+        log = []
+
+        await asyncio.gather(*[
+            limiter.process_request(make_send(log, i), (), {}, 'sendMessage', {'chat_id': 1}, None)
+            for i in range(3)
+        ])
+
+        times = [moment for _, moment in log]
+        assert [name for name, _ in log] == [0, 1, 2]
+        assert times[2] - times[0] >= 0.09
+        assert limiter.stats['sent'] == 3
+
+    @pytest.mark.asyncio
+    async def test_different_chats_not_delayed_by_chat_limit(self):
+        """Тест что лимит чата не задерживает другие чаты"""
+        limiter = PriorityRateLimiter(overall_per_second=1000, chat_per_second=1)
+        log = []
+        started = time.monotonic()
+
+        await asyncio.gather(*[
+            limiter.process_request(make_send(log, chat), (), {}, 'sendMessage', {'chat_id': chat}, None)
+            for chat in range(5)
+        ])
+
+        assert time.monotonic() - started < 0.5
+
+    @pytest.mark.asyncio
+    async def test_interactive_before_bulk(self):
+        """Тест что ответы пользователям обгоняют массовую рассылку"""
+        limiter = PriorityRateLimiter(overall_per_second=50, chat_per_second=1000)
+        log = []
+
+        bulk = [
+            limiter.process_request(make_send(log, f"bulk{i}"), (), {}, 'sendMessage', {'chat_id': 100 + i},
+                                    {'priority': BULK})
+            for i in range(5)
+        ]
+        interactive = limiter.process_request(make_send(log, "reply"), (), {}, 'sendMessage', {'chat_id': 1},
+                                              {'priority': INTERACTIVE})
+        await asyncio.gather(*bulk, interactive)
+
+        order = [name for name, _ in log]
+        assert order.index("reply") <= 1
+
+    @pytest.mark.asyncio
+    async def test_retry_after_flood_wait(self):
+        """Тест повтора после RetryAfter"""
+        limiter = PriorityRateLimiter(overall_per_second=1000, chat_per_second=1000)
+        calls = []
+
+        async def send():
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise RetryAfter(0)
+            return True
+
+        assert await limiter.process_request(send, (), {}, 'sendMessage', {'chat_id': 1}, None) is True
+        assert len(calls) == 2
+        assert limiter.stats['retries'] == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_limit(self):
+        """Тест что после max_retries ошибка передается дальше"""
+        limiter = PriorityRateLimiter(max_retries=1)
+
+        async def send():
+            raise RetryAfter(0)
+
+        with pytest.raises(RetryAfter):
+            await limiter.process_request(send, (), {}, 'sendMessage', {'chat_id': 1}, None)
+
+    @pytest.mark.asyncio
+    async def test_requests_without_chat_not_paced(self):
+        """Тест что запросы без чата не ждут слотов"""
+        limiter = PriorityRateLimiter(overall_per_second=1, chat_per_second=1)
+        log = []
+
+        for i in range(3):
+            await limiter.process_request(make_send(log, i), (), {}, 'getMe', {}, None)
+
+        assert log[-1][1] - log[0][1] < 0.1
+        assert limiter.stats['queued'] == 0
@@ -0,0 +1,71 @@
+import sys
+import os
+from unittest.mock import patch
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from bot.rendering import ProblemRenderer, markdown
+from services.problem_views import ProblemView
+
+
+def make_problem(name="Binary_Search *hard*", topics=("dp",), solved=100):
+    return ProblemView(1, 1850, 'G', name, 1500, solved, topics)
+
+
+class TestProblemRenderer:
+    """Тесты кэша отрисованных фрагментов"""
+
+    def test_markdown_escaping(self):
+        """Тест экранирования служебных символов Markdown"""
+        assert markdown("a_b *c* `d` [e]") == "a\\_b \\*c\\* \\`d\\` \\[e]"
+
+    def test_listing_escapes_names_once(self):
+        """Тест что название экранируется, а фрагмент строится один раз"""
+        renderer = ProblemRenderer()
+        problem = make_problem()
+
+        first = renderer.listing([problem], 'search')
+        second = renderer.listing([problem], 'search', start=11)
+
+        assert first.startswith("1. **1850G**: Binary\\_Search \\*hard\\*\n")
+        assert second.startswith("11. **1850G**")
+        assert renderer.stats == {'hits': 1, 'misses': 1, 'size': 1}
+
+    def test_details_card(self):
+        """Тест карточки задачи"""
+        text = ProblemRenderer().details(make_problem(topics=("dp", "brute force")))
+
+        assert "🎯 **Задача 1850G**" in text
+        assert "**Темы:** dp, brute force" in text
+        assert text.endswith("(https://codeforces.com/problemset/problem/1850/G)")
+
+    def test_details_depend_on_topics(self):
+        """Тест что карточка без тем не подменяет карточку с темами"""
+        renderer = ProblemRenderer()
+
+        renderer.details(make_problem(topics=()))
+
+        assert "Темы" in renderer.details(make_problem(topics=("dp",)))
+
+    def test_invalidated_by_dataset_version(self):
+        """Тест сброса фрагментов после загрузки новых задач"""
+        renderer = ProblemRenderer()
+        renderer.fragment(make_problem(solved=100), 'solved')
+
+        with patch('bot.rendering.get_dataset_version', return_value=renderer._version + 1):
+            text = renderer.fragment(make_problem(solved=200), 'solved')
+
+        assert "Решений: 200" in text
+
+    def test_invalidated_by_ttl(self):
+        """Тест сброса фрагментов по времени жизни"""
+        renderer = ProblemRenderer(ttl_seconds=0)
+        renderer.fragment(make_problem(solved=100), 'solved')
+
+        assert "Решений: 200" in renderer.fragment(make_problem(solved=200), 'solved')
+
+    def test_max_size(self):
+        """Тест ограничения размера кэша"""
+        renderer = ProblemRenderer(max_size=2)
+        for contest_id in range(5):
+            renderer.fragment(ProblemView(contest_id, contest_id, 'A', 'P', 800, 1), 'link')
+
+        assert renderer.stats['size'] <= 2
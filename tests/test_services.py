@@ -1,10 +1,14 @@
 import pytest
+from collections import namedtuple
 import sys
 import os
-from unittest.mock import Mock
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
-from services.task_services import TaskService
+from sqlalchemy.dialects import postgresql
+from services.task_services import TaskService, AsyncTaskService, SAMPLE_OVERSAMPLING
+from services.problem_views import ProblemView, PROBLEM_VIEW_COLUMNS, problem_view_columns
 from database.models import Problem, Topic
 import logging
 
@@ -22,12 +26,18 @@ class TestTaskService:
 
     @pytest.fixture
     def sample_problems(self):
+        row = namedtuple('Row', [column.key for column in problem_view_columns('detail')])
         return [
-            Mock(spec=Problem, contest_id=1, problem_index='A', name='Problem A', rating=1500),
-            Mock(spec=Problem, contest_id=2, problem_index='B', name='Problem B', rating=1600),
-            Mock(spec=Problem, contest_id=3, problem_index='C', name='Problem C', rating=1500)
+            row(1, 1, 'A', 'Problem A', 1500, 100, ['dp']),
+            row(2, 2, 'B', 'Problem B', 1600, 200, []),
+            row(3, 3, 'C', 'Problem C', 1500, 300, ['math'])
         ]
 
+    @pytest.fixture
+    def sample_rows(self, sample_problems):
+        row = namedtuple('Row', [column.key for column in PROBLEM_VIEW_COLUMNS])
+        return [row(*problem[:-1]) for problem in sample_problems]
+
     @pytest.fixture
     def sample_topics(self):
         return [
@@ -36,29 +46,47 @@ class TestTaskService:
             Mock(spec=Topic, name='greedy')
         ]
 
-    def test_get_problems_by_filters_no_filters(self, mock_db, sample_problems):
+    def test_get_problems_by_filters_no_filters(self, mock_db, sample_rows):
         """Тест получения задач без фильтров"""
         mock_query = Mock()
         mock_db.query.return_value = mock_query
-        mock_query.distinct.return_value = mock_query
+        mock_query.filter.return_value = mock_query
+        mock_query.order_by.return_value = mock_query
         mock_query.limit.return_value = mock_query
-        mock_query.all.return_value = sample_problems[:2]
+        mock_query.all.side_effect = [sample_rows[:2], []]
         result = TaskService.get_problems_by_filters(mock_db)
-        mock_db.query.assert_called_once_with(Problem)
-        mock_query.distinct.assert_called_once_with(Problem.contest_id)
-        mock_query.limit.assert_called_once_with(10)
-        mock_query.all.assert_called_once()
+        mock_db.query.assert_called_once_with(*PROBLEM_VIEW_COLUMNS)
+        mock_query.order_by.assert_called_with(Problem.random_key)
+        mock_query.limit.assert_called_with(10 * SAMPLE_OVERSAMPLING)
+        assert not mock_query.distinct.called
         assert len(result) == 2
 
     def test_get_problems_by_filters_custom_limit(self, mock_db):
         """Тест получения задач с кастомным лимитом"""
         mock_query = Mock()
         mock_db.query.return_value = mock_query
-        mock_query.distinct.return_value = mock_query
+        mock_query.filter.return_value = mock_query
+        mock_query.order_by.return_value = mock_query
         mock_query.limit.return_value = mock_query
         mock_query.all.return_value = []
         TaskService.get_problems_by_filters(mock_db, limit=20)
-        mock_query.limit.assert_called_once_with(20)
+        mock_query.limit.assert_called_with(20 * SAMPLE_OVERSAMPLING)
+
+    def test_get_problems_by_filters_one_per_contest(self, mock_db):
+        """Тест что выборка берет не больше одной задачи из контеста"""
+        same_contest = [Mock(contest_id=1), Mock(contest_id=1)]
+        other = [Mock(contest_id=2), Mock(contest_id=3)]
+        mock_query = Mock()
+        mock_db.query.return_value = mock_query
+        mock_query.filter.return_value = mock_query
+        mock_query.order_by.return_value = mock_query
+        mock_query.limit.return_value = mock_query
+        mock_query.all.side_effect = [same_contest, other]
+
+        with patch('services.task_services.build_problem_views', side_effect=lambda rows, profile: rows):
+            result = TaskService.get_problems_by_filters(mock_db, limit=2)
+
+        assert [p.contest_id for p in result] == [1, 2]
 
     def test_search_problems_by_name(self, mock_db, sample_problems):
         """Тест поиска задач по названию"""
@@ -177,12 +205,14 @@ class TestTaskService:
         mock_query.filter.return_value = mock_query
         mock_query.first.return_value = sample_problems[0]
         result = TaskService.get_problem_by_code(mock_db, 1, 'A')
-        mock_db.query.assert_called_once_with(Problem)
+        mock_db.query.assert_called_once_with(*problem_view_columns('detail'))
         mock_query.filter.assert_called_once()
         filter_call = mock_query.filter.call_args[0][0]
         assert isinstance(filter_call, type(and_()))
         mock_query.first.assert_called_once()
-        assert result == sample_problems[0]
+        assert isinstance(result, ProblemView)
+        assert result.full_code == '1A'
+        assert result.topics == ('dp',)
 
     def test_get_problem_by_code_not_found(self, mock_db):
         """Тест получения задачи по коду (не найдена)"""
@@ -206,15 +236,15 @@ class TestTaskService:
         assert any('contest_id' in str(clause) for clause in filter_call.clauses)
         assert any('problem_index' in str(clause) for clause in filter_call.clauses)
 
-    def test_combined_filters_integration(self, mock_db, sample_problems):
+    def test_combined_filters_integration(self, mock_db, sample_rows):
         """Интеграционный тест комбинированных фильтров"""
         mock_query = Mock()
         mock_db.query.return_value = mock_query
         mock_query.filter.return_value = mock_query
         mock_query.join.return_value = mock_query
-        mock_query.distinct.return_value = mock_query
+        mock_query.order_by.return_value = mock_query
         mock_query.limit.return_value = mock_query
-        mock_query.all.return_value = [sample_problems[0]]
+        mock_query.all.return_value = [sample_rows[0]]
 
         result = TaskService.get_problems_by_filters(
             mock_db,
@@ -224,7 +254,9 @@ class TestTaskService:
         )
         assert len(result) == 1
         assert mock_query.filter.call_count >= 2
-        assert mock_query.join.called
+        assert not mock_query.join.called
+        topic_filter = str(mock_query.filter.call_args_list[1][0][0].compile(dialect=postgresql.dialect()))
+        assert "problems.tags @>" in topic_filter
 
     def test_search_with_special_characters(self, mock_db):
         """Тест поиска со специальными символами"""
@@ -236,3 +268,226 @@ class TestTaskService:
         result = TaskService.search_problems(mock_db, "test%_problem")
         mock_query.filter.assert_called_once()
         assert len(result) == 0
+
+    def test_extract_problem_codes(self):
+        """Тест извлечения кодов задач из текста"""
+        assert TaskService.extract_problem_codes("1850A 1850b 1851C2") == [(1850, 'A'), (1850, 'B'), (1851, 'C2')]
+        assert TaskService.extract_problem_codes("hi 2 u, 1850 A") == []
+
+    def test_get_topic_bits(self, mock_db):
+        """Тест получения битов тем"""
+        mock_query = Mock()
+        mock_db.query.return_value = mock_query
+        mock_query.filter.return_value = mock_query
+        mock_query.all.return_value = [('dp', 0), ('math', 1)]
+        result = TaskService.get_topic_bits(mock_db)
+        mock_db.query.assert_called_once_with(Topic.name, Topic.bit)
+        assert result == {'dp': 0, 'math': 1}
+
+    def test_get_problems_by_topic_expression(self, mock_db, sample_rows):
+        """Тест фильтра по булеву выражению тем без соединений"""
+        mock_query = Mock()
+        mock_db.query.return_value = mock_query
+        mock_query.filter.return_value = mock_query
+        mock_query.order_by.return_value = mock_query
+        mock_query.limit.return_value = mock_query
+        mock_query.all.return_value = [sample_rows[0]]
+
+        with patch.object(TaskService, 'get_topic_bits', return_value={'dp': 0, 'greedy': 1, 'math': 2}):
+            result = TaskService.get_problems_by_filters(mock_db, topic_expression="dp & greedy & !math")
+
+        assert len(result) == 1
+        assert not mock_query.join.called
+        assert 'topic_mask' in str(mock_query.filter.call_args_list[0][0][0])
+
+
+class TestAsyncTaskService:
+    """Тесты асинхронных оберток TaskService"""
+
+    def test_methods_run_sync_queries_on_async_session(self):
+        """Тест что запросы выполняются через AsyncSession.run_sync"""
+        db = Mock()
+        db.run_sync = AsyncMock(return_value=[])
+
+        result = asyncio.run(AsyncTaskService.search_problems(db, "1850A", profile='list'))
+
+        assert result == []
+        db.run_sync.assert_awaited_once_with(TaskService.search_problems, "1850A", profile='list')
+
+    def test_all_public_queries_have_async_versions(self):
+        """Тест что у каждого запроса TaskService есть асинхронная версия"""
+        queries = [name for name in vars(TaskService)
+                   if not name.startswith('_') and name != 'extract_problem_codes']
+
+        for name in queries:
+            assert asyncio.iscoroutinefunction(getattr(AsyncTaskService, name)), name
+
+
+class TestTaskServicePagination:
+    """Тесты диапазонов и курсорной пагинации на реальной БД"""
+
+    @pytest.fixture
+    def db(self):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from database.models import Base
+
+        test_engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(test_engine)
+        session = sessionmaker(bind=test_engine)()
+        for contest_id, rating, solved in [(1, 800, 50), (2, 1200, 40), (3, 1300, 30),
+                                           (4, 1500, 20), (5, 1900, 10), (6, 1400, 30)]:
+            session.add(Problem(contest_id=contest_id, problem_index='A', name=f'P{contest_id}',
+                                rating=rating, solved_count=solved))
+        session.commit()
+        yield session
+        session.close()
+        test_engine.dispose()
+
+    def test_rating_range(self, db):
+        """Тест диапазона сложности"""
+        problems, cursor = TaskService.get_problems_page(db, min_rating=1200, max_rating=1500)
+
+        assert sorted(p.rating for p in problems) == [1200, 1300, 1400, 1500]
+        assert cursor is None
+
+    def test_popular_order_pages(self, db):
+        """Тест постраничного обхода по убыванию решений"""
+        first, cursor = TaskService.get_problems_page(db, order='popular', limit=2)
+        second, cursor2 = TaskService.get_problems_page(db, order='popular', cursor=cursor, limit=2)
+        third, cursor3 = TaskService.get_problems_page(db, order='popular', cursor=cursor2, limit=2)
+
+        codes = [p.contest_id for p in first + second + third]
+        assert codes == [1, 2, 6, 3, 4, 5]
+        assert cursor == (40, 2)
+        assert cursor3 is None
+
+    def test_recent_order_with_solved_bounds(self, db):
+        """Тест порядка по новизне контеста с границами решений"""
+        problems, _ = TaskService.get_problems_page(db, order='recent', min_solved=20, max_solved=40)
+
+        assert [p.contest_id for p in problems] == [6, 4, 3, 2]
+
+    def test_rating_order_ascending_cursor(self, db):
+        """Тест курсора при сортировке по возрастанию сложности"""
+        first, cursor = TaskService.get_problems_page(db, order='rating', limit=3)
+        rest, _ = TaskService.get_problems_page(db, order='rating', cursor=cursor, limit=3)
+
+        assert [p.rating for p in first] == [800, 1200, 1300]
+        assert [p.rating for p in rest] == [1400, 1500, 1900]
+
+    def test_backward_page_returns_previous_page(self, db):
+        """Тест перехода на предыдущую страницу по курсору первой задачи"""
+        from services.task_services import page_cursor
+
+        first, cursor = TaskService.get_problems_page(db, order='popular', limit=2)
+        second, _ = TaskService.get_problems_page(db, order='popular', cursor=cursor, limit=2)
+        previous, before = TaskService.get_problems_page(
+            db, order='popular', cursor=page_cursor(second[0]), backward=True, limit=2
+        )
+
+        assert [p.contest_id for p in previous] == [p.contest_id for p in first]
+        assert before is None
+
+    def test_backward_page_cursor_points_further_back(self, db):
+        """Тест курсора еще более ранней страницы при переходе назад"""
+        from services.task_services import page_cursor
+
+        pages, cursor = [], None
+        for _ in range(3):
+            page, cursor = TaskService.get_problems_page(db, order='popular', cursor=cursor, limit=2)
+            pages.append(page)
+
+        previous, before = TaskService.get_problems_page(
+            db, order='popular', cursor=page_cursor(pages[2][0]), backward=True, limit=2
+        )
+
+        assert [p.contest_id for p in previous] == [p.contest_id for p in pages[1]]
+        assert before == page_cursor(pages[1][0])
+
+    def test_search_filter(self, db):
+        """Тест фильтра поиска по названию и коду"""
+        problems, _ = TaskService.get_problems_page(db, search='p3')
+        assert [p.contest_id for p in problems] == [3]
+
+        problems, _ = TaskService.get_problems_page(db, search='5a')
+        assert [p.contest_id for p in problems] == [5]
+
+    def test_random_sample_distinct_contests(self, db):
+        """Тест случайной выборки из разных контестов на реальной БД"""
+        db.add(Problem(contest_id=1, problem_index='B', name='P1B', rating=900, solved_count=5))
+        db.commit()
+
+        for _ in range(5):
+            problems = TaskService.get_problems_by_filters(db, limit=10)
+            contests = [p.contest_id for p in problems]
+            assert sorted(contests) == [1, 2, 3, 4, 5, 6]
+
+    def test_rating_topic_stats_from_aggregate(self, db):
+        """Тест пересчета агрегата парсером и чтения счетчиков тем"""
+        from parser.codeforces_parser import CodeforcesParser
+
+        dp, math = Topic(name='dp'), Topic(name='math')
+        for problem in db.query(Problem).all():
+            problem.topics.append(dp)
+            if problem.solved_count >= 40:
+                problem.topics.append(math)
+        db.commit()
+
+        CodeforcesParser()._refresh_rating_topic_stats(db)
+        db.commit()
+
+        assert TaskService.get_topic_counts(db, 1200) == [('dp', 1), ('math', 1)]
+        assert TaskService.get_topic_counts(db, 3000) == []
+        stats = TaskService.get_rating_topic_stats(db, topic='math')
+        assert stats == [(800, 'math', 1, 50.0), (1200, 'math', 1, 40.0)]
+
+    def test_loading_profiles_use_fixed_query_count(self, db):
+        """Тест что число запросов не зависит от размера страницы"""
+        from sqlalchemy import event
+
+        for problem in db.query(Problem).all():
+            problem.tags = ['dp']
+        db.commit()
+
+        statements = []
+        event.listen(db.bind, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+        list_page, _ = TaskService.get_problems_page(db, profile='list', limit=5)
+        list_queries = len(statements)
+        detail_page, _ = TaskService.get_problems_page(db, profile='detail', limit=5)
+
+        assert list_queries == 1
+        assert len(statements) - list_queries == 1
+        assert all(problem.topics == () for problem in list_page)
+        assert all(problem.topics == ('dp',) for problem in detail_page)
+
+    def test_unknown_loading_profile(self, db):
+        """Тест неизвестного профиля загрузки"""
+        with pytest.raises(ValueError):
+            TaskService.get_problems_page(db, profile='full')
+
+    def test_get_problems_by_codes_in_input_order(self, db):
+        """Тест пакетного поиска по кодам в порядке ввода"""
+        from sqlalchemy import event
+
+        statements = []
+        event.listen(db.bind, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+        codes = TaskService.extract_problem_codes("5a, 99Z 2A и снова 5A")
+        results = TaskService.get_problems_by_codes(db, codes)
+
+        assert codes == [(5, 'A'), (99, 'Z'), (2, 'A')]
+        assert [(code, problem.name if problem else None) for code, problem in results] == [
+            ((5, 'A'), 'P5'), ((99, 'Z'), None), ((2, 'A'), 'P2')
+        ]
+        assert len(statements) == 1
+
+    def test_get_problems_by_codes_empty(self, db):
+        """Тест пакетного поиска без кодов"""
+        assert TaskService.get_problems_by_codes(db, []) == []
+
+    def test_unknown_order(self, db):
+        """Тест неизвестного порядка сортировки"""
+        with pytest.raises(ValueError):
+            TaskService.get_problems_page(db, order='random')
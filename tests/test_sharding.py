@@ -0,0 +1,66 @@
+import subprocess
+import sys
+import os
+from unittest.mock import patch
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from bot.sharding import update_owner_id, shard_for, get_worker_urls
+
+
+class TestSharding:
+    """Тесты распределения обновлений по воркерам"""
+
+    def test_owner_of_message(self):
+        """Тест chat_id сообщения"""
+        payload = {'update_id': 1, 'message': {'chat': {'id': -100500}, 'from': {'id': 7}, 'text': '/start'}}
+
+        assert update_owner_id(payload) == -100500
+
+    def test_owner_of_callback_query(self):
+        """Тест chat_id нажатия кнопки (чат берется из сообщения с кнопкой)"""
+        payload = {'update_id': 2, 'callback_query': {'from': {'id': 7}, 'message': {'chat': {'id': 42}}}}
+
+        assert update_owner_id(payload) == 42
+
+    def test_owner_of_inline_query(self):
+        """Тест обновления без чата: используется id пользователя"""
+        payload = {'update_id': 3, 'inline_query': {'from': {'id': 7}, 'query': 'dp'}}
+
+        assert update_owner_id(payload) == 7
+
+    def test_same_chat_same_shard(self):
+        """Тест что обновления одного чата всегда попадают в один воркер"""
+        shards = {shard_for({'update_id': i, 'message': {'chat': {'id': -100500}}}, 4) for i in range(20)}
+
+        assert len(shards) == 1
+        assert 0 <= shards.pop() < 4
+
+    def test_updates_without_owner_are_spread(self):
+        """Тест обновлений без чата и пользователя"""
+        assert {shard_for({'update_id': i}, 3) for i in range(3)} == {0, 1, 2}
+
+    @patch('bot.sharding.config')
+    def test_local_worker_urls(self, mock_config):
+        """Тест адресов локальных воркеров"""
+        mock_config.WORKER_URLS = None
+        mock_config.WORKER_HOST = '127.0.0.1'
+        mock_config.WORKER_BASE_PORT = 9000
+        mock_config.WEBHOOK_PATH = '/telegram'
+        mock_config.BOT_WORKERS = 2
+
+        assert get_worker_urls() == ['http://127.0.0.1:9000/telegram', 'http://127.0.0.1:9001/telegram']
+
+    @patch('bot.sharding.config')
+    def test_explicit_worker_urls(self, mock_config):
+        """Тест адресов воркеров из WORKER_URLS"""
+        mock_config.WORKER_URLS = 'http://bot-1:9000/telegram, http://bot-2:9000/telegram'
+
+        assert get_worker_urls() == ['http://bot-1:9000/telegram', 'http://bot-2:9000/telegram']
+
+    def test_dispatcher_does_not_register_dataset_listeners(self):
+        """Тест что импорт бота (процесс диспетчера) не подписывает кэши на загрузки задач"""
+        src = os.path.join(os.path.dirname(__file__), '..', 'src')
+        code = "import bot.telegram_bot, bot.sharding; from services import dataset; print(len(dataset._listeners))"
+
+        result = subprocess.run([sys.executable, "-c", code], cwd=src, capture_output=True, text=True, check=True)
+
+        assert result.stdout.strip() == "0"
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from services.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Тесты объединения одинаковых запросов"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_calls_share_one_execution(self):
+        """Тест что одновременные одинаковые вызовы выполняются один раз"""
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def query(value):
+            calls.append(value)
+            release.wait(5)
+            return value * 2
+
+        tasks = [asyncio.create_task(flight.run('key', query, 21)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        assert flight.in_flight == 1
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        assert results == [42] * 5
+        assert calls == [21]
+        assert flight.executed == 1
+        assert flight.shared == 4
+        assert flight.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_coroutine_function_runs_in_event_loop(self):
+        """Тест что корутины выполняются в цикле событий и тоже объединяются"""
+        flight = SingleFlight()
+        release = asyncio.Event()
+        calls = []
+
+        async def query(value):
+            calls.append(value)
+            await release.wait()
+            return value * 2
+
+        tasks = [asyncio.create_task(flight.run('key', query, 21)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        release.set()
+
+        assert await asyncio.gather(*tasks) == [42] * 3
+        assert calls == [21]
+        assert flight.shared == 2
+        assert flight.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_are_not_cached(self):
+        """Тест что результат не сохраняется после завершения запроса"""
+        flight = SingleFlight()
+        calls = []
+
+        def query():
+            calls.append(1)
+            return len(calls)
+
+        assert await flight.run('key', query) == 1
+        assert await flight.run('key', query) == 2
+
+    @pytest.mark.asyncio
+    async def test_exception_propagates_to_all_waiters(self):
+        """Тест что ошибка запроса получают все ожидающие"""
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def query():
+            release.wait(5)
+            raise RuntimeError("db down")
+
+        tasks = [asyncio.create_task(flight.run('key', query)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_query(self):
+        """Тест что отмена одного ожидающего не отменяет общий запрос"""
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def query():
+            release.wait(5)
+            return 'done'
+
+        first = asyncio.create_task(flight.run('key', query))
+        second = asyncio.create_task(flight.run('key', query))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        release.set()
+
+        assert await second == 'done'
+
+    @pytest.mark.asyncio
+    async def test_coroutine_cancelled_when_all_waiters_leave(self):
+        """Тест что корутина отменяется, когда ушли все ожидающие"""
+        flight = SingleFlight()
+        started = asyncio.Event()
+        cancelled = []
+
+        async def query():
+            started.set()
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        first = asyncio.create_task(flight.run('key', query))
+        second = asyncio.create_task(flight.run('key', query))
+        await started.wait()
+        first.cancel()
+        await asyncio.sleep(0)
+        assert not cancelled
+
+        second.cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        assert cancelled == [True]
+        assert flight.in_flight == 0
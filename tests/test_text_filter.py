@@ -0,0 +1,94 @@
+import sys
+import os
+from unittest.mock import patch
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from bot.text_filter import (
+    FreeTextFilter, CODES, CODE, DROP, TOO_LONG, NOT_A_QUERY, KNOWN_MISS, RATE_LIMITED
+)
+
+
+class TestFreeTextFilter:
+    """Тесты проверки текстовых сообщений до обращения к БД"""
+
+    def test_single_code_searches_by_code(self):
+        """Тест что один код ищется сам по себе, а не весь текст"""
+        text_filter = FreeTextFilter()
+
+        assert text_filter.classify(1, "подскажи 1850g пожалуйста") == (CODE, (1850, 'G'))
+        assert text_filter.stats['passed'] == 1
+
+    def test_several_codes(self):
+        """Тест сообщения с несколькими кодами"""
+        assert FreeTextFilter().classify(1, "1850A, 1851B") == (CODES, [(1850, 'A'), (1851, 'B')])
+
+    def test_chatter_dropped(self):
+        """Тест что болтовня без кода задачи не доходит до поиска"""
+        text_filter = FreeTextFilter()
+
+        assert text_filter.classify(1, "hi 2 u") == (DROP, NOT_A_QUERY)
+        assert text_filter.classify(1, "привет") == (DROP, NOT_A_QUERY)
+        assert text_filter.stats[NOT_A_QUERY] == 2
+
+    def test_length_cap(self):
+        """Тест что длинные сообщения (например, вставленный код) отбрасываются"""
+        text_filter = FreeTextFilter(max_length=20)
+
+        assert text_filter.classify(1, "int main() { return 1850A; }") == (DROP, TOO_LONG)
+        assert text_filter.stats[TOO_LONG] == 1
+
+    def test_known_miss(self):
+        """Тест что код без результатов не ищется повторно"""
+        text_filter = FreeTextFilter()
+        text_filter.remember_miss((99999, 'Z'))
+
+        assert text_filter.classify(1, "99999z") == (DROP, KNOWN_MISS)
+        assert text_filter.classify(1, "1850A") == (CODE, (1850, 'A'))
+
+    def test_known_miss_reset_by_dataset_version(self):
+        """Тест что после загрузки задач промахи забываются"""
+        text_filter = FreeTextFilter()
+        text_filter.remember_miss((99999, 'Z'))
+
+        with patch('bot.text_filter.get_dataset_version', return_value=text_filter._version + 1):
+            assert text_filter.classify(1, "99999Z") == (CODE, (99999, 'Z'))
+
+    def test_known_miss_expires(self):
+        """Тест времени жизни промаха"""
+        text_filter = FreeTextFilter(ttl_seconds=0)
+        text_filter.remember_miss((99999, 'Z'))
+
+        with patch('bot.text_filter.time.monotonic', return_value=10 ** 9):
+            assert text_filter.classify(1, "99999Z") == (CODE, (99999, 'Z'))
+
+    def test_known_miss_cache_size(self):
+        """Тест ограничения размера кэша промахов"""
+        text_filter = FreeTextFilter(miss_cache_size=2)
+        for contest_id in (1, 2, 3):
+            text_filter.remember_miss((contest_id, 'A'))
+
+        assert text_filter.classify(1, "1A") == (CODE, (1, 'A'))
+        assert text_filter.classify(1, "3A") == (DROP, KNOWN_MISS)
+
+    def test_rate_limit_per_chat(self):
+        """Тест ограничения числа поисков в чате"""
+        text_filter = FreeTextFilter(rate_per_minute=60, burst=2)
+
+        with patch('bot.text_filter.time.monotonic', return_value=100.0):
+            assert text_filter.classify(1, "1850A")[0] == CODE
+            assert text_filter.classify(1, "1850B")[0] == CODE
+            assert text_filter.classify(1, "1850C") == (DROP, RATE_LIMITED)
+            assert text_filter.classify(2, "1850C")[0] == CODE
+
+        with patch('bot.text_filter.time.monotonic', return_value=101.0):
+            assert text_filter.classify(1, "1850C")[0] == CODE
+
+        assert text_filter.stats[RATE_LIMITED] == 1
+
+    def test_rejected_messages_do_not_use_quota(self):
+        """Тест что отброшенные сообщения не расходуют запас чата"""
+        text_filter = FreeTextFilter(burst=1)
+
+        text_filter.classify(1, "hello")
+        text_filter.classify(1, "x" * 500)
+
+        assert text_filter.classify(1, "1850A")[0] == CODE
@@ -0,0 +1,73 @@
+import pytest
+import sys
+import os
+from sqlalchemy.dialects import postgresql
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from services.topic_filter import (
+    tokenize_topic_expression, parse_topic_expression, topic_expression_clause
+)
+
+TOPIC_BITS = {'dp': 0, 'greedy': 1, 'math': 2, 'divide and conquer': 3}
+
+
+def compile_clause(clause):
+    return str(clause.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}))
+
+
+class TestTopicExpressionParsing:
+    """Тесты разбора выражений над темами"""
+
+    def test_tokenize_symbols(self):
+        """Тест разбиения выражения с символьными операторами"""
+        assert tokenize_topic_expression("dp & greedy & !math") == ['dp', 'AND', 'greedy', 'AND', 'NOT', 'math']
+
+    def test_tokenize_keeps_lowercase_words_in_names(self):
+        """Тест что слова в названиях тем не считаются операторами"""
+        assert tokenize_topic_expression("divide and conquer | dp") == ['divide and conquer', 'OR', 'dp']
+
+    def test_parse_keywords_with_implicit_and(self):
+        """Тест разбора "dp AND greedy NOT math" """
+        node = parse_topic_expression("dp AND greedy NOT math")
+        assert node == ('and', [('topic', 'dp'), ('topic', 'greedy'), ('not', ('topic', 'math'))])
+
+    def test_parse_precedence_and_parentheses(self):
+        """Тест приоритета операторов и скобок"""
+        assert parse_topic_expression("dp | greedy & math") == (
+            'or', [('topic', 'dp'), ('and', [('topic', 'greedy'), ('topic', 'math')])]
+        )
+        assert parse_topic_expression("(dp | greedy) & math") == (
+            'and', [('or', [('topic', 'dp'), ('topic', 'greedy')]), ('topic', 'math')]
+        )
+
+    @pytest.mark.parametrize("expression", ["", "dp &", "(dp | greedy", "dp )", "& dp"])
+    def test_parse_invalid(self, expression):
+        """Тест ошибок разбора"""
+        with pytest.raises(ValueError):
+            parse_topic_expression(expression)
+
+
+class TestTopicExpressionClause:
+    """Тесты построения условия на маске тем"""
+
+    def test_conjunction_folds_into_masks(self):
+        """Тест что конъюнкция сворачивается в проверки маски"""
+        clause = topic_expression_clause(parse_topic_expression("dp & greedy & !math"), TOPIC_BITS)
+        sql = compile_clause(clause)
+        assert "(problems.topic_mask & 3) = 3" in sql
+        assert "(problems.topic_mask & 4) = 0" in sql
+        assert "JOIN" not in sql
+
+    def test_disjunction_folds_into_single_check(self):
+        """Тест что дизъюнкция тем — одна проверка"""
+        clause = topic_expression_clause(parse_topic_expression("dp | math"), TOPIC_BITS)
+        assert compile_clause(clause) == "(problems.topic_mask & 5) != 0"
+
+    def test_nested_not(self):
+        """Тест отрицания составного выражения"""
+        clause = topic_expression_clause(parse_topic_expression("!(dp & greedy)"), TOPIC_BITS)
+        assert compile_clause(clause) == "(problems.topic_mask & 3) != 3"
+
+    def test_unknown_topic(self):
+        """Тест неизвестной темы"""
+        with pytest.raises(ValueError, match="Неизвестная тема"):
+            topic_expression_clause(parse_topic_expression("dp & trees"), TOPIC_BITS)
@@ -0,0 +1,154 @@
+import asyncio
+import pytest
+import sys
+import os
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+from sqlalchemy.exc import DBAPIError
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from bot.unit_of_work import unit_of_work, cancel_chat_queries, run_in_session, QUERY_TIMEOUT_REPLY
+from database.database import STATEMENT_TIMEOUT_KEY
+
+
+class Handlers:
+    def __init__(self):
+        self.sessions = []
+
+    @unit_of_work
+    async def handle(self, update, context, db):
+        self.sessions.append(db)
+        return "ok"
+
+    @unit_of_work
+    async def fail(self, update, context, db):
+        raise RuntimeError("boom")
+
+    @unit_of_work(statement_timeout_ms=5000)
+    async def slow_search(self, update, context, db):
+        self.sessions.append(db)
+        raise DBAPIError("SELECT ...", {}, Mock(sqlstate='57014'))
+
+    @unit_of_work
+    async def wait_forever(self, update, context, db):
+        self.sessions.append(db)
+        await asyncio.sleep(5)
+
+
+class TestUnitOfWork:
+    """Тесты сессии на обновление"""
+
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    def test_handler_receives_session_and_it_is_closed(self, mock_session):
+        """Тест что обработчик получает сессию, а после него она закрывается"""
+        handlers = Handlers()
+        db = MagicMock()
+        mock_session.return_value.__aenter__.return_value = db
+
+        result = asyncio.run(handlers.handle(AsyncMock(), AsyncMock()))
+
+        assert result == "ok"
+        assert handlers.sessions == [db]
+        mock_session.return_value.__aexit__.assert_awaited_once()
+
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    def test_session_closed_on_error(self, mock_session):
+        """Тест что сессия закрывается и при ошибке обработчика"""
+        handlers = Handlers()
+        mock_session.return_value.__aexit__.return_value = False
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(handlers.fail(AsyncMock(), AsyncMock()))
+
+        mock_session.return_value.__aexit__.assert_awaited_once()
+
+    def test_wrapper_keeps_handler_name(self):
+        """Тест что декоратор сохраняет имя обработчика"""
+        assert Handlers.handle.__name__ == 'handle'
+
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    def test_default_statement_timeout(self, mock_session):
+        """Тест что сессия получает ограничение времени запросов по умолчанию"""
+        from config.config import config
+        handlers = Handlers()
+        db = MagicMock()
+        db.info = {}
+        mock_session.return_value.__aenter__.return_value = db
+
+        asyncio.run(handlers.handle(AsyncMock(), AsyncMock()))
+
+        assert db.info[STATEMENT_TIMEOUT_KEY] == config.QUERY_TIMEOUT_MS
+
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    def test_query_timeout_gets_friendly_reply(self, mock_session):
+        """Тест что запрос, прерванный по statement_timeout, завершает обработчик ответом"""
+        handlers = Handlers()
+        db = MagicMock()
+        db.info = {}
+        mock_session.return_value.__aenter__.return_value = db
+        mock_session.return_value.__aexit__.return_value = False
+        update = AsyncMock()
+
+        result = asyncio.run(handlers.slow_search(update, AsyncMock()))
+
+        assert result == -1
+        assert db.info[STATEMENT_TIMEOUT_KEY] == 5000
+        update.effective_message.reply_text.assert_awaited_once_with(QUERY_TIMEOUT_REPLY)
+
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    def test_query_timeout_without_message(self, mock_session):
+        """Тест что обновление без сообщения (inline-запрос) завершается без ответа"""
+        handlers = Handlers()
+        mock_session.return_value.__aexit__.return_value = False
+        update = AsyncMock()
+        update.effective_message = None
+
+        assert asyncio.run(handlers.slow_search(update, AsyncMock())) == -1
+
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    def test_other_database_errors_propagate(self, mock_session):
+        """Тест что остальные ошибки БД не подменяются ответом о таймауте"""
+        handlers = Handlers()
+        mock_session.return_value.__aexit__.return_value = False
+
+        async def fail(self, update, context, db):
+            raise DBAPIError("SELECT ...", {}, Mock(sqlstate='08006', pgcode=None))
+
+        with pytest.raises(DBAPIError):
+            asyncio.run(unit_of_work(fail)(handlers, AsyncMock(), AsyncMock()))
+
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    def test_cancel_chat_queries(self, mock_session):
+        """Тест отмены запросов чата после /cancel"""
+        handlers = Handlers()
+        mock_session.return_value.__aexit__.return_value = False
+        update = AsyncMock()
+        update.effective_chat.id = 42
+
+        async def scenario():
+            task = asyncio.create_task(handlers.wait_forever(update, AsyncMock()))
+            await asyncio.sleep(0.01)
+            assert cancel_chat_queries(7) == 0
+            assert cancel_chat_queries(42) == 1
+            return await task
+
+        assert asyncio.run(scenario()) == -1
+        assert cancel_chat_queries(42) == 0
+
+    @patch('bot.unit_of_work.AsyncSessionLocal')
+    def test_run_in_session(self, mock_session):
+        """Тест общего запроса в собственной сессии с заданным ограничением времени"""
+        db = MagicMock()
+        db.info = {}
+        db.run_sync = AsyncMock(return_value="sync")
+        mock_session.return_value.__aenter__.return_value = db
+
+        async def query(session, value):
+            assert session is db
+            return value * 2
+
+        assert asyncio.run(run_in_session(3000, query, 21)) == 42
+        assert db.info[STATEMENT_TIMEOUT_KEY] == 3000
+
+        sync_query = Mock()
+        assert asyncio.run(run_in_session(None, sync_query, 1)) == "sync"
+        db.run_sync.assert_awaited_once_with(sync_query, 1)
+        assert mock_session.return_value.__aexit__.await_count == 2
@@ -0,0 +1,99 @@
+import asyncio
+import sys
+import os
+from datetime import datetime
+import pytest
+from telegram import Chat, Message, Update
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from bot.update_processor import ChatOrderedUpdateProcessor
+
+
+def make_update(update_id: int, chat_id: int, text: str = "text") -> Update:
+    message = Message(message_id=update_id, date=datetime.now(), chat=Chat(chat_id, Chat.PRIVATE), text=text)
+    return Update(update_id, message=message)
+
+
+class TestChatOrderedUpdateProcessor:
+    """Тесты параллельной обработки обновлений с порядком внутри чата"""
+
+    @pytest.mark.asyncio
+    async def test_same_chat_processed_in_order(self):
+        """Тест что обновления одного чата обрабатываются по очереди"""
+        processor = ChatOrderedUpdateProcessor(max_concurrent_updates=8)
+        events = []
+
+        async def handle(name, delay):
+            events.append(f"start {name}")
+            await asyncio.sleep(delay)
+            events.append(f"end {name}")
+
+        await asyncio.gather(
+            processor.process_update(make_update(1, 1), handle("first", 0.03)),
+            processor.process_update(make_update(2, 1), handle("second", 0)),
+        )
+
+        assert events == ["start first", "end first", "start second", "end second"]
+        assert processor._chat_locks == {}
+
+    @pytest.mark.asyncio
+    async def test_different_chats_run_concurrently(self):
+        """Тест что медленный чат не задерживает остальные"""
+        processor = ChatOrderedUpdateProcessor(max_concurrent_updates=8)
+        events = []
+
+        async def handle(name, delay):
+            await asyncio.sleep(delay)
+            events.append(name)
+
+        await asyncio.gather(
+            processor.process_update(make_update(1, 1, "/search slow"), handle("slow", 0.05)),
+            processor.process_update(make_update(2, 2), handle("fast", 0)),
+        )
+
+        assert events == ["fast", "slow"]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self):
+        """Тест ограничения числа одновременно обрабатываемых обновлений"""
+        processor = ChatOrderedUpdateProcessor(max_concurrent_updates=2)
+        running = []
+        peak = []
+
+        async def handle():
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+
+        await asyncio.gather(*[
+            processor.process_update(make_update(i, i), handle()) for i in range(6)
+        ])
+
+        assert max(peak) == 2
+        stats = processor.stats
+        assert stats['processed'] == 6
+        assert stats['waiting'] == 0
+        assert stats['max_waiting'] == 4
+        assert stats['wait_max_ms'] > 0
+
+    @pytest.mark.asyncio
+    async def test_cancel_bypasses_chat_queue(self):
+        """Тест что /cancel не ждет выполняющийся запрос своего чата"""
+        processor = ChatOrderedUpdateProcessor(max_concurrent_updates=8)
+        release = asyncio.Event()
+        events = []
+
+        async def slow():
+            await release.wait()
+            events.append("search")
+
+        async def cancel():
+            events.append("cancel")
+            release.set()
+
+        await asyncio.gather(
+            processor.process_update(make_update(1, 1, "/search x"), slow()),
+            processor.process_update(make_update(2, 1, "/cancel"), cancel()),
+        )
+
+        assert events == ["cancel", "search"]
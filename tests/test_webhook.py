@@ -0,0 +1,92 @@
+import asyncio
+import json
+import sys
+import os
+import pytest
+import pytest_asyncio
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from bot.webhook import WebhookServer
+
+
+async def send(server, body: bytes, secret='s3cret', path='/telegram', method='POST', headers=None):
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    request_headers = {'Host': 'localhost', 'Content-Type': 'application/json', 'Content-Length': str(len(body))}
+    if secret is not None:
+        request_headers['X-Telegram-Bot-Api-Secret-Token'] = secret
+    request_headers.update(headers or {})
+    head = f"{method} {path} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in request_headers.items()) + "\r\n"
+    writer.write(head.encode() + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    writer.close()
+    return int(status_line.split()[1])
+
+
+class TestWebhookServer:
+    """Тесты HTTP-приемника обновлений"""
+
+    @pytest_asyncio.fixture
+    async def server(self):
+        received = []
+
+        async def on_update(payload):
+            received.append(payload)
+
+        server = WebhookServer(on_update, secret_token='s3cret', host='127.0.0.1', port=0, max_body_bytes=1024)
+        server.received = received
+        await server.start()
+        yield server
+        await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_valid_update_accepted(self, server):
+        """Тест приема корректного обновления"""
+        status = await send(server, json.dumps({'update_id': 1}).encode())
+
+        assert status == 200
+        assert server.received == [{'update_id': 1}]
+        assert server.accepted == 1
+
+    @pytest.mark.asyncio
+    async def test_wrong_secret_rejected(self, server):
+        """Тест отказа при неверном или отсутствующем секретном токене"""
+        assert await send(server, b'{}', secret='wrong') == 403
+        assert await send(server, b'{}', secret=None) == 403
+        assert server.received == []
+        assert server.rejected == 2
+
+    @pytest.mark.asyncio
+    async def test_non_ascii_secret_rejected(self, server):
+        """Тест что не-ASCII токен получает 403, а не ошибку сервера"""
+        assert await send(server, b'{}', secret='é') == 403
+        assert server.received == []
+        assert server.rejected == 1
+
+    @pytest.mark.asyncio
+    async def test_body_size_bounded(self, server):
+        """Тест отказа для слишком большого тела без его чтения"""
+        status = await send(server, b'{}', headers={'Content-Length': str(10 * 1024 * 1024)})
+
+        assert status == 413
+        assert server.received == []
+
+    @pytest.mark.asyncio
+    async def test_wrong_path_and_method(self, server):
+        """Тест отказа для другого пути и метода"""
+        assert await send(server, b'{}', path='/other') == 404
+        assert await send(server, b'{}', method='GET') == 405
+
+    @pytest.mark.asyncio
+    async def test_invalid_json(self, server):
+        """Тест отказа для тела, которое не является JSON"""
+        assert await send(server, b'not json') == 400
+        assert server.received == []
+
+    @pytest.mark.asyncio
+    async def test_non_object_payload_rejected(self, server):
+        """Тест отказа для JSON, который не является объектом обновления"""
+        assert await send(server, b'[]') == 400
+        assert await send(server, b'42') == 400
+        assert server.received == []
+        assert server.rejected == 2